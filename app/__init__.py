@@ -4,6 +4,7 @@ from flask_login import LoginManager
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 from .config import config
+import click
 import datetime
 import logging  # 添加logging模块导入
 import os  # 添加os模块导入
@@ -127,7 +128,8 @@ def create_app(config_name=None):
         app.logger.addHandler(stream_handler)
 
     db.init_app(app)
-    migrate.init_app(app, db)
+    # 迁移脚本目录固定在项目根目录下，不依赖启动时的工作目录
+    migrate.init_app(app, db, directory=os.path.join(os.path.dirname(app.root_path), 'migrations'))
     login_manager.init_app(app)
     csrf.init_app(app)
     
@@ -170,6 +172,12 @@ def create_app(config_name=None):
             # 如果不是有效的JSON，返回清理后的文本
             return cleaned.strip()
 
+    @app.template_filter('highlight')
+    def highlight_filter(value, search_query):
+        """转义文本并用<mark>标出搜索词"""
+        from app.services.result_search_service import ResultSearchService
+        return ResultSearchService.highlight(value, search_query)
+
     @app.before_request
     def global_vars_before_request():
         g.year = datetime.date.today().year
@@ -185,6 +193,12 @@ def create_app(config_name=None):
             # 只对需要登录的页面进行重定向
             # 数据集列表等页面不需要登录，所以不应该强制重定向
 
+    @app.before_request
+    def ensure_evaluation_workers():
+        # 首次请求时启动本进程的评估工作线程池，接管队列中待执行和崩溃遗留的作业
+        from app.services.evaluation_queue_service import start_evaluation_workers
+        start_evaluation_workers(app)
+
     @app.after_request
     def after_request(response):
         # 添加缓存控制头，防止缓存问题
@@ -260,10 +274,22 @@ def create_app(config_name=None):
     @app.cli.command()
     def init_db():
         """初始化数据库数据"""
-        from app.models import init_database_data
+        from app.models import init_database_data, upgrade_database_schema
+        from app.services.result_search_service import ResultSearchService
         with app.app_context():
-            db.create_all()
+            upgrade_database_schema()
+            ResultSearchService.ensure_fulltext_index()
             init_database_data()
             print("数据库初始化完成")
 
+    @app.cli.command()
+    @click.option('--evaluation-id', type=int, default=None, help='只回填指定评估的结果')
+    @click.option('--batch-size', type=int, default=500, help='每批更新的结果数')
+    def backfill_rendered_prompts(evaluation_id, batch_size):
+        """为已有的详细结果补算入库时渲染的userPrompt"""
+        from app.services.evaluation_service import EvaluationService
+        with app.app_context():
+            processed = EvaluationService.backfill_rendered_prompts(evaluation_id, batch_size)
+            print(f"回填完成，共处理 {processed} 条结果")
+
     return app
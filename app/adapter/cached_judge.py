@@ -0,0 +1,42 @@
+from typing import Optional
+
+from app.services.judge_cache_service import JudgeCacheService
+from app.services.prediction_cache_service import CacheCounter
+
+
+class CachedJudge:
+    """
+    evalscope LLMJudge的缓存代理。
+    所有裁判调用（包括CustomDatasetAdapter.llm_match）都经过__call__(prompt, system_prompt)，
+    在这里按渲染后的提示词查询缓存，命中时不再请求裁判模型。
+    """
+
+    def __init__(self, judge, app, counter: CacheCounter):
+        self._judge = judge
+        self._app = app
+        self._counter = counter
+
+    def __getattr__(self, name):
+        return getattr(self._judge, name)
+
+    def __call__(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+        cache_key = JudgeCacheService.make_key(
+            self._judge.model_id,
+            self._judge.api_url,
+            system_prompt or self._judge.system_prompt,
+            prompt,
+            self._judge.generation_config
+        )
+        with self._app.app_context():
+            cached_verdict = JudgeCacheService.get(cache_key)
+        if cached_verdict is not None:
+            self._counter.record(hit=True)
+            return cached_verdict
+
+        verdict = self._judge(prompt, system_prompt)
+        self._counter.record(hit=False)
+        # LLMJudge在请求失败时返回空字符串，不缓存失败结果
+        if verdict:
+            with self._app.app_context():
+                JudgeCacheService.put(cache_key, self._judge.model_id, verdict)
+        return verdict
@@ -0,0 +1,48 @@
+from typing import List, Optional
+
+from app.services.prediction_cache_service import CacheCounter, PredictionCacheService
+
+
+class CachedModelAdapter:
+    """
+    evalscope ServerModelAdapter的缓存代理。
+    先按请求内容查询回答缓存，未命中时再调用模型服务并写入缓存。
+    其余属性和方法直接转发给被包装的适配器。
+    """
+
+    def __init__(self, model_adapter, app, api_base_url: str, model_identifier: str,
+                 counter: CacheCounter, replay: bool = True):
+        self._model_adapter = model_adapter
+        self._app = app
+        self._api_base_url = api_base_url
+        self._model_identifier = model_identifier
+        self._counter = counter
+        self._replay = replay
+
+    def __getattr__(self, name):
+        return getattr(self._model_adapter, name)
+
+    def predict(self, inputs: List[dict], infer_cfg: Optional[dict] = None) -> List[dict]:
+        infer_cfg = infer_cfg or {}
+        return [self.process_single_input(input_item, infer_cfg) for input_item in inputs]
+
+    def process_single_input(self, input_item: dict, infer_cfg: dict) -> dict:
+        request_json = self._model_adapter.make_request(input_item, infer_cfg)
+        return self.send_request(request_json)
+
+    def send_request(self, request_json: dict) -> dict:
+        # 外层代理（如取消检查）直接调用send_request，缓存必须在这里查询和写入
+        cache_key = PredictionCacheService.make_key(self._api_base_url, request_json)
+
+        if self._replay:
+            with self._app.app_context():
+                cached_response = PredictionCacheService.get(cache_key)
+            if cached_response is not None:
+                self._counter.record(hit=True)
+                return cached_response
+
+        response = self._model_adapter.send_request(request_json)
+        self._counter.record(hit=False)
+        with self._app.app_context():
+            PredictionCacheService.put(cache_key, self._model_identifier, response)
+        return response
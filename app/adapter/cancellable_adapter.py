@@ -0,0 +1,121 @@
+from typing import List, Optional
+import threading
+
+
+class EvaluationCancelled(Exception):
+    """评估已被用户取消"""
+
+
+class EvaluationPreempted(EvaluationCancelled):
+    """评估让出执行名额给更高优先级的作业，稍后重新排队续评"""
+
+
+class CancellationToken:
+    """
+    一次评估的取消标记。
+    cancel()之后新的模型/裁判请求直接抛出EvaluationCancelled；
+    同时关闭已登记的OpenAI客户端，正在等待响应的请求随连接关闭立即失败，不必等到超时。
+    preempt()只拒绝新的请求（抛出EvaluationPreempted），已发出的请求正常完成。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._preempted = threading.Event()
+        self._lock = threading.Lock()
+        self._clients = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def preempted(self) -> bool:
+        return self._preempted.is_set()
+
+    def register_client(self, client) -> None:
+        if client is None:
+            return
+        with self._lock:
+            if any(registered is client for registered in self._clients):
+                return
+            self._clients.append(client)
+        if self.cancelled:
+            self._close(client)
+
+    def cancel(self) -> None:
+        self._event.set()
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            self._close(client)
+
+    def preempt(self) -> None:
+        self._preempted.set()
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise EvaluationCancelled("评估已被取消")
+        if self.preempted:
+            raise EvaluationPreempted("评估被更高优先级的作业抢占")
+
+    @staticmethod
+    def _close(client) -> None:
+        try:
+            client.close()
+        except Exception:
+            pass
+
+
+class CancellableModelAdapter:
+    """
+    evalscope ServerModelAdapter的取消代理。
+    每个请求发出前检查取消标记；取消后被中断的请求以EvaluationCancelled结束，evalscope随之停止评估。
+    """
+
+    def __init__(self, model_adapter, token: CancellationToken):
+        self._model_adapter = model_adapter
+        self._token = token
+        # 经过其他代理时通过__getattr__取到最内层ServerModelAdapter的客户端
+        token.register_client(getattr(model_adapter, 'client', None))
+
+    def __getattr__(self, name):
+        return getattr(self._model_adapter, name)
+
+    def predict(self, inputs: List[dict], infer_cfg: Optional[dict] = None) -> List[dict]:
+        infer_cfg = infer_cfg or {}
+        return [self.process_single_input(input_item, infer_cfg) for input_item in inputs]
+
+    def process_single_input(self, input_item: dict, infer_cfg: dict) -> dict:
+        self._token.raise_if_cancelled()
+        request_json = self._model_adapter.make_request(input_item, infer_cfg)
+        return self.send_request(request_json)
+
+    def send_request(self, request_json: dict) -> dict:
+        self._token.raise_if_cancelled()
+        try:
+            return self._model_adapter.send_request(request_json)
+        except Exception:
+            self._token.raise_if_cancelled()
+            raise
+
+
+class CancellableJudge:
+    """
+    evalscope LLMJudge的取消代理。
+    LLMJudge会吞掉请求异常并返回空字符串，取消后必须在外层抛出，避免把中断的评判当作有效结果写入review文件。
+    """
+
+    def __init__(self, judge, token: CancellationToken):
+        self._judge = judge
+        self._token = token
+        server_adapter = getattr(judge, 'server_adapter', None)
+        token.register_client(getattr(server_adapter, 'client', None))
+
+    def __getattr__(self, name):
+        return getattr(self._judge, name)
+
+    def __call__(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+        self._token.raise_if_cancelled()
+        verdict = self._judge(prompt, system_prompt)
+        self._token.raise_if_cancelled()
+        return verdict
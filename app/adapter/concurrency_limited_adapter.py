@@ -0,0 +1,38 @@
+from typing import List, Optional
+
+from app.utils.adaptive_concurrency import AdaptiveConcurrencyLimiter
+
+
+class ConcurrencyLimitedModelAdapter:
+    """
+    evalscope ServerModelAdapter的并发控制代理。
+    evalscope线程池按并发上限的最大值创建，真正发往模型服务的请求数由AdaptiveConcurrencyLimiter控制。
+    """
+
+    def __init__(self, model_adapter, limiter: AdaptiveConcurrencyLimiter):
+        self._model_adapter = model_adapter
+        self._limiter = limiter
+
+    def __getattr__(self, name):
+        return getattr(self._model_adapter, name)
+
+    def predict(self, inputs: List[dict], infer_cfg: Optional[dict] = None) -> List[dict]:
+        infer_cfg = infer_cfg or {}
+        return [self.process_single_input(input_item, infer_cfg) for input_item in inputs]
+
+    def process_single_input(self, input_item: dict, infer_cfg: dict) -> dict:
+        request_json = self._model_adapter.make_request(input_item, infer_cfg)
+        return self.send_request(request_json)
+
+    def send_request(self, request_json: dict) -> dict:
+        with self._limiter.slot():
+            return self._model_adapter.send_request(request_json)
+
+
+def limit_judge_concurrency(judge, limiter: AdaptiveConcurrencyLimiter):
+    """
+    为LLMJudge接入并发控制。
+    LLMJudge会吞掉请求异常并返回空字符串，因此在其内部的server_adapter上控制并发，才能感知429/5xx。
+    """
+    judge.server_adapter = ConcurrencyLimitedModelAdapter(judge.server_adapter, limiter)
+    return judge
@@ -11,6 +11,9 @@ from jinja2 import Environment, FileSystemLoader
 import os
 import re
 from app.models import Dataset
+from app.utils.cache import get_cache
+from flask import current_app
+import hashlib
   
 # 动态创建DataAdapter类  
 class CustomDatasetAdapter(DataAdapter): 
@@ -199,19 +202,27 @@ def register_custom_dataset_benchmark(dataset_id: int):
         raise ValueError(f"数据集不存在: {dataset_id}")
     template_content = dataset.jinja2_template
     if template_content:
-        try:
-            # 创建临时环境来解析配置
-            temp_env = Environment()
-            temp_env.filters['from_json'] = lambda x: json.loads(x) if isinstance(x, str) else x
-            temp_env.filters['to_json'] = lambda x: json.dumps(x, ensure_ascii=False)
-            temp_env.filters['regex_search'] = lambda text, pattern: re.search(pattern, text).group(0) if re.search(pattern, text) else None
-
-            temp_template = temp_env.from_string(template_content)
-            if hasattr(temp_template.module, 'get_config'):
-                config = json.loads(temp_template.module.get_config())
-                metric_list = config.get('metric_list', ['AverageAccuracy'])
-        except Exception as e:
-            print(f"警告：无法从模板中读取配置，使用默认 metric_list: {e}")
+        # 解析结果按模板内容缓存在共享缓存中，同一模板在所有进程中只解析一次
+        template_cache = get_cache('template_metric_list', current_app.config)
+        template_hash = hashlib.sha256(template_content.encode('utf-8')).hexdigest()
+        cached_metric_list = template_cache.get(template_hash)
+        if cached_metric_list is not None:
+            metric_list = cached_metric_list
+        else:
+            try:
+                # 创建临时环境来解析配置
+                temp_env = Environment()
+                temp_env.filters['from_json'] = lambda x: json.loads(x) if isinstance(x, str) else x
+                temp_env.filters['to_json'] = lambda x: json.dumps(x, ensure_ascii=False)
+                temp_env.filters['regex_search'] = lambda text, pattern: re.search(pattern, text).group(0) if re.search(pattern, text) else None
+
+                temp_template = temp_env.from_string(template_content)
+                if hasattr(temp_template.module, 'get_config'):
+                    config = json.loads(temp_template.module.get_config())
+                    metric_list = config.get('metric_list', ['AverageAccuracy'])
+                template_cache.set(template_hash, metric_list)
+            except Exception as e:
+                print(f"警告：无法从模板中读取配置，使用默认 metric_list: {e}")
     
     for m in metric_list:
         if m not in metric_registry.list_metrics():
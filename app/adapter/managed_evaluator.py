@@ -0,0 +1,296 @@
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Union
+import copy
+import json
+import os
+import threading
+
+from evalscope.config import TaskConfig, parse_task_config
+from evalscope.constants import AnswerKeys, DumpMode, JudgeStrategy, ReviewKeys
+from evalscope.evaluator import Evaluator
+from evalscope.run import setup_work_directory
+from evalscope.utils.io_utils import dump_jsonl_data, jsonl_to_list
+from evalscope.utils.logger import configure_logging, get_logger
+from evalscope.utils.model_utils import seed_everything
+
+from app.utils.early_stopping import EarlyStopping, review_result_to_score, stratified_order
+
+logger = get_logger()
+
+
+def apply_sample_ranges(prompts: Dict[str, list], sample_ranges: Optional[Dict[str, List[int]]]) -> Dict[str, list]:
+    """只保留各子集中[起, 止)范围内的样本（按样本在子集中的顺序），没有指定范围的子集保持不变"""
+    for subset_name, (start, end) in (sample_ranges or {}).items():
+        if subset_name in prompts:
+            prompts[subset_name] = prompts[subset_name][start:end]
+    return prompts
+
+
+class EvaluationHooks:
+    """
+    评估过程的扩展点，用于在evalscope的模型调用和裁判调用外层包装缓存、限流等逻辑。
+    每个评估任务使用独立的hooks实例，互不影响。
+    """
+
+    def __init__(self):
+        self.model_adapter_wrappers: List[Callable] = []
+        self.judge_wrappers: List[Callable] = []
+
+    def add_model_adapter_wrapper(self, wrapper: Callable) -> None:
+        self.model_adapter_wrappers.append(wrapper)
+
+    def add_judge_wrapper(self, wrapper: Callable) -> None:
+        self.judge_wrappers.append(wrapper)
+
+    def wrap_model_adapter(self, model_adapter):
+        for wrapper in self.model_adapter_wrappers:
+            model_adapter = wrapper(model_adapter)
+        return model_adapter
+
+    def wrap_judge(self, judge):
+        if judge is None:
+            return None
+        for wrapper in self.judge_wrappers:
+            judge = wrapper(judge)
+        return judge
+
+
+class SharedDatasetCache:
+    """
+    多个评估共享的数据集加载结果（如矩阵评估中的多个模型）。
+    同一个键只计算一次，其余调用方等待并复用；取出的prompts为深拷贝，各评估可以独立修改。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._values: Dict[Hashable, Any] = {}
+
+    def memoize(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._values:
+                self._values[key] = factory()
+            return self._values[key]
+
+    def get_prompts(self, key: Hashable, loader: Callable[[], dict]) -> dict:
+        return copy.deepcopy(self.memoize(('prompts', key), loader))
+
+
+class ManagedEvaluator(Evaluator):
+    """
+    在evalscope Evaluator基础上接入EvaluationHooks，并可复用共享的数据集加载结果、按置信区间提前停止，
+    分片评估时只评估子集中分配给该分片的样本范围
+    """
+
+    def __init__(self, *args, hooks: Optional[EvaluationHooks] = None,
+                 dataset_cache: Optional[SharedDatasetCache] = None,
+                 early_stopping: Optional[EarlyStopping] = None,
+                 sample_ranges: Optional[Dict[str, List[int]]] = None, **kwargs):
+        self.hooks = hooks or EvaluationHooks()
+        self.dataset_cache = dataset_cache
+        self.early_stopping = early_stopping
+        self.sample_ranges = sample_ranges
+        super().__init__(*args, **kwargs)
+
+    def load_dataset(self):
+        return apply_sample_ranges(self._load_prompts(), self.sample_ranges)
+
+    def _load_prompts(self):
+        if self.dataset_cache is None:
+            return super().load_dataset()
+        # 数据集配置和样本数限制相同的评估渲染出的prompts相同
+        cache_key = (
+            self.dataset_name,
+            json.dumps(self.task_cfg.dataset_args.get(self.dataset_name, {}), sort_keys=True, default=str),
+            self.task_cfg.limit,
+        )
+        return self.dataset_cache.get_prompts(cache_key, super().load_dataset)
+
+    def _init_judge(self):
+        if self.task_cfg.judge_strategy == JudgeStrategy.RULE:
+            self.judge = None
+        else:
+            from evalscope.metrics import LLMJudge
+            self.judge = self.hooks.wrap_judge(LLMJudge(**self.task_cfg.judge_model_args))
+
+    def eval(self, **kwargs) -> dict:
+        if self.early_stopping is None:
+            return super().eval(**kwargs)
+        return self._eval_with_early_stopping()
+
+    def _load_cached_records(self, records_dir: str, subset_name: str) -> Dict[int, dict]:
+        """续评时读取上一次已写入的预测或评审记录，按样本index索引"""
+        file_path = os.path.join(records_dir, self.model_name, f'{self.dataset_name}_{subset_name}.jsonl')
+        if not self.use_cache or not os.path.exists(file_path):
+            return {}
+        return {record[AnswerKeys.INDEX]: record for record in jsonl_to_list(file_path) if AnswerKeys.INDEX in record}
+
+    def _sample_score(self, review_d: dict) -> Optional[float]:
+        scores = []
+        for choice in review_d.get(AnswerKeys.CHOICES) or []:
+            try:
+                scores.append(review_result_to_score(choice[ReviewKeys.REVIEW][ReviewKeys.RESULT]))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return sum(scores) / len(scores) if scores else None
+
+    def _eval_with_early_stopping(self):
+        """
+        按子集分层的随机顺序逐个评估样本（生成后立即评审），每完成一个样本更新置信区间，
+        区间达到目标宽度后不再发出新的生成请求，已发出的请求完成后用已评估的样本生成报告。
+        """
+        logger.info(f'Start evaluating on dataset {self.dataset_name_or_path} with early stopping '
+                    f'(target half width {self.early_stopping.margin}, confidence {self.early_stopping.confidence})')
+
+        prompts = self.load_dataset()
+        order = stratified_order(prompts, self.early_stopping.seed)
+        interval = self.early_stopping.new_interval(len(order))
+        infer_cfg = self.task_cfg.generation_config
+
+        cached_answers = {subset: self._load_cached_records(self.outputs_structure.predictions_dir, subset) for subset in prompts}
+        cached_reviews = {subset: self._load_cached_records(self.outputs_structure.reviews_dir, subset) for subset in prompts}
+
+        def record_path(records_dir: str, subset_name: str) -> str:
+            path = os.path.join(records_dir, self.model_name, f'{self.dataset_name}_{subset_name}.jsonl')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            return path
+
+        def answer(subset_name: str, prompt: dict):
+            cached = cached_answers[subset_name].get(prompt[AnswerKeys.INDEX])
+            if cached is not None:
+                return [cached], True
+            return self._get_answer([prompt], subset_name, infer_cfg), False
+
+        def review(answer_d: dict):
+            cached = cached_reviews[answer_d[AnswerKeys.SUBSET_NAME]].get(answer_d[AnswerKeys.INDEX])
+            if cached is not None:
+                return cached, True
+            review_id, reviewer_spec = self._generate_review_id(answer_d)
+            return self._get_review(answer_d=answer_d, review_id=review_id, reviewer_spec=reviewer_spec), False
+
+        reviews_by_subset = defaultdict(list)
+        generation_workers = max(1, self.task_cfg.eval_batch_size or 1)
+        next_position = 0
+        in_flight_answers = 0
+        pending = {}
+        with ThreadPoolExecutor(max_workers=generation_workers) as answer_pool, \
+                ThreadPoolExecutor(max_workers=max(1, self.task_cfg.judge_worker_num or 1)) as review_pool:
+            while True:
+                while (in_flight_answers < generation_workers and next_position < len(order)
+                       and not self.early_stopping.should_stop(interval)):
+                    subset_name, prompt = order[next_position]
+                    next_position += 1
+                    in_flight_answers += 1
+                    pending[answer_pool.submit(answer, subset_name, prompt)] = ('answer', subset_name)
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, subset_name = pending.pop(future)
+                    if kind == 'answer':
+                        in_flight_answers -= 1
+                        answers_list, from_cache = future.result()
+                        if answers_list and not from_cache:
+                            dump_jsonl_data(answers_list, record_path(self.outputs_structure.predictions_dir, subset_name),
+                                            dump_mode=DumpMode.APPEND)
+                        for answer_d in answers_list:
+                            pending[review_pool.submit(review, answer_d)] = ('review', subset_name)
+                    else:
+                        review_d, from_cache = future.result()
+                        if not from_cache:
+                            dump_jsonl_data(review_d, record_path(self.outputs_structure.reviews_dir, subset_name),
+                                            dump_mode=DumpMode.APPEND)
+                        reviews_by_subset[subset_name].append(review_d)
+                        score = self._sample_score(review_d)
+                        if score is not None:
+                            interval.add(score)
+
+        subset_samples = {subset: len(reviews) for subset, reviews in reviews_by_subset.items()}
+        self.early_stopping.record(self.dataset_name, interval, subset_samples)
+        stats = self.early_stopping.results[self.dataset_name]
+        logger.info(f'Early stopping on {self.dataset_name}: evaluated {stats["samples"]}/{stats["total"]} samples, '
+                    f'mean {stats["mean"]}, CI [{stats["ci_low"]}, {stats["ci_high"]}]')
+
+        reviews_score_all = {
+            subset_name: self.compute_metrics(reviews_list=reviews_list)
+            for subset_name, reviews_list in reviews_by_subset.items()
+        }
+        report_map = self.dump_report(reviews_score_all)
+        logger.info(f'Evaluation finished on {self.dataset_name_or_path}')
+        return report_map
+
+
+def create_managed_evaluator(task_cfg: TaskConfig, dataset_name: str, outputs, hooks: EvaluationHooks,
+                             dataset_cache: Optional[SharedDatasetCache] = None,
+                             early_stopping: Optional[EarlyStopping] = None,
+                             sample_ranges: Optional[Dict[str, List[int]]] = None) -> ManagedEvaluator:
+    """与evalscope.run.create_evaluator一致，只是模型适配器和裁判经过hooks包装"""
+    from evalscope.benchmarks import Benchmark
+    from evalscope.models import initialize_model_adapter
+
+    benchmark = Benchmark.get(dataset_name)
+    data_adapter = benchmark.get_data_adapter(config=task_cfg.dataset_args.get(dataset_name, {}))
+    model_adapter = initialize_model_adapter(task_cfg, data_adapter, None)
+    task_cfg.dataset_args[dataset_name] = benchmark.to_string_dict()
+
+    return ManagedEvaluator(
+        data_adapter=data_adapter,
+        model_adapter=hooks.wrap_model_adapter(model_adapter),
+        outputs=outputs,
+        task_cfg=task_cfg,
+        hooks=hooks,
+        dataset_cache=dataset_cache,
+        early_stopping=early_stopping,
+        sample_ranges=sample_ranges,
+    )
+
+
+def run_managed_task(task_cfg: Union[dict, TaskConfig], hooks: Optional[EvaluationHooks] = None,
+                     dataset_cache: Optional[SharedDatasetCache] = None,
+                     early_stopping: Optional[EarlyStopping] = None,
+                     sample_ranges: Optional[Dict[str, Dict[str, List[int]]]] = None) -> dict:
+    """
+    执行服务模式(eval_type=service)的evalscope评估任务，等价于evalscope.run.run_task，
+    但允许通过hooks包装模型和裁判调用，并通过dataset_cache与其他评估共享数据集加载和prompt渲染结果。
+    传入early_stopping时按子集分层随机抽样评估，各数据集的置信区间达到目标宽度后提前停止。
+    sample_ranges为{数据集名称: {子集: [起, 止)}}，分片评估时只评估这些范围内的样本。
+
+    Returns:
+        dict: {数据集名称: 评估报告}，与run_task的返回格式一致
+    """
+    from evalscope.report import gen_table
+
+    hooks = hooks or EvaluationHooks()
+    task_cfg = parse_task_config(task_cfg)
+    if task_cfg.seed is not None:
+        seed_everything(task_cfg.seed)
+
+    outputs = setup_work_directory(task_cfg, datetime.now().strftime('%Y%m%d_%H%M%S'))
+    configure_logging(task_cfg.debug, os.path.join(outputs.logs_dir, 'eval_log.log'))
+
+    evaluators = [
+        create_managed_evaluator(task_cfg, dataset_name, outputs, hooks, dataset_cache, early_stopping,
+                                 (sample_ranges or {}).get(dataset_name))
+        for dataset_name in task_cfg.datasets
+    ]
+    task_cfg.dump_yaml(outputs.configs_dir)
+    logger.info(task_cfg)
+
+    eval_results = {}
+    for evaluator in evaluators:
+        eval_results[evaluator.dataset_name] = evaluator.eval()
+
+    try:
+        report_table = gen_table(reports_path_list=[outputs.reports_dir], add_overall_metric=True)
+        logger.info(f'Overall report table: \n{report_table} \n')
+    except Exception:
+        logger.error('Failed to generate report table.')
+
+    logger.info(f'Finished evaluation for {task_cfg.model_id} on {task_cfg.datasets}')
+    logger.info(f'Output directory: {outputs.outputs_dir}')
+    return eval_results
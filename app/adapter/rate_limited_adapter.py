@@ -0,0 +1,48 @@
+from typing import List, Optional
+
+from app.utils.rate_limiter import SharedRateLimiter, estimate_request_tokens
+
+
+class RateLimitedModelAdapter:
+    """
+    evalscope ServerModelAdapter的限流代理。
+    每次真正发往模型服务的请求都先从端点共享的令牌桶中扣减RPM/TPM配额，结束后按实际token用量修正。
+    """
+
+    def __init__(self, model_adapter, limiter: SharedRateLimiter, endpoint_key: str,
+                 rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self._model_adapter = model_adapter
+        self._limiter = limiter
+        self._endpoint_key = endpoint_key
+        self._rpm = rpm
+        self._tpm = tpm
+
+    def __getattr__(self, name):
+        return getattr(self._model_adapter, name)
+
+    def predict(self, inputs: List[dict], infer_cfg: Optional[dict] = None) -> List[dict]:
+        infer_cfg = infer_cfg or {}
+        return [self.process_single_input(input_item, infer_cfg) for input_item in inputs]
+
+    def process_single_input(self, input_item: dict, infer_cfg: dict) -> dict:
+        request_json = self._model_adapter.make_request(input_item, infer_cfg)
+        return self.send_request(request_json)
+
+    def send_request(self, request_json: dict) -> dict:
+        estimated_tokens = estimate_request_tokens(
+            request_json.get('messages'),
+            request_json.get('max_tokens') or request_json.get('max_new_tokens')
+        )
+        self._limiter.acquire(self._endpoint_key, self._rpm, self._tpm, estimated_tokens)
+        response = self._model_adapter.send_request(request_json)
+        usage = response.get('usage') if isinstance(response, dict) else None
+        if usage and usage.get('total_tokens'):
+            self._limiter.adjust(self._endpoint_key, self._tpm, usage['total_tokens'] - estimated_tokens)
+        return response
+
+
+def rate_limit_judge(judge, limiter: SharedRateLimiter, endpoint_key: str,
+                     rpm: Optional[int] = None, tpm: Optional[int] = None):
+    """为LLMJudge内部的server_adapter接入端点限流"""
+    judge.server_adapter = RateLimitedModelAdapter(judge.server_adapter, limiter, endpoint_key, rpm, tpm)
+    return judge
@@ -0,0 +1,51 @@
+from typing import Any, AsyncGenerator, Dict, Optional, Tuple
+import asyncio
+
+import aiohttp
+from evalscope.perf.arguments import Arguments
+from evalscope.perf.plugin.api.openai_api import OpenaiPlugin
+from evalscope.perf.plugin.registry import register_api
+
+from app.utils.rate_limiter import estimate_request_tokens, get_rate_limiter
+
+# 性能测试子进程内的限流配置，由configure_perf_rate_limit在子进程启动时设置
+_perf_rate_limit: Optional[Dict[str, Any]] = None
+
+
+def configure_perf_rate_limit(db_path: str, endpoint_key: str, rpm: Optional[int], tpm: Optional[int]) -> None:
+    global _perf_rate_limit
+    _perf_rate_limit = {'db_path': db_path, 'endpoint_key': endpoint_key, 'rpm': rpm, 'tpm': tpm}
+
+
+@register_api('openai_rate_limited')
+class RateLimitedOpenaiPlugin(OpenaiPlugin):
+    """在OpenAI接口插件的基础上，按端点共享的令牌桶限制性能测试请求"""
+
+    def __init__(self, param: Arguments):
+        super().__init__(param=param)
+
+    async def process_request(self, client_session: aiohttp.ClientSession, url: str, headers: Dict,
+                              body: Dict) -> AsyncGenerator[Tuple[bool, int, str], None]:
+        if not _perf_rate_limit:
+            async for result in super().process_request(client_session, url, headers, body):
+                yield result
+            return
+
+        limiter = get_rate_limiter(_perf_rate_limit['db_path'])
+        endpoint_key = _perf_rate_limit['endpoint_key']
+        tpm = _perf_rate_limit['tpm']
+        estimated_tokens = estimate_request_tokens(body.get('messages'), body.get('max_tokens'))
+        # 令牌桶基于SQLite的阻塞调用，放到线程池中执行，避免阻塞事件循环
+        await asyncio.get_running_loop().run_in_executor(
+            None, limiter.acquire, endpoint_key, _perf_rate_limit['rpm'], tpm, estimated_tokens
+        )
+
+        total_tokens = None
+        async for result in super().process_request(client_session, url, headers, body):
+            is_error, _, response_data = result
+            if not is_error and isinstance(response_data, dict) and response_data.get('usage'):
+                total_tokens = response_data['usage'].get('total_tokens') or total_tokens
+            yield result
+
+        if total_tokens:
+            limiter.adjust(endpoint_key, tpm, total_tokens - estimated_tokens)
@@ -64,6 +64,70 @@ class Config:
     # 文件大小限制配置
     DATASET_MAX_FILE_SIZE = int(os.environ.get('DATASET_MAX_FILE_SIZE', 50 * 1024 * 1024))  # 50MB
 
+    # 评估任务队列配置
+    EVAL_WORKERS_ENABLED = os.environ.get('EVAL_WORKERS_ENABLED', 'True').lower() == 'true'  # 是否在本进程内启动评估工作线程（使用独立工作进程时设为False）
+    EVAL_WORKER_POOL_SIZE = int(os.environ.get('EVAL_WORKER_POOL_SIZE', 2))  # 每个进程的工作线程数
+    EVAL_MAX_RUNNING_JOBS = int(os.environ.get('EVAL_MAX_RUNNING_JOBS', 4))  # 全局同时运行的评估数
+    EVAL_MAX_JOBS_PER_ENDPOINT = int(os.environ.get('EVAL_MAX_JOBS_PER_ENDPOINT', 1))  # 同一模型端点同时运行的评估数
+    EVAL_JOB_LEASE_SECONDS = int(os.environ.get('EVAL_JOB_LEASE_SECONDS', 120))  # 作业租约时长，超时未续约视为工作进程崩溃
+    EVAL_JOB_MAX_ATTEMPTS = int(os.environ.get('EVAL_JOB_MAX_ATTEMPTS', 3))  # 作业最多被认领的次数
+    EVAL_JOB_POLL_INTERVAL = float(os.environ.get('EVAL_JOB_POLL_INTERVAL', 3))  # 空闲时轮询队列的间隔（秒）
+    EVAL_PREEMPTION_ENABLED = os.environ.get('EVAL_PREEMPTION_ENABLED', 'True').lower() == 'true'  # 交互优先级作业排不上时是否抢占运行中的批量/普通作业
+    EVAL_DEFAULT_JOB_SECONDS = int(os.environ.get('EVAL_DEFAULT_JOB_SECONDS', 600))  # 没有历史作业时估算预计开始时间使用的作业时长（秒）
+    EVAL_MAX_SHARDS_PER_EVALUATION = int(os.environ.get('EVAL_MAX_SHARDS_PER_EVALUATION', 4))  # 评估最多拆分的分片数（按子集拆分，大子集再按样本范围拆分），1表示不拆分
+    MATRIX_MAX_PARALLEL_MODELS = int(os.environ.get('MATRIX_MAX_PARALLEL_MODELS', 4))  # 矩阵评估中同时评估的模型数
+    EVAL_RESULT_INGEST_INTERVAL = float(os.environ.get('EVAL_RESULT_INGEST_INTERVAL', 5))  # 评估运行期间读取新增评审记录的间隔（秒）
+    EVAL_RESULT_INGEST_BATCH_SIZE = int(os.environ.get('EVAL_RESULT_INGEST_BATCH_SIZE', 200))  # 详细结果每批写入的条数
+    EVAL_CANCEL_POLL_INTERVAL = float(os.environ.get('EVAL_CANCEL_POLL_INTERVAL', 2))  # 执行中的评估检查取消请求的间隔（秒）
+
+    # 共享缓存配置（系统模型列表、自定义模板解析结果等）
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'sqlite')  # memory: 进程内; sqlite: 本机所有进程共享; redis: 多机共享
+    CACHE_DB_PATH = os.environ.get('CACHE_DB_PATH') or os.path.join(get_outputs_dir(), '.cache.sqlite3')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))  # 超出后按最近访问时间淘汰
+    CACHE_DEFAULT_TTL = float(os.environ.get('CACHE_DEFAULT_TTL', 3600))  # 未指定过期时间的条目的存活时间（秒）
+    ADAPTER_CACHE_MAX_ENTRIES = int(os.environ.get('ADAPTER_CACHE_MAX_ENTRIES', 64))  # 每个进程缓存的数据集adapter实例数（含已编译的模板）
+
+    # 详细结果浏览配置
+    RESULT_COUNT_RUNNING_TTL = float(os.environ.get('RESULT_COUNT_RUNNING_TTL', 5))  # 执行中的评估的结果计数缓存时间（秒），已结束的评估按结果变化失效
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 500))  # 导出结果时每批从数据库读取和写出的条数
+    EXPORT_XLSX_MAX_ROWS = int(os.environ.get('EXPORT_XLSX_MAX_ROWS', 50000))  # Excel需要在请求中写完整个文件，结果超过该条数时改为流式导出CSV
+
+    # 详细结果搜索配置
+    RESULT_SEARCH_BACKEND = os.environ.get('RESULT_SEARCH_BACKEND', 'auto')  # auto: MySQL上使用ngram全文索引，其他数据库使用本机FTS5索引; fts5: 总是使用FTS5索引
+    RESULT_SEARCH_INDEX_DIR = os.environ.get('RESULT_SEARCH_INDEX_DIR') or os.path.join(get_outputs_dir(), '.search_index')  # FTS5索引文件目录（每个评估一个文件）
+
+    # 自建数据集索引配置
+    DATASET_INDEX_STRIDE = int(os.environ.get('DATASET_INDEX_STRIDE', 1000))  # 每隔多少行记录一个字节偏移，预览翻页最多多读这么多行
+
+    # 进度推送配置（事件通过本机目录中的主题文件在工作进程和Web进程之间传递）
+    PROGRESS_EVENTS_DIR = os.environ.get('PROGRESS_EVENTS_DIR') or os.path.join(get_outputs_dir(), '.progress_events')
+    EVAL_PROGRESS_PUBLISH_INTERVAL = float(os.environ.get('EVAL_PROGRESS_PUBLISH_INTERVAL', 2))  # 执行中的评估发布进度的间隔（秒）
+    PROGRESS_STREAM_KEEPALIVE = float(os.environ.get('PROGRESS_STREAM_KEEPALIVE', 15))  # SSE连接无事件时发送保活注释并核对状态的间隔（秒）
+    PROGRESS_STREAM_MAX_SECONDS = int(os.environ.get('PROGRESS_STREAM_MAX_SECONDS', 300))  # 单个SSE连接的最长时间，到期后浏览器自动重连
+    EVAL_WORKER_PROCESSES = int(os.environ.get('EVAL_WORKER_PROCESSES', 2))  # 独立评估工作进程数（eval_worker.py）
+    EVAL_WORKER_MAX_JOBS_PER_PROCESS = int(os.environ.get('EVAL_WORKER_MAX_JOBS_PER_PROCESS', 10))  # 工作进程执行多少个作业后重启以归还内存
+    EVAL_WORKER_STATUS_FILE = os.environ.get('EVAL_WORKER_STATUS_FILE') or os.path.join(get_outputs_dir(), '.eval_workers.json')
+
+    # 模型回答缓存配置
+    PREDICTION_CACHE_ENABLED = os.environ.get('PREDICTION_CACHE_ENABLED', 'True').lower() == 'true'
+    PREDICTION_CACHE_MAX_ENTRIES = int(os.environ.get('PREDICTION_CACHE_MAX_ENTRIES', 200000))  # 超出后按最近命中时间淘汰
+
+    # 裁判评判结果缓存配置
+    JUDGE_CACHE_ENABLED = os.environ.get('JUDGE_CACHE_ENABLED', 'True').lower() == 'true'
+    JUDGE_CACHE_MAX_ENTRIES = int(os.environ.get('JUDGE_CACHE_MAX_ENTRIES', 500000))  # 超出后按最近命中时间淘汰
+
+    # 自适应并发配置
+    ADAPTIVE_CONCURRENCY_MAX = int(os.environ.get('ADAPTIVE_CONCURRENCY_MAX', 32))  # 生成请求并发上限
+    ADAPTIVE_JUDGE_CONCURRENCY_MAX = int(os.environ.get('ADAPTIVE_JUDGE_CONCURRENCY_MAX', 32))  # 裁判请求并发上限
+
+    # 评估早停配置
+    EVAL_EARLY_STOP_MIN_SAMPLES = int(os.environ.get('EVAL_EARLY_STOP_MIN_SAMPLES', 30))  # 每个数据集至少评估的样本数，避免小样本下区间估计失真
+
+    # 端点限流配置（令牌桶状态保存在本机SQLite文件中，所有进程共享）
+    RATE_LIMIT_DB_PATH = os.environ.get('RATE_LIMIT_DB_PATH') or os.path.join(get_outputs_dir(), '.rate_limit.sqlite3')
+    RATE_LIMIT_CHAT_TIMEOUT = float(os.environ.get('RATE_LIMIT_CHAT_TIMEOUT', 30))  # 对话请求等待配额的最长时间（秒）
+
 
 class DevelopmentConfig(Config):
     """开发环境配置"""
@@ -90,9 +154,22 @@ class ProductionConfig(Config):
     # 生产环境下的静态文件缓存时间
     SEND_FILE_MAX_AGE_DEFAULT = 604800  # 7d
 
+class TestingConfig(Config):
+    """测试环境配置"""
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+
+    # 测试默认使用内存SQLite数据库，不需要MySQL
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+
+    # 测试中不启动评估工作线程，缓存只在进程内
+    EVAL_WORKERS_ENABLED = False
+    CACHE_BACKEND = 'memory'
+
 # 配置映射
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }    
\ No newline at end of file
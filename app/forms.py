@@ -25,6 +25,8 @@ class AIModelForm(FlaskForm):
     provider_name = StringField('提供商名称 (可选)', validators=[Optional(), Length(max=100)])
     system_prompt = TextAreaField('默认系统提示 (可选)', validators=[Optional()])
     default_temperature = FloatField('默认Temperature (0-1, 可选)', validators=[Optional(), NumberRange(min=0.0, max=1.0)])
+    rate_limit_rpm = IntegerField('每分钟请求数上限 RPM (可选)', validators=[Optional(), NumberRange(min=1)])
+    rate_limit_tpm = IntegerField('每分钟Token数上限 TPM (可选)', validators=[Optional(), NumberRange(min=1)])
     notes = TextAreaField('备注 (可选)', validators=[Optional()])
     submit = SubmitField('保存模型')
 
@@ -52,6 +52,8 @@ class AIModel(db.Model):
     system_prompt = db.Column(db.Text, nullable=True, default="You are a helpful assistant.")
     default_temperature = db.Column(db.Float, nullable=True, default=0.7)
     notes = db.Column(db.Text, nullable=True)
+    rate_limit_rpm = db.Column(db.Integer, nullable=True)  # 端点每分钟请求数上限，为空表示不限制
+    rate_limit_tpm = db.Column(db.Integer, nullable=True)  # 端点每分钟token数上限，为空表示不限制
     is_validated = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=get_beijing_time)
     updated_at = db.Column(db.DateTime, default=get_beijing_time, onupdate=get_beijing_time)
@@ -61,6 +63,11 @@ class AIModel(db.Model):
     evaluations = db.relationship('ModelEvaluation', foreign_keys='ModelEvaluation.model_id', back_populates='model', lazy='dynamic')
     judge_evaluations = db.relationship('ModelEvaluation', foreign_keys='ModelEvaluation.judge_model_id', back_populates='judge_model', lazy='dynamic')
 
+    @property
+    def endpoint_key(self):
+        """模型服务端点的唯一标识，同一端点上的调用共享并发和限流配额"""
+        return f"{(self.api_base_url or '').rstrip('/')}|{self.model_identifier}"
+
     def __repr__(self):
         return f'<AIModel {self.display_name} ({self.model_identifier})>'
 
@@ -128,6 +135,10 @@ class Dataset(db.Model):
     format = db.Column(db.String(50), nullable=False, default='QA', server_default='QA')
     jinja2_template = db.Column(LONGTEXT, nullable=True)  # 修改为存储模板内容
     is_active = db.Column(db.Boolean, nullable=False, default=True, server_default='1')
+    # 上传后后台建立索引时统计（系统数据集为空）
+    row_count = db.Column(db.Integer, nullable=True)
+    field_stats = db.Column(db.JSON, nullable=True)  # {字段: {present, non_empty, types, avg_length, max_length, values}}
+    indexed_at = db.Column(db.DateTime, nullable=True)
     
     # 多对多关系到 DatasetCategory
     categories = db.relationship("DatasetCategory", 
@@ -156,20 +167,52 @@ class ModelEvaluation(db.Model):
     top_p = db.Column(db.Float, nullable=True, default=0.8)  # 新增top_p字段
     judge_worker_num = db.Column(db.Integer, nullable=True, default=1)  # 新增并发数字段
     eval_batch_size = db.Column(db.Integer, nullable=True, default=4)  # 新增评估并发数字段
-    status = db.Column(db.String(20), nullable=False, default='pending')
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending/running/completed/failed/cancelled
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)  # 用户已请求取消，执行中的作业检测到后中止
+    priority = db.Column(db.String(20), nullable=False, default='normal')  # 调度优先级: interactive/normal/batch
     created_at = db.Column(db.DateTime, default=get_beijing_time)
     completed_at = db.Column(db.DateTime, nullable=True)
     result_summary = db.Column(db.JSON, nullable=True)
     limit = db.Column(db.Integer, nullable=True)
+    output_dir = db.Column(db.String(500), nullable=True)  # evalscope输出目录，续评时复用
+    use_prediction_cache = db.Column(db.Boolean, nullable=False, default=False)  # 非确定性生成配置下是否复用缓存的模型回答
+    cache_stats = db.Column(db.JSON, nullable=True)  # 缓存命中统计
+    adaptive_concurrency = db.Column(db.Boolean, nullable=False, default=False)  # 是否根据延迟和错误率自动调整并发
+    concurrency_history = db.Column(db.JSON, nullable=True)  # 实际使用的并发随时间的变化，供同一端点的后续评估作为起始并发
+    shard_count = db.Column(db.Integer, nullable=True)  # 按数据集拆分的分片数，为空表示未分片
+    early_stop_margin = db.Column(db.Float, nullable=True)  # 早停目标：置信区间半宽（如0.01表示±1%），为空表示评估全部样本
+    early_stop_confidence = db.Column(db.Float, nullable=True, default=0.95)  # 早停使用的置信水平
+    plan = db.Column(db.JSON, nullable=True)  # 开始执行时计算的评估计划 {"total_prompts": 总样本数, "datasets": {dataset_id: {"subsets": {子集: 样本数}, "total": 样本数}}}
+    dataset_routing = db.Column(db.JSON, nullable=True)  # evalscope结果路由表 {"基准名/子集": dataset_id}，子集为*表示该基准的任意子集
+    matrix_id = db.Column(db.Integer, db.ForeignKey('matrix_evaluation.id', name='fk_evaluation_effectiveness_matrix_id'), nullable=True, index=True)  # 所属的矩阵评估
     user = db.relationship('User', back_populates='evaluation_effectiveness')
     model = db.relationship('AIModel', foreign_keys=[model_id], back_populates='evaluations')
     judge_model = db.relationship('AIModel', foreign_keys=[judge_model_id], back_populates='judge_evaluations')
     datasets = db.relationship('ModelEvaluationDataset', back_populates='evaluation', lazy='dynamic', cascade="all, delete-orphan")
     evaluation_results = db.relationship('ModelEvaluationResult', back_populates='evaluation', lazy='dynamic', cascade="all, delete-orphan")
+    jobs = db.relationship('EvaluationJob', back_populates='evaluation', lazy='dynamic', cascade="all, delete-orphan")
+    matrix = db.relationship('MatrixEvaluation', back_populates='evaluations')
     
     def __repr__(self):
         return f'<ModelEvaluation {self.id} for Model {self.model_id}>'
 
+class MatrixEvaluation(db.Model):
+    """模型×数据集矩阵评估：多个模型在同一组数据集上评估，数据集只加载和渲染一次，结束后生成对比表"""
+    __tablename__ = 'matrix_evaluation'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    name = db.Column(db.String(150), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    comparison = db.Column(db.JSON, nullable=True)  # 对比表: {'datasets': [...], 'rows': [{model_name, scores, average, ...}]}
+    created_at = db.Column(db.DateTime, default=get_beijing_time)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    user = db.relationship('User')
+    evaluations = db.relationship('ModelEvaluation', back_populates='matrix', lazy='dynamic')
+
+    def __repr__(self):
+        return f'<MatrixEvaluation {self.id} ({self.status})>'
+
 class ModelEvaluationDataset(db.Model):
     """模型评估中使用的数据集"""
     __tablename__ = 'evaluation_effectiveness_dataset'
@@ -195,6 +238,13 @@ class ModelEvaluationResult(db.Model):
     model_answer = db.Column(db.Text, nullable=False)
     score = db.Column(db.Float, nullable=True)
     feedback = db.Column(db.Text, nullable=True)
+    raw_input_json = db.Column(db.Text, nullable=True)  # 规范化的原始输入（紧凑JSON）
+    rendered_prompt = db.Column(db.Text, nullable=True)  # 入库时渲染好的完整userPrompt，为空时查看结果时现场渲染
+    shard_index = db.Column(db.Integer, nullable=True)  # 写入该结果的分片序号，分片重试时只清理自己写入的结果
+    __table_args__ = (
+        db.Index('idx_eval_result_evaluation_id', 'evaluation_id', 'id'),  # 按评估键集分页
+        db.Index('idx_eval_result_evaluation_score', 'evaluation_id', 'score', 'id'),  # 分数范围筛选和计数
+    )
     
     evaluation = db.relationship('ModelEvaluation', back_populates='evaluation_results')
     dataset = db.relationship('Dataset', backref=db.backref('evaluation_results', lazy='dynamic'))  # 添加与Dataset的关系
@@ -202,6 +252,79 @@ class ModelEvaluationResult(db.Model):
     def __repr__(self):
         return f'<ModelEvaluationResult {self.id} for Evaluation {self.evaluation_id}>' 
 
+class EvaluationJob(db.Model):
+    """评估任务队列中的作业，生命周期: pending -> claimed -> running -> completed/failed/cancelled，被抢占时回到pending"""
+    __tablename__ = 'evaluation_job'
+    id = db.Column(db.Integer, primary_key=True)
+    evaluation_id = db.Column(db.Integer, db.ForeignKey('evaluation_effectiveness.id'), nullable=False, index=True)
+    # 被评估模型的服务端点（api_base_url + model_identifier），用于按端点限制并发
+    endpoint_key = db.Column(db.String(400), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)  # pending/claimed/running/completed/failed/cancelled
+    worker_id = db.Column(db.String(100), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)  # 租约到期后作业会被回收重新排队
+    error_message = db.Column(db.Text, nullable=True)
+    shard_index = db.Column(db.Integer, nullable=True)  # 分片序号，为空表示作业执行整个评估
+    shard_dataset_ids = db.Column(db.JSON, nullable=True)  # 分片负责的数据集ID列表
+    shard_subsets = db.Column(db.JSON, nullable=True)  # 分片负责的子集和样本范围 {dataset_id: {子集: [起, 止) 或null表示整个子集} 或null表示整个数据集}
+    shard_result = db.Column(db.JSON, nullable=True)  # 分片完成后的报告、缓存统计和并发记录，全部分片完成后合并
+    matrix_id = db.Column(db.Integer, db.ForeignKey('matrix_evaluation.id', name='fk_evaluation_job_matrix_id'), nullable=True)  # 矩阵评估作业，evaluation_id为其中第一个评估
+    priority = db.Column(db.String(20), nullable=False, default='normal', index=True)  # 入队时取自评估的优先级
+    preempt_requested = db.Column(db.Boolean, nullable=False, default=False)  # 被更高优先级作业抢占，执行中的作业停止发出新请求后重新排队
+    created_at = db.Column(db.DateTime, default=get_beijing_time)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    evaluation = db.relationship('ModelEvaluation', back_populates='jobs')
+
+    def __repr__(self):
+        return f'<EvaluationJob {self.id} for Evaluation {self.evaluation_id} ({self.status})>'
+
+class ReviewProgressCursor(db.Model):
+    """评估进度统计在review文件上的读取位置，所有Web进程共享，每次轮询只扫描新追加的内容"""
+    __tablename__ = 'review_progress_cursor'
+    __table_args__ = (db.UniqueConstraint('evaluation_id', 'file_key', name='uq_review_progress_cursor_file'),)
+    id = db.Column(db.Integer, primary_key=True)
+    evaluation_id = db.Column(db.Integer, db.ForeignKey('evaluation_effectiveness.id'), nullable=False, index=True)
+    file_key = db.Column(db.String(64), nullable=False)  # review文件路径的sha256
+    file_path = db.Column(db.String(1000), nullable=False)
+    inode = db.Column(db.BigInteger, nullable=False)  # 文件被替换（续评重建）时inode变化，从头重新统计
+    byte_offset = db.Column(db.BigInteger, nullable=False, default=0)  # 已统计到的位置，总在完整行的末尾
+    line_count = db.Column(db.Integer, nullable=False, default=0)  # byte_offset之前的非空行数
+    updated_at = db.Column(db.DateTime, default=get_beijing_time, onupdate=get_beijing_time)
+
+    def __repr__(self):
+        return f'<ReviewProgressCursor {self.file_path} @{self.byte_offset} ({self.line_count})>'
+
+class PredictionCache(db.Model):
+    """模型回答缓存，按模型端点、生成参数和渲染后的请求内容寻址，跨评估任务复用"""
+    __tablename__ = 'prediction_cache'
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(64), nullable=False, unique=True, index=True)  # 请求内容的sha256
+    model_identifier = db.Column(db.String(200), nullable=True)
+    response = db.Column(db.JSON, nullable=False)
+    hit_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=get_beijing_time)
+    last_hit_at = db.Column(db.DateTime, default=get_beijing_time, index=True)  # LRU淘汰依据
+
+    def __repr__(self):
+        return f'<PredictionCache {self.cache_key[:12]} ({self.model_identifier})>'
+
+class JudgeCache(db.Model):
+    """裁判模型评判结果缓存，按裁判模型、系统提示词和渲染后的评判提示词寻址，跨评估任务复用"""
+    __tablename__ = 'judge_cache'
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(64), nullable=False, unique=True, index=True)
+    judge_model_identifier = db.Column(db.String(200), nullable=True)
+    verdict = db.Column(db.Text, nullable=False)  # 裁判模型的原始回复
+    hit_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=get_beijing_time)
+    last_hit_at = db.Column(db.DateTime, default=get_beijing_time, index=True)
+
+    def __repr__(self):
+        return f'<JudgeCache {self.cache_key[:12]} ({self.judge_model_identifier})>'
+
 # 新增：模型性能评估任务模型
 class PerformanceEvalTask(db.Model):
     __tablename__ = 'model_efficiency'
@@ -235,6 +358,28 @@ class PerformanceEvalTask(db.Model):
     def __repr__(self):
         return f'<PerformanceEvalTask {self.id} for model {self.model_name} on dataset {self.dataset_name}>'
 
+# migrations中的基线版本，对应引入迁移之前由db.create_all()建出的表结构
+SCHEMA_BASELINE_REVISION = '2ee3e22aabbc'
+
+def upgrade_database_schema():
+    """
+    建表或把已有数据库升级到最新的表结构：空库用db.create_all()建表后标记为最新版本；
+    引入迁移之前部署的库没有版本记录，先标记为基线版本，再和其余已有库一样执行migrations中的迁移。
+    """
+    from app import db
+    from flask_migrate import stamp, upgrade
+    from sqlalchemy import inspect
+
+    existing_tables = set(inspect(db.engine).get_table_names())
+    if not existing_tables:
+        db.create_all()
+        stamp()
+        return
+    if 'alembic_version' not in existing_tables:
+        current_app.logger.info(f"数据库没有迁移版本记录，标记为基线版本 {SCHEMA_BASELINE_REVISION} 后执行迁移")
+        stamp(revision=SCHEMA_BASELINE_REVISION)
+    upgrade()
+
 def init_database_data():
     """
     初始化数据库数据
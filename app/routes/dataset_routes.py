@@ -4,6 +4,8 @@ from app import db # 数据库实例
 from app.models import Dataset, DatasetCategory # 数据模型
 from app.forms import CustomDatasetForm # Import the new form
 from app.services.dataset_service import DatasetService
+from app.services.dataset_index_service import DatasetIndexService
+from app.services.evaluation_service import EvaluationService
 import json # For parsing sample_data_json
 import os # For os.path.join
 from werkzeug.utils import secure_filename # For secure filenames
@@ -235,6 +237,8 @@ def add_custom_dataset():
             )
             db.session.add(new_dataset)
             db.session.commit()
+            # 后台统计行数、建立行偏移索引，预览翻页时直接定位
+            DatasetIndexService.build_index_async(current_app._get_current_object(), new_dataset.id, file_path)
             flash(f'自定义数据集 " {new_dataset.name} " 已成功添加!', 'success')
             return redirect(url_for('datasets.datasets_list'))
         except ValueError as ve:
@@ -464,6 +468,7 @@ def delete_dataset(dataset_id):
         if dataset.download_url and os.path.exists(dataset.download_url):
             try:
                 os.remove(dataset.download_url)
+                DatasetIndexService.remove_index(dataset.download_url)
                 current_app.logger.info(f"已删除数据集文件: {dataset.download_url}")
             except Exception as file_error:
                 current_app.logger.warning(f"删除数据集文件失败: {file_error}")
@@ -474,6 +479,7 @@ def delete_dataset(dataset_id):
         # 删除数据库记录
         db.session.delete(dataset)
         db.session.commit()
+        EvaluationService.invalidate_adapter_cache(dataset_id)
         
         return jsonify({
             'success': True,
@@ -1,9 +1,15 @@
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, current_app, abort, make_response
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, current_app, abort, Response, send_file, stream_with_context
 from flask_login import login_required, current_user
 from app import db
-from app.models import AIModel, Dataset, ModelEvaluationResult, ModelEvaluationDataset
+from app.models import AIModel, Dataset, ModelEvaluation, ModelEvaluationResult, ModelEvaluationDataset, EvaluationJob, ReviewProgressCursor
 from app.services.evaluation_service import EvaluationService
+from app.services.progress_stream_service import EVALUATION_TERMINAL_STATUSES, ProgressStreamService
+from app.services.result_export_service import EXPORT_FORMATS, ResultExportService
+from app.services.result_search_service import ResultSearchService
+from app.services.evaluation_process_pool import get_worker_process_status
+from app.services.evaluation_queue_service import EvaluationQueueService, PRIORITY_WEIGHTS, DEFAULT_PRIORITY
 import json
+import os
 from math import ceil # 用于分页计算
 from sqlalchemy import or_, and_
 from datetime import datetime
@@ -21,6 +27,11 @@ def evaluations_list():
     
     # 计算总页数
     total_pages = (total + per_page - 1) // per_page if total > 0 else 0
+
+    # 排队中评估的队列位置和预计开始时间
+    queue_estimates = EvaluationQueueService.get_queue_estimates(
+        [evaluation.id for evaluation in evaluations if evaluation.status == 'pending']
+    )
     
     return render_template(
         'evaluations/evaluations_list.html',
@@ -29,132 +40,160 @@ def evaluations_list():
         page=page,
         per_page=per_page,
         total_pages=total_pages,
+        matrices=EvaluationService.get_matrices_for_user(current_user.id),
+        queue_estimates=queue_estimates,
         title="模型评估历史"
     )
 
+def _get_evaluation_form_options():
+    """创建评估页面所需的模型和数据集选项"""
+    # 获取用户可用的自定义模型列表 (被评估模型)
+    # 移除is_validated限制，允许用户评估自己的所有自定义模型
+    custom_models = AIModel.query.filter_by(is_system_model=False, user_id=current_user.id).order_by(AIModel.display_name.asc()).all()
+    
+    # 调试信息
+    current_app.logger.info(f"用户 {current_user.username} 的自定义模型数量: {len(custom_models)}")
+    for model in custom_models:
+        current_app.logger.info(f"模型: {model.display_name}, 验证状态: {model.is_validated}")
+    
+    # 获取系统内置模型列表 (裁判模型)
+    system_models = AIModel.query.filter_by(is_system_model=True).order_by(AIModel.display_name.asc()).all()
+    current_app.logger.info(f"系统模型数量: {len(system_models)}")
+
+    all_models = list(system_models)
+    all_models.extend(custom_models)
+    
+    # 获取已启用的数据集列表 - 修复权限问题
+    # 1. 自己创建的所有数据集（无论是否公开）
+    # 2. 别人创建的公开数据集
+    datasets = Dataset.query.filter(
+        Dataset.is_active == True
+    ).filter(
+        or_(
+            # 自己创建的所有数据集
+            Dataset.source == current_user.username,
+            # 别人创建的公开数据集
+            and_(
+                Dataset.source != current_user.username,
+                Dataset.visibility == '公开'
+            ),
+            # 系统数据集（source为空或为'系统'）
+            or_(
+                Dataset.source.is_(None),
+                Dataset.source == '系统'
+            )
+        )
+    ).order_by(Dataset.id.desc()).all()
+
+    return dict(
+        custom_models=custom_models,
+        system_models=system_models,
+        all_models=all_models,
+        datasets=datasets
+    )
+
+def _parse_evaluation_form(model_ids):
+    """
+    解析并校验创建评估表单中的公共参数（模型权限、数据集、裁判模型、生成参数）
+
+    Returns:
+        Tuple[dict, str]: (create_evaluation的参数, 错误信息)，校验失败时参数为None
+    """
+    judge_model_id = request.form.get('judge_model_id', type=int, default=None)
+    judge_model = None if judge_model_id is None else AIModel.query.get(judge_model_id)
+
+    for model_id in model_ids:
+        target_model = AIModel.query.get(model_id)
+        if not target_model:
+            return None, '所选模型不存在。'
+        # 检查用户对被评估模型的权限 (必须是用户的自定义模型)
+        if target_model.is_system_model or target_model.user_id != current_user.id:
+            return None, '您只能选择自己的自定义模型进行评估。'
+        
+    # 获取选择的数据集 (不再需要子集和分割)
+    datasets_data = []
+    selected_dataset_ids = []
+    for key in request.form:
+        if key.startswith('dataset_'):
+            dataset_id = int(key.split('_')[1])
+            selected_dataset_ids.append(dataset_id)
+    
+    if not selected_dataset_ids:
+        return None, '请至少选择一个数据集。'
+    
+    # 验证所选数据集是否存在且已启用
+    for ds_id in selected_dataset_ids:
+        dataset = Dataset.query.filter_by(id=ds_id, is_active=True).first()
+        if not dataset:
+            return None, f'选择的数据集ID {ds_id} 无效或未启用。'
+        datasets_data.append({'dataset_id': ds_id}) # 只传递 dataset_id
+    
+        # 判断选择的数据集是否需要裁判模型
+        adapter = EvaluationService.get_adapter_for_dataset(dataset.id)
+        use_llm = False
+        if adapter:
+            use_llm = adapter.llm_as_a_judge
+        if use_llm and not judge_model:
+            return None, f'选择的数据集{dataset.name}需要裁判模型，请选择裁判模型。'
+
+    # 早停目标为置信区间半宽，留空表示评估全部样本
+    early_stop_margin = request.form.get('early_stop_margin', type=float, default=None)
+    if early_stop_margin is not None and early_stop_margin <= 0:
+        early_stop_margin = None
+    if early_stop_margin is not None and early_stop_margin >= 0.5:
+        return None, '早停目标置信区间半宽需小于0.5，例如0.01表示±1%。'
+    early_stop_confidence = request.form.get('early_stop_confidence', type=float, default=0.95)
+    if early_stop_confidence not in (0.9, 0.95, 0.99):
+        early_stop_confidence = 0.95
+    priority = request.form.get('priority', DEFAULT_PRIORITY)
+    if priority not in PRIORITY_WEIGHTS:
+        priority = DEFAULT_PRIORITY
+
+    # TODO 如果数据集中需要jinja2模板但是没配置需要提醒
+    return dict(
+        judge_model_id=judge_model_id,
+        datasets=datasets_data, # 传递简化的数据集信息
+        temperature=request.form.get('temperature', type=float, default=0.7),
+        max_tokens=request.form.get('max_tokens', type=int, default=2048),
+        top_k=request.form.get('top_k', type=int, default=20),  # 新增top_k
+        top_p=request.form.get('top_p', type=float, default=0.8),  # 新增top_p
+        judge_worker_num=request.form.get('judge_worker_num', type=int, default=1),  # 新增并发数
+        eval_batch_size=request.form.get('eval_batch_size', type=int, default=4),  # 新增评估并发数
+        name=request.form.get('evaluation_name', ''),
+        limit=request.form.get('limit', type=int, default=None),
+        use_prediction_cache=request.form.get('use_prediction_cache') == 'on',
+        adaptive_concurrency=request.form.get('adaptive_concurrency') == 'on',
+        early_stop_margin=early_stop_margin,
+        early_stop_confidence=early_stop_confidence,
+        priority=priority
+    ), None
+
 @bp.route('/create', methods=['GET', 'POST'])
 @login_required
 def create_evaluation():
     """创建模型评估页面"""
     if request.method == 'GET':
-        # 获取用户可用的自定义模型列表 (被评估模型)
-        # 移除is_validated限制，允许用户评估自己的所有自定义模型
-        custom_models = AIModel.query.filter_by(is_system_model=False, user_id=current_user.id).order_by(AIModel.display_name.asc()).all()
-        
-        # 调试信息
-        current_app.logger.info(f"用户 {current_user.username} 的自定义模型数量: {len(custom_models)}")
-        for model in custom_models:
-            current_app.logger.info(f"模型: {model.display_name}, 验证状态: {model.is_validated}")
-        
-        # 获取系统内置模型列表 (裁判模型)
-        system_models = AIModel.query.filter_by(is_system_model=True).order_by(AIModel.display_name.asc()).all()
-        current_app.logger.info(f"系统模型数量: {len(system_models)}")
-
-        all_models = system_models
-        all_models.extend(custom_models)
-        
-        # 获取已启用的数据集列表 - 修复权限问题
-        # 1. 自己创建的所有数据集（无论是否公开）
-        # 2. 别人创建的公开数据集
-        datasets = Dataset.query.filter(
-            Dataset.is_active == True
-        ).filter(
-            or_(
-                # 自己创建的所有数据集
-                Dataset.source == current_user.username,
-                # 别人创建的公开数据集
-                and_(
-                    Dataset.source != current_user.username,
-                    Dataset.visibility == '公开'
-                ),
-                # 系统数据集（source为空或为'系统'）
-                or_(
-                    Dataset.source.is_(None),
-                    Dataset.source == '系统'
-                )
-            )
-        ).order_by(Dataset.id.desc()).all()
-        
         return render_template(
             'evaluations/create_evaluation.html',
-            custom_models=custom_models,
-            system_models=system_models,
-            all_models=all_models,
-            datasets=datasets,
-            title="创建模型评估"
+            matrix_mode=False,
+            title="创建模型评估",
+            **_get_evaluation_form_options()
         )
     
     elif request.method == 'POST':
         try:
             # 获取表单数据
             model_id = request.form.get('model_id', type=int)
-            judge_model_id = request.form.get('judge_model_id', type=int, default=None)
-            temperature = request.form.get('temperature', type=float, default=0.7)
-            max_tokens = request.form.get('max_tokens', type=int, default=2048)
-            top_k = request.form.get('top_k', type=int, default=20)  # 新增top_k
-            top_p = request.form.get('top_p', type=float, default=0.8)  # 新增top_p
-            judge_worker_num = request.form.get('judge_worker_num', type=int, default=1)  # 新增并发数
-            eval_batch_size = request.form.get('eval_batch_size', type=int, default=4)  # 新增评估并发数
-            evaluation_name = request.form.get('evaluation_name', '')
-            limit = request.form.get('limit', type=int, default=None)
-            
-            # 验证模型权限
-            target_model = AIModel.query.get(model_id)
-            judge_model = None if judge_model_id is None else AIModel.query.get(judge_model_id)
-            
-            if not target_model:
-                flash('所选模型不存在。', 'error')
-                return redirect(url_for('evaluations.create_evaluation'))
-            
-            # 检查用户对被评估模型的权限 (必须是用户的自定义模型)
-            if target_model.is_system_model or target_model.user_id != current_user.id:
-                flash('您只能选择自己的自定义模型进行评估。', 'error')
+            params, error_message = _parse_evaluation_form([model_id])
+            if error_message:
+                flash(error_message, 'error')
                 return redirect(url_for('evaluations.create_evaluation'))
-                
-            # 获取选择的数据集 (不再需要子集和分割)
-            datasets_data = []
-            selected_dataset_ids = []
-            for key in request.form:
-                if key.startswith('dataset_'):
-                    dataset_id = int(key.split('_')[1])
-                    selected_dataset_ids.append(dataset_id)
-            
-            if not selected_dataset_ids:
-                flash('请至少选择一个数据集。', 'error')
-                return redirect(url_for('evaluations.create_evaluation'))
-            
-            # 验证所选数据集是否存在且已启用
-            for ds_id in selected_dataset_ids:
-                dataset = Dataset.query.filter_by(id=ds_id, is_active=True).first()
-                if not dataset:
-                    flash(f'选择的数据集ID {ds_id} 无效或未启用。', 'error')
-                    return redirect(url_for('evaluations.create_evaluation'))
-                datasets_data.append({'dataset_id': ds_id}) # 只传递 dataset_id
-            
-                # 判断选择的数据集是否需要裁判模型
-                adapter = EvaluationService.get_adapter_for_dataset(dataset.id)
-                use_llm = False
-                if adapter:
-                    use_llm = adapter.llm_as_a_judge
-                if use_llm and not judge_model:
-                    flash(f'选择的数据集{dataset.name}需要裁判模型，请选择裁判模型。', 'error')
-                    return redirect(url_for('evaluations.create_evaluation'))
-
-            # TODO 如果数据集中需要jinja2模板但是没配置需要提醒
+
             # 创建评估任务
             evaluation = EvaluationService.create_evaluation(
                 user_id=current_user.id,
                 model_id=model_id,
-                judge_model_id=judge_model_id,
-                datasets=datasets_data, # 传递简化的数据集信息
-                temperature=temperature,
-                max_tokens=max_tokens,
-                top_k=top_k,
-                top_p=top_p,
-                judge_worker_num=judge_worker_num,  # 传递并发数
-                eval_batch_size=eval_batch_size,
-                name=evaluation_name,
-                limit=limit
+                **params
             )
             
             if evaluation:
@@ -169,6 +208,60 @@ def create_evaluation():
             flash(f'创建评估任务时发生错误: {str(e)}', 'error')
             return redirect(url_for('evaluations.create_evaluation'))
 
+@bp.route('/matrix/create', methods=['GET', 'POST'])
+@login_required
+def create_matrix_evaluation():
+    """创建模型×数据集矩阵评估页面"""
+    if request.method == 'GET':
+        return render_template(
+            'evaluations/create_evaluation.html',
+            matrix_mode=True,
+            title="创建矩阵评估",
+            **_get_evaluation_form_options()
+        )
+
+    try:
+        model_ids = list(dict.fromkeys(request.form.getlist('model_ids', type=int)))
+        if len(model_ids) < 2:
+            flash('矩阵评估请至少选择两个模型。', 'error')
+            return redirect(url_for('evaluations.create_matrix_evaluation'))
+        params, error_message = _parse_evaluation_form(model_ids)
+        if error_message:
+            flash(error_message, 'error')
+            return redirect(url_for('evaluations.create_matrix_evaluation'))
+
+        matrix = EvaluationService.create_matrix_evaluation(
+            user_id=current_user.id,
+            model_ids=model_ids,
+            **params
+        )
+        if matrix:
+            flash('矩阵评估创建成功，正在后台处理...', 'success')
+            return redirect(url_for('evaluations.view_matrix_evaluation', matrix_id=matrix.id))
+        flash('创建矩阵评估失败。', 'error')
+        return redirect(url_for('evaluations.create_matrix_evaluation'))
+
+    except Exception as e:
+        current_app.logger.error(f"创建矩阵评估失败: {str(e)}")
+        flash(f'创建矩阵评估时发生错误: {str(e)}', 'error')
+        return redirect(url_for('evaluations.create_matrix_evaluation'))
+
+@bp.route('/matrix/<int:matrix_id>')
+@login_required
+def view_matrix_evaluation(matrix_id):
+    """查看矩阵评估的对比表"""
+    matrix = EvaluationService.get_matrix_by_id(matrix_id, current_user.id)
+    if not matrix:
+        flash('矩阵评估不存在或您无权访问。', 'error')
+        return redirect(url_for('evaluations.evaluations_list'))
+
+    return render_template(
+        'evaluations/view_matrix.html',
+        matrix=matrix,
+        evaluations=matrix.evaluations.order_by(ModelEvaluation.id.asc()).all(),
+        title=f"矩阵评估: {matrix.name}"
+    )
+
 @bp.route('/<int:evaluation_id>')
 @login_required
 def view_evaluation(evaluation_id):
@@ -244,6 +337,41 @@ def api_evaluation_progress(evaluation_id):
     
     return jsonify(progress_info)
 
+@bp.route('/api/stream/<int:evaluation_id>')
+@login_required
+def api_evaluation_stream(evaluation_id):
+    """API端点: 以SSE推送评估进度（已完成/总数、当前数据集、吞吐量、预计剩余时间）和状态变化"""
+    evaluation = EvaluationService.get_evaluation_by_id(evaluation_id, current_user.id)
+    if not evaluation:
+        return jsonify({"error": "评估不存在或您无权访问"}), 404
+
+    # 连接建立时发送一次当前进度，之后的进度由执行评估的工作进程推送
+    snapshot = {"status": evaluation.status}
+    if evaluation.status == 'running':
+        snapshot = EvaluationService.get_evaluation_progress(evaluation_id, current_user.id)
+        if "error" in snapshot:
+            snapshot = {"status": evaluation.status}
+
+    def load_status():
+        return db.session.query(ModelEvaluation.status).filter(ModelEvaluation.id == evaluation_id).scalar()
+
+    return Response(
+        stream_with_context(ProgressStreamService.stream(
+            ProgressStreamService.evaluation_topic(evaluation_id), snapshot, load_status, EVALUATION_TERMINAL_STATUSES
+        )),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@bp.route('/api/workers')
+@login_required
+def api_evaluation_workers():
+    """API端点: 获取评估工作进程状态"""
+    status = get_worker_process_status()
+    if not status:
+        return jsonify({"error": "评估工作进程未运行"}), 404
+    return jsonify(status)
+
 @bp.route('/<int:evaluation_id>/delete', methods=['POST'])
 @login_required
 def delete_evaluation(evaluation_id):
@@ -261,9 +389,17 @@ def delete_evaluation(evaluation_id):
         # 删除评估数据集关联 (ModelEvaluationDataset 记录)
         ModelEvaluationDataset.query.filter_by(evaluation_id=evaluation_id).delete()
         
+        # 删除评估队列中的作业
+        EvaluationJob.query.filter_by(evaluation_id=evaluation_id).delete()
+        
+        # 删除进度统计的读取位置
+        ReviewProgressCursor.query.filter_by(evaluation_id=evaluation_id).delete()
+        
         # 删除评估记录
         db.session.delete(evaluation)
         db.session.commit()
+        ProgressStreamService.remove_topic(ProgressStreamService.evaluation_topic(evaluation_id))
+        ResultSearchService.remove_index(evaluation_id)
         
         flash('评估已成功删除。', 'success')
     except Exception as e:
@@ -273,6 +409,22 @@ def delete_evaluation(evaluation_id):
     
     return redirect(url_for('evaluations.evaluations_list'))
 
+@bp.route('/<int:evaluation_id>/resume', methods=['POST'])
+@login_required
+def resume_evaluation(evaluation_id):
+    """从上次完成的样本继续执行中断或失败的评估"""
+    success, message = EvaluationService.resume_evaluation(evaluation_id, current_user.id)
+    flash(message, 'success' if success else 'error')
+    return redirect(url_for('evaluations.view_evaluation', evaluation_id=evaluation_id))
+
+@bp.route('/<int:evaluation_id>/cancel', methods=['POST'])
+@login_required
+def cancel_evaluation(evaluation_id):
+    """取消排队中或执行中的评估，已完成样本的结果会保留"""
+    success, message = EvaluationService.cancel_evaluation(evaluation_id, current_user.id)
+    flash(message, 'success' if success else 'error')
+    return redirect(url_for('evaluations.view_evaluation', evaluation_id=evaluation_id))
+
 @bp.route('/<int:evaluation_id>/results', methods=['GET'])
 @login_required
 def view_detailed_results(evaluation_id):
@@ -281,15 +433,19 @@ def view_detailed_results(evaluation_id):
         current_app.logger.warning(f"用户 {current_user.id} 尝试访问不存在的评估 {evaluation_id} 的详细结果。")
         abort(404)
 
-    if evaluation.status != 'completed':
+    # 详细结果在评估运行期间增量入库，运行中即可浏览已完成的样本
+    if evaluation.status not in ('completed', 'running', 'cancelled'):
         current_app.logger.info(f"用户 {current_user.id} 尝试访问评估 {evaluation_id} 的详细结果，但评估状态为 {evaluation.status}。")
-        flash('详细结果仅在评估成功完成后可用。', 'warning')
+        flash('详细结果在评估运行中或成功完成后可用。', 'warning')
         return redirect(url_for('evaluations.view_evaluation', evaluation_id=evaluation_id))
 
     page = request.args.get('page', 1, type=int)
     search_query = request.args.get('search_query', None, type=str)
     min_score = request.args.get('min_score', None, type=float)
     max_score = request.args.get('max_score', None, type=float)
+    # 相邻翻页时带上当前页边界的结果ID，按ID定位而不是按偏移
+    after_id = request.args.get('after_id', None, type=int)
+    before_id = request.args.get('before_id', None, type=int)
     # 从配置或默认设置每页项目数
     per_page = current_app.config.get('RESULTS_PER_PAGE', 10) 
 
@@ -300,7 +456,9 @@ def view_detailed_results(evaluation_id):
         per_page=per_page,
         search_query=search_query,
         min_score=min_score,
-        max_score=max_score
+        max_score=max_score,
+        after_id=after_id,
+        before_id=before_id
     )
     
     if page < 1: # 确保页码至少为1
@@ -327,13 +485,16 @@ def view_detailed_results(evaluation_id):
         search_query=search_query,
         min_score=min_score,
         max_score=max_score,
-        total_results=total_results 
+        total_results=total_results,
+        # 搜索结果按相关度排序，不能按ID定位
+        prev_cursor=results[0].id if results and not search_query else None,
+        next_cursor=results[-1].id if results and not search_query else None
     )
 
 @bp.route('/export/<int:evaluation_id>', methods=['GET'])
 @login_required
 def export_to_excel(evaluation_id):
-    """导出评估结果到Excel"""
+    """导出评估结果（format: xlsx/csv/jsonl/parquet）。默认Excel，结果超过EXPORT_XLSX_MAX_ROWS条时改为流式导出CSV"""
     evaluation = EvaluationService.get_evaluation_by_id(evaluation_id, current_user.id)
     
     if not evaluation:
@@ -344,37 +505,47 @@ def export_to_excel(evaluation_id):
         flash('评估结果仅在评估成功完成后可用。', 'warning')
         return redirect(url_for('evaluations.view_evaluation', evaluation_id=evaluation_id))
 
+    export_format = request.args.get('format', 'xlsx', type=str).lower()
+    if export_format not in EXPORT_FORMATS:
+        flash(f'不支持的导出格式: {export_format}', 'error')
+        return redirect(url_for('evaluations.view_detailed_results', evaluation_id=evaluation_id))
+
     try:
         # 获取筛选参数
         search_query = request.args.get('search_query', None, type=str)
         min_score = request.args.get('min_score', None, type=float)
         max_score = request.args.get('max_score', None, type=float)
         
-        # 导出Excel
-        excel_data = EvaluationService.export_evaluation_results_to_excel(
-            evaluation_id=evaluation_id,
-            user_id=current_user.id,
-            search_query=search_query,
-            min_score=min_score,
-            max_score=max_score
-        )
-        
-        if not excel_data:
+        total_results = ResultExportService.count_results(evaluation, search_query, min_score, max_score)
+        if not total_results:
             flash('没有找到符合条件的评估结果。', 'warning')
             return redirect(url_for('evaluations.view_detailed_results', evaluation_id=evaluation_id))
+
+        xlsx_max_rows = current_app.config.get('EXPORT_XLSX_MAX_ROWS', 50000)
+        if export_format == 'xlsx' and total_results > xlsx_max_rows:
+            # Excel文件写完才能发送，大结果集会超出请求超时，改为边生成边发送的CSV
+            current_app.logger.info(f"评估 {evaluation_id} 导出 {total_results} 条结果，超过Excel导出上限 {xlsx_max_rows}，改为CSV格式")
+            export_format = 'csv'
         
         # 生成安全的文件名，只使用ASCII字符
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"evaluation_{evaluation_id}_{timestamp}.xlsx"
-        
-        # 创建响应，使用ASCII编码的文件名
-        response = make_response(excel_data)
-        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
-        response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        filename = f"evaluation_{evaluation_id}_{timestamp}.{export_format}"
+        mimetype, streaming = EXPORT_FORMATS[export_format]
+        rows = ResultExportService.iter_rows(evaluation_id, search_query, min_score, max_score)
         
+        if streaming:
+            # 边查询边发送，不在内存中拼出完整文件
+            response = Response(stream_with_context(ResultExportService.stream(export_format, rows)), mimetype=mimetype)
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+            response.headers['X-Accel-Buffering'] = 'no'
+            return response
+
+        file_path = ResultExportService.write_file(export_format, rows)
+        response = send_file(file_path, mimetype=mimetype, as_attachment=True, download_name=filename)
+        response.call_on_close(lambda: os.remove(file_path))
         return response
         
     except Exception as e:
-        current_app.logger.error(f"导出评估结果到Excel失败: {str(e)}")
-        flash(f'导出评估结果到Excel时发生错误: {str(e)}', 'error')
-        return redirect(url_for('evaluations.view_detailed_results', evaluation_id=evaluation_id)) 
\ No newline at end of file
+        current_app.logger.error(f"导出评估结果失败: {str(e)}")
+        flash(f'导出评估结果时发生错误: {str(e)}', 'error')
+        return redirect(url_for('evaluations.view_detailed_results', evaluation_id=evaluation_id))
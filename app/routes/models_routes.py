@@ -29,6 +29,8 @@ def create_model():
             "provider_name": form.provider_name.data,
             "system_prompt": form.system_prompt.data,
             "default_temperature": form.default_temperature.data,
+            "rate_limit_rpm": form.rate_limit_rpm.data,
+            "rate_limit_tpm": form.rate_limit_tpm.data,
             "notes": form.notes.data,
             "model_type": "openai_compatible" # Or get from form if added
         }
@@ -66,6 +68,8 @@ def edit_model(model_id):
             "provider_name": form.provider_name.data,
             "system_prompt": form.system_prompt.data,
             "default_temperature": form.default_temperature.data,
+            "rate_limit_rpm": form.rate_limit_rpm.data,
+            "rate_limit_tpm": form.rate_limit_tpm.data,
             "notes": form.notes.data,
             "model_type": model.model_type, # Keep original type or allow change via form
             "api_key": form.api_key.data # 始终包含API Key，因为现在会回填显示
@@ -82,6 +86,8 @@ def edit_model(model_id):
         form.provider_name.data = model.provider_name
         form.system_prompt.data = model.system_prompt
         form.default_temperature.data = model.default_temperature
+        form.rate_limit_rpm.data = model.rate_limit_rpm
+        form.rate_limit_tpm.data = model.rate_limit_tpm
         form.notes.data = model.notes
         # API key field is intentionally left blank for security. User must re-enter if changing.
 
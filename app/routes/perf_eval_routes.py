@@ -1,9 +1,10 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
 from app import db
 from app.models import PerformanceEvalTask, AIModel, Dataset
 from app.forms import PerformanceEvalForm
 from app.services.perf_service import PerformanceEvaluationService
+from app.services.progress_stream_service import PERF_TERMINAL_STATUSES, ProgressStreamService
 from sqlalchemy import and_, or_
 
 perf_eval_bp = Blueprint('perf_eval', __name__, url_prefix='/perf_eval')
@@ -114,6 +115,25 @@ def results(task_id):
                          percentile_explanations=percentile_explanations,
                          title=f"性能评估结果 - 任务 {task_id}")
 
+@perf_eval_bp.route('/api/stream/<int:task_id>')
+@login_required
+def stream(task_id):
+    """以SSE推送性能评估任务的状态变化"""
+    task = PerformanceEvaluationService.get_task_by_id(task_id, user_id=current_user.id)
+    if not task:
+        return jsonify({"error": "任务不存在或您没有权限查看"}), 404
+
+    def load_status():
+        return db.session.query(PerformanceEvalTask.status).filter(PerformanceEvalTask.id == task_id).scalar()
+
+    return Response(
+        stream_with_context(ProgressStreamService.stream(
+            ProgressStreamService.perf_topic(task_id), {"status": task.status}, load_status, PERF_TERMINAL_STATUSES
+        )),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @perf_eval_bp.route('/delete/<int:task_id>', methods=['POST'])
 @login_required
 def delete_task(task_id):
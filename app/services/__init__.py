@@ -1,4 +1,4 @@
 # This file makes the 'services' directory a Python package 
 
 # 服务模块初始化文件 
-from app.services import model_service, chat_service, user_service, evaluation_service, dataset_service, perf_service 
\ No newline at end of file
+from app.services import model_service, chat_service, user_service, evaluation_queue_service, prediction_cache_service, judge_cache_service, evaluation_service, dataset_service, perf_service 
\ No newline at end of file
@@ -7,6 +7,7 @@ import traceback # For detailed error logging
 from openai import APIConnectionError, RateLimitError, AuthenticationError, APIStatusError
 import json # 用于序列化模型配置
 from app.utils import get_beijing_time
+from app.utils.rate_limiter import estimate_request_tokens, estimate_text_tokens
 
 def create_chat_session(user_id, session_name=None):
     """创建一个新的对话会话。"""
@@ -161,6 +162,8 @@ def call_openai_compatible_api(model_id: int, messages: list, system_prompt=None
 
     # 在函数早期（应用上下文有效时）捕获 logger 和 config 值
     app_logger = current_app.logger
+    rate_limit = model_service.get_endpoint_rate_limit(model)
+    rate_limit_timeout = current_app.config.get('RATE_LIMIT_CHAT_TIMEOUT', 30)
 
     # 在应用上下文中获取所有需要的数据
     api_key = model_service.get_decrypted_api_key(model)
@@ -199,6 +202,7 @@ def call_openai_compatible_api(model_id: int, messages: list, system_prompt=None
     try:
         client = openai.OpenAI(api_key=api_key, base_url=base_url)
         api_messages = [{"role": "system", "content": settings_snapshot["system_prompt"]}] + messages
+        estimated_tokens = estimate_request_tokens(api_messages)
         app_logger.debug(f"向模型 {model_info['display_name']} 发送 API 请求: Base URL={base_url}, Stream={stream}")
     except Exception as e_setup: # Error during client setup or message prep
         app_logger.error(f"调用API前发生错误 (模型: {model_info['display_name']}): {traceback.format_exc()}")
@@ -207,9 +211,26 @@ def call_openai_compatible_api(model_id: int, messages: list, system_prompt=None
         if stream: return setup_error_gen()
         else: return {"error": "API调用预处理失败", "details": str(e_setup), "settings_snapshot": settings_snapshot}
 
+    def acquire_rate_limit():
+        # 与同一端点上的评估、性能测试共享RPM/TPM配额，等待超时抛出TimeoutError
+        if rate_limit:
+            rate_limit['limiter'].acquire(rate_limit['endpoint_key'], rate_limit['rpm'], rate_limit['tpm'],
+                                          estimated_tokens, timeout=rate_limit_timeout)
+
+    def adjust_rate_limit(total_tokens):
+        # 按实际token用量修正限流配额
+        if rate_limit and total_tokens:
+            rate_limit['limiter'].adjust(rate_limit['endpoint_key'], rate_limit['tpm'], total_tokens - estimated_tokens)
+
     if stream:
         def stream_generator():
+            full_response_content = []
+            reasoning_content = []  # 存储思考过程
+            stream_usage = None
+            acquired = False
             try:
+                acquire_rate_limit()
+                acquired = True
                 response_stream = client.chat.completions.create(
                     model=settings_snapshot["model_identifier"],
                     messages=api_messages,
@@ -217,12 +238,14 @@ def call_openai_compatible_api(model_id: int, messages: list, system_prompt=None
                     # max_tokens=settings_snapshot["max_tokens"],
                     stream=True
                 )
-                full_response_content = []
-                reasoning_content = []  # 存储思考过程
                 has_yielded_any_content = False
                 has_reasoning = False
                 
                 for chunk in response_stream:
+                    # 部分服务在最后一个分块中返回本次请求的token用量
+                    if getattr(chunk, 'usage', None):
+                        stream_usage = chunk.usage
+
                     # 检查是否有推理内容
                     if (hasattr(chunk, 'choices') and chunk.choices and 
                         hasattr(chunk.choices[0], 'delta') and chunk.choices[0].delta and
@@ -271,12 +294,26 @@ def call_openai_compatible_api(model_id: int, messages: list, system_prompt=None
                     try: details_str = e_api_stream.response.json().get('error',{}).get('message', str(e_api_stream))
                     except: pass # Keep original str(e_api_stream) if parsing fails
                 yield {"error": error_type, "details": details_str, "settings_snapshot": settings_snapshot, "is_final_chunk": True}
+            except TimeoutError as e_rate_limit:
+                app_logger.warning(f"等待端点限流配额超时 (模型: {model_info['display_name']}): {e_rate_limit}")
+                yield {"error": "API 速率限制", "details": "该模型端点的请求配额已用尽，请稍后重试。", "settings_snapshot": settings_snapshot, "is_final_chunk": True}
             except Exception as e_generic_stream:
                 app_logger.error(f"流式API调用中发生未知错误 (模型: {model_info['display_name']}): {traceback.format_exc()}")
                 yield {"error": "未知流错误", "details": str(e_generic_stream), "settings_snapshot": settings_snapshot, "is_final_chunk": True}
+            finally:
+                # 流结束、出错或客户端断开时都按实际用量修正配额；服务端没有返回usage时按已生成的文本估算
+                if acquired:
+                    total_tokens = getattr(stream_usage, 'total_tokens', None) or (
+                        estimated_tokens + estimate_text_tokens("".join(reasoning_content) + "".join(full_response_content))
+                    )
+                    try:
+                        adjust_rate_limit(total_tokens)
+                    except Exception as e_adjust:
+                        app_logger.warning(f"修正端点限流配额失败 (模型: {model_info['display_name']}): {e_adjust}")
         return stream_generator()
     else: # Non-streaming
         try:
+            acquire_rate_limit()
             completion = client.chat.completions.create(
                 model=settings_snapshot["model_identifier"],
                 messages=api_messages,
@@ -285,6 +322,8 @@ def call_openai_compatible_api(model_id: int, messages: list, system_prompt=None
                 stream=False
             )
             
+            adjust_rate_limit(getattr(getattr(completion, 'usage', None), 'total_tokens', None))
+
             # 检查非流式响应中的推理内容
             response_content = completion.choices[0].message.content
             reasoning_content = getattr(completion.choices[0].message, 'reasoning', None)
@@ -303,6 +342,9 @@ def call_openai_compatible_api(model_id: int, messages: list, system_prompt=None
             if isinstance(e_api_nonstream, AuthenticationError): error_type = "API 认证失败"; details_str = "请检查API Key。"
             # ... (similar detailed error typing for non-streaming) ...
             return {"error": error_type, "details": details_str, "settings_snapshot": settings_snapshot}
+        except TimeoutError as e_rate_limit:
+            app_logger.warning(f"等待端点限流配额超时 (模型: {model_info['display_name']}): {e_rate_limit}")
+            return {"error": "API 速率限制", "details": "该模型端点的请求配额已用尽，请稍后重试。", "settings_snapshot": settings_snapshot}
         except Exception as e_generic_nonstream:
             app_logger.error(f"非流式API调用中发生未知错误 (模型: {model_info['display_name']}): {traceback.format_exc()}")
             return {"error": "未知API错误", "details": str(e_generic_nonstream), "settings_snapshot": settings_snapshot} 
\ No newline at end of file
@@ -0,0 +1,256 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app import db
+from app.models import Dataset
+from app.utils import get_beijing_time
+from flask import current_app
+import csv
+import io
+import json
+import os
+import threading
+
+# 索引文件格式版本，格式变化时旧索引视为失效
+INDEX_VERSION = 1
+# 取值种类不超过该数量（且取值较短）的字段记录取值分布，如选择题的答案列
+MAX_TRACKED_VALUES = 20
+MAX_TRACKED_VALUE_LENGTH = 32
+
+
+class _FieldStats:
+    """单个字段的统计：出现次数、非空次数、类型分布、文本长度，低基数字段记录取值分布"""
+
+    def __init__(self):
+        self.present = 0
+        self.non_empty = 0
+        self.types: Dict[str, int] = {}
+        self.total_length = 0
+        self.max_length = 0
+        self.values: Optional[Dict[str, int]] = {}
+
+    def add(self, value: Any) -> None:
+        self.present += 1
+        type_name = type(value).__name__
+        self.types[type_name] = self.types.get(type_name, 0) + 1
+        if value is None or value == '':
+            return
+        self.non_empty += 1
+        text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+        self.total_length += len(text)
+        self.max_length = max(self.max_length, len(text))
+        if self.values is not None:
+            if len(text) > MAX_TRACKED_VALUE_LENGTH or (text not in self.values and len(self.values) >= MAX_TRACKED_VALUES):
+                self.values = None
+            else:
+                self.values[text] = self.values.get(text, 0) + 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        stats = {
+            'present': self.present,
+            'non_empty': self.non_empty,
+            'types': self.types,
+            'avg_length': round(self.total_length / self.non_empty, 1) if self.non_empty else 0,
+            'max_length': self.max_length,
+        }
+        if self.values:
+            stats['values'] = self.values
+        return stats
+
+
+class DatasetIndexService:
+    """
+    自建数据集文件的行索引。
+    上传后在后台扫描一遍文件，在数据文件旁写入<文件名>.idx.json：总行数、每stride行一个的字节偏移、字段统计；
+    总行数和字段统计同时保存到Dataset记录。预览分页按偏移直接定位，不再为每次翻页扫描整个文件。
+    文件大小或修改时间与索引记录不一致时索引失效，调用方回退到逐行扫描。
+    """
+
+    @staticmethod
+    def index_path(file_path: str) -> str:
+        return f'{file_path}.idx.json'
+
+    @staticmethod
+    def build_index_async(app, dataset_id: int, file_path: str) -> threading.Thread:
+        thread = threading.Thread(
+            target=DatasetIndexService._build_index_task,
+            args=(app, dataset_id, file_path),
+            name=f"dataset-index-{dataset_id}",
+            daemon=True
+        )
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _build_index_task(app, dataset_id: int, file_path: str) -> None:
+        with app.app_context():
+            try:
+                index = DatasetIndexService.build_index(file_path, current_app.config.get('DATASET_INDEX_STRIDE', 1000))
+                dataset = Dataset.query.get(dataset_id)
+                if dataset is None:
+                    return
+                dataset.row_count = index['row_count']
+                dataset.field_stats = index['field_stats']
+                dataset.indexed_at = get_beijing_time()
+                db.session.commit()
+                current_app.logger.info(f"数据集 {dataset_id} 索引完成: {index['row_count']} 行，{index['invalid_rows']} 行无法解析")
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"数据集 {dataset_id} 建立索引失败: {str(e)}")
+
+    @staticmethod
+    def build_index(file_path: str, stride: int = 1000) -> Dict[str, Any]:
+        """扫描数据文件并写入索引文件，返回索引内容"""
+        stride = max(1, stride)
+        file_format = os.path.splitext(file_path)[1].lower().lstrip('.')
+        stat = os.stat(file_path)
+        offsets: List[int] = []
+        field_stats: Dict[str, _FieldStats] = {}
+        row_count = 0
+        invalid_rows = 0
+        fields = None
+
+        if file_format == 'jsonl':
+            for offset, line in DatasetIndexService._iter_jsonl_lines(file_path):
+                if row_count % stride == 0:
+                    offsets.append(offset)
+                row_count += 1
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    invalid_rows += 1
+                    continue
+                if isinstance(record, dict):
+                    for key, value in record.items():
+                        field_stats.setdefault(key, _FieldStats()).add(value)
+        elif file_format == 'csv':
+            fields, rows = DatasetIndexService._iter_csv_rows(file_path)
+            for offset, row in rows:
+                if row_count % stride == 0:
+                    offsets.append(offset)
+                row_count += 1
+                for position, field in enumerate(fields):
+                    field_stats.setdefault(field, _FieldStats()).add(row[position] if position < len(row) else None)
+        else:
+            raise ValueError(f"不支持为 {file_format} 文件建立索引")
+
+        index = {
+            'version': INDEX_VERSION,
+            'format': file_format,
+            'file_size': stat.st_size,
+            'file_mtime_ns': stat.st_mtime_ns,
+            'row_count': row_count,
+            'invalid_rows': invalid_rows,
+            'stride': stride,
+            'offsets': offsets,
+            'fields': fields,
+            'field_stats': {field: stats.to_dict() for field, stats in field_stats.items()},
+        }
+        index_path = DatasetIndexService.index_path(file_path)
+        temp_path = f'{index_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(temp_path, index_path)
+        return index
+
+    @staticmethod
+    def load_index(file_path: str) -> Optional[Dict[str, Any]]:
+        """读取与数据文件当前内容一致的索引，没有或已失效时返回None"""
+        try:
+            with open(DatasetIndexService.index_path(file_path), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            stat = os.stat(file_path)
+        except (OSError, ValueError):
+            return None
+        if (index.get('version') != INDEX_VERSION or index.get('file_size') != stat.st_size
+                or index.get('file_mtime_ns') != stat.st_mtime_ns):
+            return None
+        return index
+
+    @staticmethod
+    def remove_index(file_path: str) -> None:
+        try:
+            os.remove(DatasetIndexService.index_path(file_path))
+        except OSError:
+            pass
+
+    @staticmethod
+    def read_jsonl_page(file_path: str, index: Dict[str, Any], page: int, per_page: int) -> Tuple[List[Dict], int]:
+        """按索引定位到目标页所在的区段，只读取该区段开头到目标页结束的行"""
+        total = index['row_count']
+        start_idx = (page - 1) * per_page
+        if start_idx >= total or start_idx < 0:
+            return [], total
+        checkpoint = start_idx // index['stride']
+        row_idx = checkpoint * index['stride']
+        data = []
+        for _, line in DatasetIndexService._iter_jsonl_lines(file_path, index['offsets'][checkpoint]):
+            if row_idx >= start_idx:
+                try:
+                    data.append(json.loads(line))
+                except ValueError:
+                    text = line.decode('utf-8', errors='replace').strip()
+                    data.append({"error": "JSON解析失败", "raw_text": text[:200] + "..." if len(text) > 200 else text})
+                if len(data) >= per_page:
+                    break
+            row_idx += 1
+        return data, total
+
+    @staticmethod
+    def read_csv_page(file_path: str, index: Dict[str, Any], page: int, per_page: int) -> Tuple[List[Dict], int]:
+        total = index['row_count']
+        start_idx = (page - 1) * per_page
+        if start_idx >= total or start_idx < 0:
+            return [], total
+        checkpoint = start_idx // index['stride']
+        skip = start_idx - checkpoint * index['stride']
+        data = []
+        with open(file_path, 'rb') as raw:
+            raw.seek(index['offsets'][checkpoint])
+            reader = csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8', newline=''), fieldnames=index['fields'])
+            for row in reader:
+                if skip:
+                    skip -= 1
+                    continue
+                data.append(row)
+                if len(data) >= per_page:
+                    break
+        return data, total
+
+    @staticmethod
+    def _iter_jsonl_lines(file_path: str, offset: int = 0) -> Iterator[Tuple[int, bytes]]:
+        """逐行读取非空行，返回(行首字节偏移, 行内容)"""
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if line.strip():
+                    yield offset, line
+                offset += len(line)
+
+    @staticmethod
+    def _iter_csv_rows(file_path: str) -> Tuple[List[str], Iterator[Tuple[int, List[str]]]]:
+        """读取CSV表头，返回(表头, 逐条返回(记录首字节偏移, 记录)的迭代器)；带引号的字段可以跨行"""
+        f = open(file_path, 'rb')
+        position = [0]
+
+        def physical_lines():
+            for line in f:
+                position[0] += len(line)
+                yield line.decode('utf-8')
+
+        reader = csv.reader(physical_lines())
+        fields = next(reader, None) or []
+
+        def rows():
+            try:
+                while True:
+                    # csv.reader按需读取物理行，读取下一条记录之前的位置即记录的开头
+                    offset = position[0]
+                    row = next(reader, None)
+                    if row is None:
+                        return
+                    # 空行不是记录（与csv.DictReader一致）
+                    if row:
+                        yield offset, row
+            finally:
+                f.close()
+
+        return fields, rows()
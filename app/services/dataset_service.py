@@ -2,6 +2,7 @@ import json
 import os
 from flask import current_app
 from typing import List, Dict, Tuple
+from app.services.dataset_index_service import DatasetIndexService
 
 # 导入ModelScope的SDK
 from modelscope import MsDataset
@@ -101,9 +102,13 @@ class DatasetService:
     @staticmethod
     def _load_jsonl_stream(file_path: str, page: int = 1, per_page: int = 20) -> Tuple[List[Dict], int]:
         """
-        流式加载JSONL文件，避免内存占用过高
+        流式加载JSONL文件，避免内存占用过高；有上传时建立的行索引时直接定位到目标页
         """
         try:
+            index = DatasetIndexService.load_index(file_path)
+            if index is not None:
+                return DatasetIndexService.read_jsonl_page(file_path, index, page, per_page)
+
             # 快速扫描文件，只计算非空行数（不解析JSON）
             total_valid_lines = 0
             with open(file_path, 'r', encoding='utf-8') as f:
@@ -151,9 +156,13 @@ class DatasetService:
     @staticmethod
     def _load_csv_stream(file_path: str, page: int = 1, per_page: int = 20) -> Tuple[List[Dict], int]:
         """
-        流式加载CSV文件，避免内存占用过高
+        流式加载CSV文件，避免内存占用过高；有上传时建立的行索引时直接定位到目标页
         """
         try:
+            index = DatasetIndexService.load_index(file_path)
+            if index is not None:
+                return DatasetIndexService.read_csv_page(file_path, index, page, per_page)
+
             import csv
             
             # 首先计算总行数（不包括header）
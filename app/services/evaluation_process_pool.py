@@ -0,0 +1,212 @@
+from typing import Any, Dict, Optional
+from app.services.evaluation_queue_service import EvaluationQueueService
+from flask import current_app
+import multiprocessing
+import queue
+import signal
+import socket
+import json
+import time
+import os
+
+# 工作进程使用spawn方式启动，子进程从干净的解释器开始，回收后内存完全归还给系统
+_mp_context = multiprocessing.get_context('spawn')
+
+
+def _evaluation_worker_process_main(worker_index: int, max_jobs: int, events) -> None:
+    """
+    评估工作进程入口：循环认领并执行作业，完成max_jobs个作业后退出，由监督进程重新拉起。
+    通过events队列向监督进程上报结构化事件（started/job_started/heartbeat/job_finished/recycling）。
+    """
+    from app import create_app
+
+    app = create_app()
+    # 工作进程只执行作业，不再启动进程内的工作线程池
+    app.config['EVAL_WORKERS_ENABLED'] = False
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:p{worker_index}"
+    poll_interval = app.config.get('EVAL_JOB_POLL_INTERVAL', 3)
+
+    def emit(event: str, **payload) -> None:
+        events.put({'event': event, 'worker_index': worker_index, 'pid': os.getpid(), 'time': time.time(), **payload})
+
+    emit('started', worker_id=worker_id)
+    jobs_done = 0
+    while jobs_done < max_jobs:
+        try:
+            with app.app_context():
+                job = EvaluationQueueService.claim_next_job(worker_id)
+                job_id = job.id if job else None
+                evaluation_id = job.evaluation_id if job else None
+                user_id = job.evaluation.user_id if job and job.evaluation else None
+        except Exception as e:
+            app.logger.error(f"[评估工作进程] {worker_id} 认领作业异常: {str(e)}", exc_info=True)
+            job_id = None
+
+        if not job_id:
+            time.sleep(poll_interval)
+            continue
+
+        emit('job_started', job_id=job_id, evaluation_id=evaluation_id)
+
+        def report_progress(job_id=job_id, evaluation_id=evaluation_id, user_id=user_id):
+            from app.services.evaluation_service import EvaluationService
+            progress = EvaluationService.get_evaluation_progress(evaluation_id, user_id) if user_id else {}
+            emit('heartbeat', job_id=job_id, evaluation_id=evaluation_id,
+                 progress_percentage=progress.get('progress_percentage'))
+
+        status = EvaluationQueueService.run_job(app, job_id, worker_id, on_heartbeat=report_progress)
+        jobs_done += 1
+        emit('job_finished', job_id=job_id, evaluation_id=evaluation_id, status=status, jobs_done=jobs_done)
+
+    emit('recycling', jobs_done=jobs_done)
+
+
+class EvaluationProcessPool:
+    """
+    评估工作进程池的监督者。
+    固定数量的子进程从数据库队列中认领作业执行，子进程完成一定数量的作业后退出并被重新拉起；
+    子进程的状态和进度通过事件队列汇总，定期写入状态文件供Web进程读取。
+    """
+
+    def __init__(self, app, process_count: int, max_jobs_per_process: int, status_file: str):
+        self.app = app
+        self.process_count = process_count
+        self.max_jobs_per_process = max_jobs_per_process
+        self.status_file = status_file
+        self.events = _mp_context.Queue()
+        self.processes: Dict[int, Any] = {}
+        self.workers: Dict[int, Dict[str, Any]] = {}
+        self._stopping = False
+        self._started_at = time.time()
+
+    def run(self) -> None:
+        """启动所有子进程并持续监督，直到收到SIGTERM/SIGINT"""
+        signal.signal(signal.SIGTERM, self._handle_stop_signal)
+        signal.signal(signal.SIGINT, self._handle_stop_signal)
+        for index in range(self.process_count):
+            self._spawn(index)
+        self.app.logger.info(f"[评估工作进程] 监督进程 {os.getpid()} 启动 {self.process_count} 个评估工作进程，每个进程最多执行 {self.max_jobs_per_process} 个作业。")
+
+        last_status_write = 0.0
+        while not self._stopping:
+            try:
+                self._handle_event(self.events.get(timeout=1))
+            except queue.Empty:
+                pass
+            self._check_processes()
+            if time.time() - last_status_write >= 2:
+                self._write_status()
+                last_status_write = time.time()
+        self._shutdown()
+
+    def _handle_stop_signal(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _spawn(self, index: int) -> None:
+        process = _mp_context.Process(
+            target=_evaluation_worker_process_main,
+            args=(index, self.max_jobs_per_process, self.events),
+            name=f"eval-worker-process-{index}",
+            daemon=False
+        )
+        process.start()
+        self.processes[index] = process
+        previous = self.workers.get(index, {})
+        self.workers[index] = {
+            'index': index,
+            'pid': process.pid,
+            'worker_id': None,
+            'status': 'starting',
+            'jobs_done': 0,
+            'restarts': previous.get('restarts', -1) + 1,
+            'job_id': None,
+            'evaluation_id': None,
+            'progress_percentage': None,
+            'last_event_at': time.time(),
+        }
+
+    def _handle_event(self, event: Dict[str, Any]) -> None:
+        worker = self.workers.get(event.get('worker_index'))
+        if worker is None or worker['pid'] != event.get('pid'):
+            return
+        worker['last_event_at'] = event['time']
+        name = event['event']
+        if name == 'started':
+            worker['worker_id'] = event.get('worker_id')
+            worker['status'] = 'idle'
+        elif name == 'job_started':
+            worker.update(status='running', job_id=event['job_id'], evaluation_id=event['evaluation_id'], progress_percentage=0.0)
+        elif name == 'heartbeat':
+            worker['progress_percentage'] = event.get('progress_percentage')
+        elif name == 'job_finished':
+            self.app.logger.info(f"[评估工作进程] 进程 {worker['pid']} 完成作业 {event['job_id']} (评估 {event['evaluation_id']})，状态: {event.get('status')}")
+            worker.update(status='idle', job_id=None, evaluation_id=None, progress_percentage=None, jobs_done=event['jobs_done'])
+        elif name == 'recycling':
+            worker['status'] = 'recycling'
+
+    def _check_processes(self) -> None:
+        """回收已退出的子进程并重新拉起；异常退出时立即释放其正在执行作业的租约"""
+        for index, process in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            worker = self.workers[index]
+            if process.exitcode != 0 and worker.get('job_id'):
+                self.app.logger.warning(f"[评估工作进程] 进程 {process.pid} 异常退出 (exitcode={process.exitcode})，作业 {worker['job_id']} 将重新排队。")
+                with self.app.app_context():
+                    EvaluationQueueService.expire_lease(worker['job_id'], worker['worker_id'])
+            if not self._stopping:
+                self._spawn(index)
+
+    def _write_status(self) -> None:
+        status = {
+            'supervisor_pid': os.getpid(),
+            'hostname': socket.gethostname(),
+            'started_at': self._started_at,
+            'updated_at': time.time(),
+            'max_jobs_per_process': self.max_jobs_per_process,
+            'workers': [self.workers[index] for index in sorted(self.workers)],
+        }
+        tmp_path = f"{self.status_file}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.status_file) or '.', exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(status, f, ensure_ascii=False)
+            os.replace(tmp_path, self.status_file)
+        except OSError as e:
+            self.app.logger.warning(f"[评估工作进程] 写入状态文件失败: {str(e)}")
+
+    def _shutdown(self) -> None:
+        """终止所有子进程，它们正在执行的作业在租约过期后由其他工作进程接管"""
+        self.app.logger.info(f"[评估工作进程] 监督进程 {os.getpid()} 正在停止所有工作进程...")
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        for index, process in self.processes.items():
+            process.join(timeout=10)
+            worker = self.workers[index]
+            if worker.get('job_id') and worker.get('worker_id'):
+                with self.app.app_context():
+                    EvaluationQueueService.expire_lease(worker['job_id'], worker['worker_id'])
+        try:
+            os.remove(self.status_file)
+        except OSError:
+            pass
+
+
+def get_worker_process_status() -> Optional[Dict[str, Any]]:
+    """读取评估工作进程的状态快照，监督进程未运行或状态过期时返回None"""
+    status_file = current_app.config.get('EVAL_WORKER_STATUS_FILE')
+    if not status_file or not os.path.exists(status_file):
+        return None
+    try:
+        with open(status_file, 'r', encoding='utf-8') as f:
+            status = json.load(f)
+    except (OSError, ValueError) as e:
+        current_app.logger.warning(f"读取评估工作进程状态失败: {str(e)}")
+        return None
+    if time.time() - status.get('updated_at', 0) > 30:
+        return None
+    return status
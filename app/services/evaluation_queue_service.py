@@ -0,0 +1,628 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from app import db
+from app.models import ModelEvaluation, ModelEvaluationResult, EvaluationJob, AIModel, MatrixEvaluation
+from app.services.progress_stream_service import ProgressStreamService
+from app.utils import get_beijing_time
+from collections import OrderedDict, defaultdict
+from flask import current_app
+from sqlalchemy import func, text
+from datetime import datetime, timedelta
+import threading
+import heapq
+import socket
+import os
+
+# 认领作业时使用的MySQL命名锁，保证多个gunicorn进程之间并发上限判断的原子性
+_CLAIM_LOCK_NAME = 'llm_eval_job_claim'
+_CLAIM_LOCK_TIMEOUT = 10
+
+# 进程内的认领锁，非MySQL数据库或同进程多线程时使用
+_local_claim_lock = threading.Lock()
+
+# 当前进程内的工作线程池（每个进程只启动一个）
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+ACTIVE_JOB_STATUSES = ('claimed', 'running')
+
+# 调度优先级及其在公平调度中的权重，权重越大分到的运行名额越多
+PRIORITY_WEIGHTS = OrderedDict([('interactive', 4), ('normal', 2), ('batch', 1)])
+DEFAULT_PRIORITY = 'normal'
+
+
+
+def _scheduling_unit(evaluation_id: int, matrix_id: Optional[int]) -> Tuple[str, int]:
+    """端点名额的占用单位：矩阵评估作业按矩阵计，其他作业按评估计"""
+    return ('matrix', matrix_id) if matrix_id is not None else ('evaluation', evaluation_id)
+
+class EvaluationQueueService:
+    """评估任务队列服务：持久化作业、按全局和端点限制并发、租约续期与崩溃回收"""
+
+    @staticmethod
+    def enqueue(evaluation: ModelEvaluation, shard_index: Optional[int] = None,
+                shard_dataset_ids: Optional[List[int]] = None, shard_subsets: Optional[Dict[str, Any]] = None,
+                matrix_id: Optional[int] = None) -> EvaluationJob:
+        """为评估任务（或其中一个分片、或整个矩阵评估）创建一个待执行作业（由调用方提交事务）"""
+        model = AIModel.query.get(evaluation.model_id)
+        job = EvaluationJob(
+            evaluation_id=evaluation.id,
+            endpoint_key=model.endpoint_key if model else f"model:{evaluation.model_id}",
+            status='pending',
+            priority=evaluation.priority or DEFAULT_PRIORITY,
+            shard_index=shard_index,
+            shard_dataset_ids=shard_dataset_ids,
+            shard_subsets=shard_subsets,
+            matrix_id=matrix_id
+        )
+        db.session.add(job)
+        return job
+
+    @staticmethod
+    def claim_next_job(worker_id: str) -> Optional[EvaluationJob]:
+        """
+        认领下一个可执行的作业。
+        在全局运行数和同端点运行数都未达到上限时，按用户加权公平调度选取待执行作业（见_fair_share_order）。
+        同端点运行数按评估计数，同一评估的多个分片只占用一个端点名额，可以并行执行；
+        矩阵评估作业需要其中每个模型的端点都有名额（见_active_endpoint_units）。
+        交互优先级的作业因名额已满排不上时，请求抢占一个运行中的低优先级作业。
+        """
+        use_mysql_lock = db.engine.dialect.name == 'mysql'
+        with _local_claim_lock:
+            conn = db.engine.connect() if use_mysql_lock else None
+            try:
+                if conn is not None:
+                    got_lock = conn.execute(
+                        text("SELECT GET_LOCK(:name, :timeout)"),
+                        {'name': _CLAIM_LOCK_NAME, 'timeout': _CLAIM_LOCK_TIMEOUT}
+                    ).scalar()
+                    if not got_lock:
+                        return None
+                try:
+                    return EvaluationQueueService._claim_next_job_locked(worker_id)
+                finally:
+                    if conn is not None:
+                        conn.execute(text("SELECT RELEASE_LOCK(:name)"), {'name': _CLAIM_LOCK_NAME})
+            except Exception as e:
+                current_app.logger.error(f"[评估队列] 认领作业失败: {str(e)}", exc_info=True)
+                db.session.rollback()
+                return None
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    @staticmethod
+    def _claim_next_job_locked(worker_id: str) -> Optional[EvaluationJob]:
+        EvaluationQueueService.reclaim_expired_jobs()
+
+        max_running = current_app.config.get('EVAL_MAX_RUNNING_JOBS', 4)
+        max_per_endpoint = current_app.config.get('EVAL_MAX_JOBS_PER_ENDPOINT', 1)
+
+        running_total = EvaluationJob.query.filter(EvaluationJob.status.in_(ACTIVE_JOB_STATUSES)).count()
+        if running_total >= max_running:
+            EvaluationQueueService._request_preemption(endpoint_bound=False)
+            db.session.commit()
+            return None
+
+        active_units = EvaluationQueueService._active_endpoint_units()
+        saturated_endpoints = {
+            endpoint_key for endpoint_key, units in active_units.items() if len(units) >= max_per_endpoint
+        }
+
+        pending = EvaluationJob.query.filter_by(status='pending').join(
+            ModelEvaluation, EvaluationJob.evaluation_id == ModelEvaluation.id
+        ).with_entities(
+            EvaluationJob.id, EvaluationJob.priority, ModelEvaluation.user_id,
+            EvaluationJob.evaluation_id, EvaluationJob.endpoint_key, EvaluationJob.matrix_id
+        ).order_by(EvaluationJob.id.asc()).all()
+        matrix_endpoints = EvaluationQueueService._matrix_endpoint_keys(
+            {row.matrix_id for row in pending if row.matrix_id is not None}
+        )
+
+        def claimable(row) -> bool:
+            # 端点名额已满时，只有已在该端点上运行的同一评估（其他分片）或同一矩阵可以继续认领
+            unit = _scheduling_unit(row.evaluation_id, row.matrix_id)
+            endpoints = [row.endpoint_key]
+            if row.matrix_id is not None:
+                endpoints = matrix_endpoints.get(row.matrix_id) or endpoints
+            return all(
+                endpoint_key not in saturated_endpoints or unit in active_units[endpoint_key]
+                for endpoint_key in endpoints
+            )
+
+        candidates = [(row.id, row.priority, row.user_id) for row in pending if claimable(row)]
+        job_id = next(EvaluationQueueService._fair_share_order(candidates), None)
+        if job_id is None:
+            if saturated_endpoints:
+                EvaluationQueueService._request_preemption(endpoint_bound=True)
+            db.session.commit()
+            return None
+
+        job = EvaluationJob.query.get(job_id)
+        now = get_beijing_time()
+        job.status = 'claimed'
+        job.preempt_requested = False
+        job.worker_id = worker_id
+        job.attempts = (job.attempts or 0) + 1
+        job.claimed_at = now
+        job.lease_expires_at = now + timedelta(seconds=current_app.config.get('EVAL_JOB_LEASE_SECONDS', 120))
+        db.session.commit()
+        current_app.logger.info(f"[评估队列] 工作线程 {worker_id} 认领作业 {job.id} (评估 {job.evaluation_id}，第 {job.attempts} 次尝试)")
+        return job
+
+    @staticmethod
+    def _active_endpoint_units() -> Dict[str, set]:
+        """
+        各端点上运行中的调度单元（评估或矩阵评估）。
+        同一评估的多个分片只占用一个端点名额；矩阵评估占用其中每个待评估模型的端点名额。
+        """
+        active_jobs = EvaluationJob.query.filter(EvaluationJob.status.in_(ACTIVE_JOB_STATUSES)).with_entities(
+            EvaluationJob.evaluation_id, EvaluationJob.endpoint_key, EvaluationJob.matrix_id
+        ).all()
+        matrix_endpoints = EvaluationQueueService._matrix_endpoint_keys(
+            {job.matrix_id for job in active_jobs if job.matrix_id is not None}
+        )
+        units: Dict[str, set] = defaultdict(set)
+        for job in active_jobs:
+            unit = _scheduling_unit(job.evaluation_id, job.matrix_id)
+            endpoints = matrix_endpoints.get(job.matrix_id) if job.matrix_id is not None else None
+            for endpoint_key in endpoints or [job.endpoint_key]:
+                units[endpoint_key].add(unit)
+        return units
+
+    @staticmethod
+    def _matrix_endpoint_keys(matrix_ids: set) -> Dict[int, List[str]]:
+        """矩阵评估中尚未结束的模型评估所用的端点"""
+        if not matrix_ids:
+            return {}
+        rows = db.session.query(ModelEvaluation.matrix_id, AIModel).join(
+            AIModel, ModelEvaluation.model_id == AIModel.id
+        ).filter(
+            ModelEvaluation.matrix_id.in_(matrix_ids),
+            ModelEvaluation.status.notin_(('completed', 'cancelled'))
+        ).all()
+        endpoints: Dict[int, List[str]] = defaultdict(list)
+        for matrix_id, model in rows:
+            if model.endpoint_key not in endpoints[matrix_id]:
+                endpoints[matrix_id].append(model.endpoint_key)
+        return endpoints
+
+    @staticmethod
+    def _user_scheduling_state() -> Tuple[Dict[int, int], Dict[int, datetime]]:
+        """各用户运行中的作业数和最近一次被调度的时间"""
+        active_counts = dict(db.session.query(
+            ModelEvaluation.user_id, func.count(EvaluationJob.id)
+        ).join(ModelEvaluation, EvaluationJob.evaluation_id == ModelEvaluation.id).filter(
+            EvaluationJob.status.in_(ACTIVE_JOB_STATUSES)
+        ).group_by(ModelEvaluation.user_id).all())
+        last_claimed = dict(db.session.query(
+            ModelEvaluation.user_id, func.max(EvaluationJob.claimed_at)
+        ).join(ModelEvaluation, EvaluationJob.evaluation_id == ModelEvaluation.id).filter(
+            EvaluationJob.claimed_at.isnot(None)
+        ).group_by(ModelEvaluation.user_id).all())
+        return active_counts, last_claimed
+
+    @staticmethod
+    def _fair_share_order(candidates: List[Tuple[int, str, int]],
+                          active_counts: Optional[Dict[int, int]] = None,
+                          last_claimed: Optional[Dict[int, datetime]] = None) -> Iterator[int]:
+        """
+        按用户加权轮转的顺序依次产出待执行作业ID（candidates为按入队顺序排列的(作业ID, 优先级, 用户ID)）。
+        每个用户取其优先级最高、入队最早的作业作为代表，(运行中作业数+1)/优先级权重最小的用户先出队；
+        相同时先调度最久未被调度的用户。每出队一个作业，该用户的运行数加一，以模拟后续的出队顺序。
+        """
+        if active_counts is None or last_claimed is None:
+            active_counts, last_claimed = EvaluationQueueService._user_scheduling_state()
+        active_counts = dict(active_counts)
+        # 模拟出队的用户排在所有真实调度之后，并按模拟的出队先后轮转
+        last_served = {user_id: (0, claimed_at or datetime.min) for user_id, claimed_at in last_claimed.items()}
+        queues: Dict[int, List[Tuple[int, int]]] = {}
+        for job_id, priority, user_id in candidates:
+            queues.setdefault(user_id, []).append((-PRIORITY_WEIGHTS.get(priority, PRIORITY_WEIGHTS[DEFAULT_PRIORITY]), job_id))
+        for user_queue in queues.values():
+            user_queue.sort()
+
+        served = 0
+        while queues:
+            def share(user_id):
+                weight = -queues[user_id][0][0]
+                return ((active_counts.get(user_id, 0) + 1) / weight, last_served.get(user_id, (0, datetime.min)), queues[user_id][0][1])
+            user_id = min(queues, key=share)
+            _, job_id = queues[user_id].pop(0)
+            if not queues[user_id]:
+                del queues[user_id]
+            active_counts[user_id] = active_counts.get(user_id, 0) + 1
+            served += 1
+            last_served[user_id] = (1, served)
+            yield job_id
+
+    @staticmethod
+    def _request_preemption(endpoint_bound: bool) -> Optional[EvaluationJob]:
+        """
+        最早的交互优先级待执行作业排不上时，请求抢占一个运行中的低优先级作业（批量优先于普通，同级取最晚开始的）。
+        被抢占的作业在当前请求完成后停止并重新排队，续评时复用已完成的样本。endpoint_bound表示只因端点名额已满而排不上。
+        同一时间只有一个抢占请求在进行，矩阵评估作业不参与抢占。
+        """
+        if not current_app.config.get('EVAL_PREEMPTION_ENABLED', True):
+            return None
+        waiting = EvaluationJob.query.filter_by(status='pending', priority='interactive').order_by(EvaluationJob.id.asc()).first()
+        if waiting is None:
+            return None
+        if EvaluationJob.query.filter(EvaluationJob.status.in_(ACTIVE_JOB_STATUSES), EvaluationJob.preempt_requested.is_(True)).count():
+            return None
+
+        victims = EvaluationJob.query.filter(
+            EvaluationJob.status == 'running',
+            EvaluationJob.matrix_id.is_(None),
+            EvaluationJob.evaluation_id != waiting.evaluation_id,
+            EvaluationJob.priority.in_(('batch', 'normal'))
+        )
+        if endpoint_bound:
+            victims = victims.filter(EvaluationJob.endpoint_key == waiting.endpoint_key)
+        victims = sorted(victims.all(), key=lambda job: job.started_at or datetime.min, reverse=True)
+        victim = min(victims, key=lambda job: PRIORITY_WEIGHTS.get(job.priority, 0), default=None)
+        if victim is None:
+            return None
+        victim.preempt_requested = True
+        current_app.logger.info(f"[评估队列] 交互作业 {waiting.id} 等待中，请求抢占作业 {victim.id} (评估 {victim.evaluation_id}，优先级 {victim.priority})")
+        return victim
+
+    @staticmethod
+    def requeue_preempted(job_id: int) -> None:
+        """被抢占的作业重新排队，本次执行不计入尝试次数"""
+        job = EvaluationJob.query.get(job_id)
+        if not job:
+            return
+        job.status = 'pending'
+        job.worker_id = None
+        job.lease_expires_at = None
+        job.preempt_requested = False
+        job.attempts = max(0, (job.attempts or 1) - 1)
+        evaluation = ModelEvaluation.query.get(job.evaluation_id)
+        if job.shard_index is None and evaluation and evaluation.status == 'running':
+            evaluation.status = 'pending'
+        db.session.commit()
+        current_app.logger.info(f"[评估队列] 作业 {job_id} (评估 {job.evaluation_id}) 已让出执行，重新排队。")
+
+    @staticmethod
+    def get_queue_estimates(evaluation_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        估算排队中评估的队列位置和预计开始时间。
+        按认领时的公平调度规则模拟出队顺序（不考虑端点并发上限），
+        运行中作业的剩余时长和排队作业的时长都用最近完成作业的平均耗时估计。
+
+        Returns:
+            Dict[int, Dict]: {evaluation_id: {'position': 队列位置(从1开始), 'estimated_start': 预计开始时间}}
+        """
+        if not evaluation_ids:
+            return {}
+        try:
+            candidates = db.session.query(EvaluationJob.id, EvaluationJob.priority, ModelEvaluation.user_id, EvaluationJob.evaluation_id).join(
+                ModelEvaluation, EvaluationJob.evaluation_id == ModelEvaluation.id
+            ).filter(EvaluationJob.status == 'pending').order_by(EvaluationJob.id.asc()).all()
+            wanted = set(evaluation_ids)
+            if not any(evaluation_id in wanted for *_, evaluation_id in candidates):
+                return {}
+            job_evaluations = {job_id: evaluation_id for job_id, _, _, evaluation_id in candidates}
+
+            recent_jobs = EvaluationJob.query.filter(
+                EvaluationJob.status == 'completed',
+                EvaluationJob.started_at.isnot(None),
+                EvaluationJob.finished_at.isnot(None)
+            ).order_by(EvaluationJob.id.desc()).limit(50).all()
+            durations = [(job.finished_at - job.started_at).total_seconds() for job in recent_jobs]
+            average_seconds = sum(durations) / len(durations) if durations else current_app.config.get('EVAL_DEFAULT_JOB_SECONDS', 600)
+
+            # 数据库中的时间不带时区，计算运行时长前先去掉当前时间的时区
+            now = get_beijing_time().replace(tzinfo=None)
+            slot_free_at = [
+                max(0.0, average_seconds - (now - (job.started_at or job.claimed_at or now)).total_seconds())
+                for job in EvaluationJob.query.filter(EvaluationJob.status.in_(ACTIVE_JOB_STATUSES)).all()
+            ]
+            max_running = max(1, current_app.config.get('EVAL_MAX_RUNNING_JOBS', 4))
+            slot_free_at.extend([0.0] * max(0, max_running - len(slot_free_at)))
+            heapq.heapify(slot_free_at)
+
+            estimates = {}
+            order = EvaluationQueueService._fair_share_order([candidate[:3] for candidate in candidates])
+            for position, job_id in enumerate(order, start=1):
+                start_after = heapq.heappop(slot_free_at)
+                heapq.heappush(slot_free_at, start_after + average_seconds)
+                evaluation_id = job_evaluations[job_id]
+                if evaluation_id in wanted and evaluation_id not in estimates:
+                    estimates[evaluation_id] = {
+                        'position': position,
+                        'estimated_start': now + timedelta(seconds=start_after),
+                    }
+                    if len(estimates) == len(wanted):
+                        break
+            return estimates
+        except Exception as e:
+            current_app.logger.error(f"[评估队列] 估算队列位置失败: {str(e)}", exc_info=True)
+            return {}
+
+    @staticmethod
+    def is_progress_reporting_job(job_id: int) -> bool:
+        """
+        作业是否负责统计和推送评估进度：分片评估的进度覆盖整个评估，只由序号最小的执行中分片推送，
+        该分片结束后由下一个执行中的分片接替；非分片作业总是负责推送。
+        """
+        job = EvaluationJob.query.get(job_id)
+        if job is None or job.shard_index is None:
+            return True
+        return EvaluationJob.query.filter(
+            EvaluationJob.evaluation_id == job.evaluation_id,
+            EvaluationJob.shard_index < job.shard_index,
+            EvaluationJob.status.in_(ACTIVE_JOB_STATUSES)
+        ).count() == 0
+
+    @staticmethod
+    def mark_running(job_id: int) -> None:
+        job = EvaluationJob.query.get(job_id)
+        if job:
+            job.status = 'running'
+            job.started_at = get_beijing_time()
+            db.session.commit()
+
+    @staticmethod
+    def renew_lease(job_id: int, worker_id: str) -> bool:
+        """续期作业租约，返回False表示作业已不属于该工作线程"""
+        try:
+            lease_expires_at = get_beijing_time() + timedelta(seconds=current_app.config.get('EVAL_JOB_LEASE_SECONDS', 120))
+            updated = EvaluationJob.query.filter(
+                EvaluationJob.id == job_id,
+                EvaluationJob.worker_id == worker_id,
+                EvaluationJob.status.in_(ACTIVE_JOB_STATUSES)
+            ).update({'lease_expires_at': lease_expires_at}, synchronize_session=False)
+            db.session.commit()
+            return updated > 0
+        except Exception as e:
+            current_app.logger.error(f"[评估队列] 作业 {job_id} 续约失败: {str(e)}")
+            db.session.rollback()
+            return False
+
+    @staticmethod
+    def expire_lease(job_id: int, worker_id: str) -> bool:
+        """工作进程异常退出时立即让作业租约过期，下一次认领时即可回收，无需等待租约超时"""
+        try:
+            updated = EvaluationJob.query.filter(
+                EvaluationJob.id == job_id,
+                EvaluationJob.worker_id == worker_id,
+                EvaluationJob.status.in_(ACTIVE_JOB_STATUSES)
+            ).update({'lease_expires_at': get_beijing_time()}, synchronize_session=False)
+            db.session.commit()
+            return updated > 0
+        except Exception as e:
+            current_app.logger.error(f"[评估队列] 作业 {job_id} 释放租约失败: {str(e)}")
+            db.session.rollback()
+            return False
+
+    @staticmethod
+    def finish_job(job_id: int, success: bool, error_message: Optional[str] = None, cancelled: bool = False) -> None:
+        job = EvaluationJob.query.get(job_id)
+        if not job:
+            return
+        if cancelled:
+            job.status = 'cancelled'
+        else:
+            job.status = 'completed' if success else 'failed'
+        job.error_message = error_message
+        job.lease_expires_at = None
+        job.finished_at = get_beijing_time()
+        db.session.commit()
+
+    @staticmethod
+    def reclaim_expired_jobs() -> int:
+        """
+        回收租约过期的作业（工作进程崩溃或被重启）。
+        未超过最大尝试次数的作业重新排队，否则标记为失败。
+        """
+        max_attempts = current_app.config.get('EVAL_JOB_MAX_ATTEMPTS', 3)
+        expired_jobs = EvaluationJob.query.filter(
+            EvaluationJob.status.in_(ACTIVE_JOB_STATUSES),
+            EvaluationJob.lease_expires_at < get_beijing_time()
+        ).all()
+        for job in expired_jobs:
+            evaluation = ModelEvaluation.query.get(job.evaluation_id)
+            if job.matrix_id is None and evaluation and evaluation.cancel_requested:
+                # 已请求取消的评估不再重新排队
+                job.status = 'cancelled'
+                job.finished_at = get_beijing_time()
+                if evaluation.status not in ('completed', 'failed', 'cancelled'):
+                    evaluation.status = 'cancelled'
+                    evaluation.completed_at = get_beijing_time()
+                    evaluation.result_summary = {"cancelled": True, "message": "评估已被取消"}
+                current_app.logger.warning(f"[评估队列] 作业 {job.id} (评估 {job.evaluation_id}) 租约过期，评估已请求取消，不再重新排队。")
+            elif job.attempts >= max_attempts:
+                job.status = 'failed'
+                job.error_message = f"作业租约过期且已达到最大尝试次数 {max_attempts}"
+                job.finished_at = get_beijing_time()
+                if evaluation and evaluation.status not in ('completed', 'failed', 'cancelled'):
+                    evaluation.status = 'failed'
+                    evaluation.result_summary = {"error": job.error_message}
+                if job.matrix_id is not None:
+                    matrix = MatrixEvaluation.query.get(job.matrix_id)
+                    if matrix and matrix.status != 'completed':
+                        matrix.status = 'failed'
+                current_app.logger.warning(f"[评估队列] 作业 {job.id} (评估 {job.evaluation_id}) 租约过期，已达最大尝试次数，标记为失败。")
+            else:
+                job.status = 'pending'
+                job.worker_id = None
+                job.lease_expires_at = None
+                job.preempt_requested = False
+                if job.matrix_id is not None:
+                    # 矩阵作业重新执行时会跳过已完成的模型，只重置未完成模型的状态和部分结果
+                    matrix_evaluations = ModelEvaluation.query.filter_by(matrix_id=job.matrix_id).all()
+                    for matrix_evaluation in matrix_evaluations:
+                        if matrix_evaluation.status not in ('completed', 'cancelled'):
+                            matrix_evaluation.status = 'pending'
+                            ModelEvaluationResult.query.filter_by(evaluation_id=matrix_evaluation.id).delete()
+                # 分片作业在开始执行时自行清理所负责数据集的部分结果，不能影响其他分片
+                elif job.shard_index is None and evaluation and evaluation.status not in ('completed', 'failed', 'cancelled'):
+                    evaluation.status = 'pending'
+                    # 清理上一次执行可能写入的部分结果，避免重复
+                    ModelEvaluationResult.query.filter_by(evaluation_id=job.evaluation_id).delete()
+                current_app.logger.warning(f"[评估队列] 作业 {job.id} (评估 {job.evaluation_id}) 租约过期，重新排队。")
+        if expired_jobs:
+            db.session.commit()
+        return len(expired_jobs)
+
+    @staticmethod
+    def run_job(app, job_id: int, worker_id: str, on_heartbeat: Optional[Callable[[], None]] = None) -> Optional[str]:
+        """
+        执行已认领的作业，执行期间由心跳线程定期续约。
+        on_heartbeat在每次续约成功后调用（在app上下文中），返回作业的最终状态。
+        """
+        from app.services.evaluation_service import EvaluationService
+
+        with app.app_context():
+            job = EvaluationJob.query.get(job_id)
+            if not job:
+                return None
+            evaluation_id = job.evaluation_id
+            matrix_id = job.matrix_id
+            EvaluationQueueService.mark_running(job_id)
+
+        stop_event = threading.Event()
+        heartbeat = threading.Thread(
+            target=EvaluationQueueService._heartbeat_loop,
+            args=(app, job_id, worker_id, stop_event, on_heartbeat),
+            daemon=True
+        )
+        heartbeat.start()
+
+        error_message = None
+        try:
+            if matrix_id is not None:
+                EvaluationService._run_matrix_task(app, matrix_id)
+            else:
+                EvaluationService._run_evaluation_task(app, evaluation_id, job_id=job_id)
+        except Exception as e:
+            error_message = str(e)
+            with app.app_context():
+                current_app.logger.error(f"[评估队列] 作业 {job_id} 执行异常: {error_message}", exc_info=True)
+        finally:
+            stop_event.set()
+            heartbeat.join(timeout=5)
+
+        with app.app_context():
+            evaluation = ModelEvaluation.query.get(evaluation_id)
+            job = EvaluationJob.query.get(job_id)
+            if error_message is None and job is not None and job.status == 'pending':
+                # 被抢占后已重新排队
+                notify_evaluation_workers()
+                return 'preempted'
+            cancelled = False
+            if matrix_id is not None:
+                matrix = MatrixEvaluation.query.get(matrix_id)
+                success = error_message is None and matrix is not None and matrix.status == 'completed'
+                cancelled = matrix is not None and matrix.status == 'cancelled'
+                if not success and error_message is None:
+                    error_message = "矩阵评估中有模型评估失败" if matrix is not None else "矩阵评估记录已被删除"
+            elif job is not None and job.shard_index is not None:
+                # 分片作业以是否产出分片结果为准，评估整体状态在全部分片完成后才变为completed
+                success = error_message is None and evaluation is not None and job.shard_result is not None
+            elif evaluation is not None and evaluation.shard_count:
+                # 评估作业算出计划并拆分出分片后即结束，评估由分片作业继续执行
+                success = error_message is None and evaluation.status != 'failed'
+            else:
+                success = error_message is None and evaluation is not None and evaluation.status == 'completed'
+            if matrix_id is None:
+                cancelled = evaluation is not None and evaluation.status == 'cancelled'
+            if cancelled:
+                success = False
+                error_message = None
+            elif not success and error_message is None:
+                if evaluation is None:
+                    error_message = "评估记录已被删除"
+                elif isinstance(evaluation.result_summary, dict):
+                    error_message = evaluation.result_summary.get('error')
+            EvaluationQueueService.finish_job(job_id, success, error_message, cancelled=cancelled)
+            # 矩阵评估中单个模型续评完成后刷新矩阵的对比表
+            if matrix_id is None and evaluation is not None and evaluation.matrix_id is not None:
+                EvaluationService._finalize_matrix(evaluation.matrix_id)
+            final_status = 'cancelled' if cancelled else ('completed' if success else 'failed')
+            if evaluation is not None:
+                # 覆盖评估开始执行前就结束（模型不存在、已取消等）的情况
+                ProgressStreamService.publish_evaluation_status(evaluation_id, evaluation.status)
+            current_app.logger.info(f"[评估队列] 作业 {job_id} (评估 {evaluation_id}) 结束，状态: {final_status}")
+        return final_status
+
+    @staticmethod
+    def _heartbeat_loop(app, job_id: int, worker_id: str, stop_event: threading.Event,
+                        on_heartbeat: Optional[Callable[[], None]] = None) -> None:
+        with app.app_context():
+            interval = max(current_app.config.get('EVAL_JOB_LEASE_SECONDS', 120) / 3.0, 1.0)
+        while not stop_event.wait(interval):
+            with app.app_context():
+                if not EvaluationQueueService.renew_lease(job_id, worker_id):
+                    current_app.logger.warning(f"[评估队列] 作业 {job_id} 已不属于工作线程 {worker_id}，停止续约。")
+                    return
+                if on_heartbeat:
+                    try:
+                        on_heartbeat()
+                    except Exception as e:
+                        current_app.logger.warning(f"[评估队列] 作业 {job_id} 心跳回调失败: {str(e)}")
+
+
+class EvaluationWorkerPool:
+    """进程内的评估工作线程池，线程数量固定，从数据库队列中认领作业执行"""
+
+    def __init__(self, app, pool_size: int):
+        self.app = app
+        self.pool_size = pool_size
+        self.threads = []
+        self._wakeup = threading.Event()
+        self._worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def start(self) -> None:
+        for index in range(self.pool_size):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                args=(f"{self._worker_prefix}:{index}",),
+                name=f"eval-worker-{index}",
+                daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+        self.app.logger.info(f"[评估队列] 进程 {os.getpid()} 启动 {self.pool_size} 个评估工作线程。")
+
+    def notify(self) -> None:
+        """有新作业入队时唤醒空闲的工作线程"""
+        self._wakeup.set()
+
+    def _worker_loop(self, worker_id: str) -> None:
+        poll_interval = self.app.config.get('EVAL_JOB_POLL_INTERVAL', 3)
+        while True:
+            job_id = None
+            try:
+                with self.app.app_context():
+                    job = EvaluationQueueService.claim_next_job(worker_id)
+                    job_id = job.id if job else None
+                if job_id:
+                    EvaluationQueueService.run_job(self.app, job_id, worker_id)
+                    continue
+            except Exception as e:
+                self.app.logger.error(f"[评估队列] 工作线程 {worker_id} 异常: {str(e)}", exc_info=True)
+            self._wakeup.wait(poll_interval)
+            self._wakeup.clear()
+
+
+def start_evaluation_workers(app) -> Optional[EvaluationWorkerPool]:
+    """启动当前进程的评估工作线程池（幂等），未启用时返回None"""
+    global _worker_pool
+    if not app.config.get('EVAL_WORKERS_ENABLED', True):
+        return None
+    if _worker_pool is not None:
+        return _worker_pool
+    with _worker_pool_lock:
+        if _worker_pool is None:
+            pool = EvaluationWorkerPool(app, app.config.get('EVAL_WORKER_POOL_SIZE', 2))
+            pool.start()
+            _worker_pool = pool
+    return _worker_pool
+
+
+def notify_evaluation_workers() -> None:
+    """通知本进程的工作线程有新作业"""
+    if _worker_pool is not None:
+        _worker_pool.notify()
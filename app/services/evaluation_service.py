@@ -6,17 +6,44 @@ from app.models import (
     ModelEvaluationResult, 
     AIModel, 
     Dataset, 
+    EvaluationJob,
+    MatrixEvaluation,
 )
 from flask import current_app
-import threading
-from app.services.model_service import get_decrypted_api_key
+from app.services.model_service import get_decrypted_api_key, get_endpoint_rate_limit
+from app.services.evaluation_queue_service import (
+    EvaluationQueueService,
+    start_evaluation_workers,
+    notify_evaluation_workers,
+)
 from app.utils import get_beijing_time
 from collections import OrderedDict, defaultdict
-from evalscope.run import run_task
+from concurrent.futures import ThreadPoolExecutor
+from app.adapter.managed_evaluator import EvaluationHooks, SharedDatasetCache, run_managed_task
+from app.adapter.cached_model_adapter import CachedModelAdapter
+from app.adapter.cached_judge import CachedJudge
+from app.adapter.cancellable_adapter import CancellableJudge, CancellableModelAdapter, CancellationToken
+from app.adapter.concurrency_limited_adapter import ConcurrencyLimitedModelAdapter, limit_judge_concurrency
+from app.adapter.rate_limited_adapter import RateLimitedModelAdapter, rate_limit_judge
+from app.utils.adaptive_concurrency import AdaptiveConcurrencyLimiter
+from app.utils.cache import get_cache
+from app.utils.early_stopping import EarlyStopping, merge_early_stopping_stats
+from app.utils.keyset_pagination import offset_page, seek_page
+from app.services.prediction_cache_service import CacheCounter, PredictionCacheService
+from app.services.review_ingestion_service import DatasetRouting, ReviewProgressTracker, ReviewTailer, normalize_raw_input
+from app.services.judge_cache_service import JudgeCacheService
+from app.services.dataset_index_service import DatasetIndexService
+from app.services.progress_stream_service import (
+    EVALUATION_TERMINAL_STATUSES, EvaluationProgressReporter, ProgressStreamService
+)
+from app.services.result_search_service import ResultSearchService
 from evalscope.constants import JudgeStrategy
 import os
 import json
-import pandas as pd
+import hashlib
+import threading
+from math import ceil
+from sqlalchemy import bindparam, func
 
 # 导入配置函数
 from app.config import get_outputs_dir
@@ -33,9 +60,6 @@ def serialize_evalscope_report(report_obj):
 # 定义evalscope输出结构中review目录的名称
 OUTPUTS_STRUCTURE_REVIEWS_DIR = 'reviews'
 
-# 简单的缓存机制，存储评估任务的total_prompts
-_evaluation_total_prompts_cache = {}
-
 class EvaluationService:
     """模型评估服务，处理评估相关的业务逻辑"""
     
@@ -52,20 +76,28 @@ class EvaluationService:
         name: Optional[str] = None,
         limit: Optional[int] = None,  # 新增 limit 参数
         judge_worker_num: Optional[int] = None,  # 新增并发数参数
-        eval_batch_size: Optional[int] = None  # 新增评估并发数参数
+        eval_batch_size: Optional[int] = None,  # 新增评估并发数参数
+        use_prediction_cache: bool = False,
+        adaptive_concurrency: bool = False,
+        early_stop_margin: Optional[float] = None,
+        early_stop_confidence: float = 0.95,
+        priority: str = 'normal'
     ) -> Optional[ModelEvaluation]:
         """
         创建一个新的模型评估任务
+        只保存评估记录并入队，评估计划（需要加载数据集统计样本数）由工作进程开始执行时计算，
+        计划算出后再决定是否拆分为分片
         """
         try:
             if not name:
                 model = AIModel.query.get(model_id)
                 name = f"{model.display_name if model else '未知模型'}的评估_{get_beijing_time().strftime('%Y%m%d_%H%M%S')}"
-            
-            evaluation = ModelEvaluation(
+
+            evaluation = EvaluationService._add_evaluation_record(
                 user_id=user_id,
                 model_id=model_id,
                 judge_model_id=judge_model_id,
+                datasets=datasets,
                 name=name,
                 temperature=temperature,
                 max_tokens=max_tokens,
@@ -73,29 +105,20 @@ class EvaluationService:
                 top_p=top_p,  # 添加top_p
                 judge_worker_num=judge_worker_num,  # 添加并发数
                 eval_batch_size=eval_batch_size,  # 添加评估并发数
-                status='pending',
-                limit=limit  # 保存 limit 值
+                limit=limit,  # 保存 limit 值
+                use_prediction_cache=use_prediction_cache,
+                adaptive_concurrency=adaptive_concurrency,
+                early_stop_margin=early_stop_margin,
+                early_stop_confidence=early_stop_confidence,
+                priority=priority
             )
-            db.session.add(evaluation)
-            db.session.flush()
-            
-            for dataset_info in datasets:
-                dataset_id = dataset_info.get('dataset_id')
-                eval_dataset = ModelEvaluationDataset(
-                    evaluation_id=evaluation.id,
-                    dataset_id=dataset_id,
-                    subset=None, 
-                    split=None   
-                )
-                db.session.add(eval_dataset)
             
+            # 加入持久化的评估队列，由工作线程按并发上限认领执行
+            EvaluationQueueService.enqueue(evaluation)
             db.session.commit()
             
-            app_context = current_app._get_current_object()
-            threading.Thread(
-                target=EvaluationService._run_evaluation_task, 
-                args=(app_context, evaluation.id,)
-            ).start()
+            start_evaluation_workers(current_app._get_current_object())
+            notify_evaluation_workers()
             
             return evaluation
         
@@ -105,17 +128,272 @@ class EvaluationService:
             return None
     
     @staticmethod
-    def _run_evaluation_task(app, evaluation_id: int) -> None: 
+    def _add_evaluation_record(user_id: int, model_id: int, datasets: List[Dict[str, Any]], **fields) -> ModelEvaluation:
+        """新增评估记录及其数据集关联（由调用方提交事务）"""
+        evaluation = ModelEvaluation(user_id=user_id, model_id=model_id, status='pending', **fields)
+        db.session.add(evaluation)
+        db.session.flush()
+
+        dataset_ids = []
+        for dataset_info in datasets:
+            dataset_id = dataset_info.get('dataset_id')
+            dataset_ids.append(dataset_id)
+            eval_dataset = ModelEvaluationDataset(
+                evaluation_id=evaluation.id,
+                dataset_id=dataset_id,
+                subset=None, 
+                split=None   
+            )
+            db.session.add(eval_dataset)
+        evaluation.dataset_routing = EvaluationService._build_dataset_routing(
+            Dataset.query.filter(Dataset.id.in_(dataset_ids)).all()
+        )
+        return evaluation
+
+    @staticmethod
+    def _build_dataset_routing(datasets: List[Dataset]) -> Dict[str, int]:
+        """
+        生成evalscope结果路由表 {"基准名/子集": dataset_id}，基准名和子集与传给evalscope的dataset_args一致。
+        review文件名为"基准名_子集"，详细结果入库和进度统计都按这张表确定文件属于哪个数据集。
+        系统数据集记录已注册的全部子集，并用"基准名/*"匹配未列出的子集。
+        """
+        routing = {}
+        for dataset in datasets:
+            if dataset.dataset_type == '系统':
+                from evalscope.benchmarks.benchmark import BENCHMARK_MAPPINGS
+                benchmark_meta = BENCHMARK_MAPPINGS.get(dataset.name)
+                for subset_name in (benchmark_meta.subset_list if benchmark_meta else []):
+                    routing[f'{dataset.name}/{subset_name}'] = dataset.id
+                routing[f'{dataset.name}/*'] = dataset.id
+            elif dataset.dataset_type == '自建':
+                if dataset.format == 'MCQ':
+                    benchmark_key = 'general_mcq'
+                elif dataset.format == 'QA':
+                    benchmark_key = 'general_qa'
+                elif dataset.format == 'CUSTOM':
+                    benchmark_key = f'custom_dataset_{dataset.id}'
+                else:
+                    continue
+                # 自建数据集的子集名即上传文件名
+                subset_name = os.path.splitext(os.path.basename(dataset.download_url))[0]
+                routing[f'{benchmark_key}/{subset_name}'] = dataset.id
+        return routing
+
+    @staticmethod
+    def create_matrix_evaluation(
+        user_id: int,
+        model_ids: List[int],
+        judge_model_id: Optional[int],
+        datasets: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: int,
+        top_k: Optional[int] = None,
+        top_p: Optional[float] = None,
+        name: Optional[str] = None,
+        limit: Optional[int] = None,
+        judge_worker_num: Optional[int] = None,
+        eval_batch_size: Optional[int] = None,
+        use_prediction_cache: bool = False,
+        adaptive_concurrency: bool = False,
+        early_stop_margin: Optional[float] = None,
+        early_stop_confidence: float = 0.95,
+        priority: str = 'normal'
+    ) -> Optional[MatrixEvaluation]:
+        """
+        创建模型×数据集矩阵评估：为每个模型创建一个评估记录，整个矩阵作为一个作业入队，
+        执行时数据集只加载和渲染一次，再并发分发给所有模型。
+        """
+        try:
+            if not name:
+                name = f"{len(model_ids)}个模型的矩阵评估_{get_beijing_time().strftime('%Y%m%d_%H%M%S')}"
+            matrix = MatrixEvaluation(user_id=user_id, name=name, status='pending')
+            db.session.add(matrix)
+            db.session.flush()
+
+            evaluations = []
+            for model_id in model_ids:
+                model = AIModel.query.get(model_id)
+                evaluations.append(EvaluationService._add_evaluation_record(
+                    user_id=user_id,
+                    model_id=model_id,
+                    judge_model_id=judge_model_id,
+                    datasets=datasets,
+                    name=f"{name} - {model.display_name if model else model_id}",
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    top_k=top_k,
+                    top_p=top_p,
+                    judge_worker_num=judge_worker_num,
+                    eval_batch_size=eval_batch_size,
+                    limit=limit,
+                    use_prediction_cache=use_prediction_cache,
+                    adaptive_concurrency=adaptive_concurrency,
+                    early_stop_margin=early_stop_margin,
+                    early_stop_confidence=early_stop_confidence,
+                    priority=priority,
+                    matrix_id=matrix.id
+                ))
+
+            EvaluationQueueService.enqueue(evaluations[0], matrix_id=matrix.id)
+            db.session.commit()
+
+            start_evaluation_workers(current_app._get_current_object())
+            notify_evaluation_workers()
+            return matrix
+
+        except Exception as e:
+            current_app.logger.error(f"创建矩阵评估失败: {str(e)}", exc_info=True)
+            db.session.rollback()
+            return None
+
+    @staticmethod
+    def _run_matrix_task(app, matrix_id: int) -> None:
+        """执行矩阵评估：各模型的评估共享同一个数据集缓存，按MATRIX_MAX_PARALLEL_MODELS并发执行"""
+        with app.app_context():
+            matrix = MatrixEvaluation.query.get(matrix_id)
+            if not matrix:
+                current_app.logger.error(f"[矩阵评估 {matrix_id}] 无法找到评估记录。")
+                return
+            matrix.status = 'running'
+            db.session.commit()
+            # 重试时跳过已完成和已取消的模型
+            evaluations = [
+                evaluation for evaluation in matrix.evaluations.order_by(ModelEvaluation.id.asc()).all()
+                if evaluation.status not in ('completed', 'cancelled')
+            ]
+            evaluation_ids = [evaluation.id for evaluation in evaluations]
+            # 各模型评估相同的数据集，计划只计算一次
+            unplanned = [evaluation for evaluation in evaluations if evaluation.plan is None]
+            if unplanned:
+                EvaluationService._ensure_evaluation_plan(unplanned[0])
+                for evaluation in unplanned[1:]:
+                    evaluation.plan = unplanned[0].plan
+                db.session.commit()
+            endpoint_keys = {
+                evaluation.id: evaluation.model.endpoint_key if evaluation.model else f"model:{evaluation.model_id}"
+                for evaluation in evaluations
+            }
+            max_parallel = max(1, current_app.config.get('MATRIX_MAX_PARALLEL_MODELS', 4))
+            max_per_endpoint = max(1, current_app.config.get('EVAL_MAX_JOBS_PER_ENDPOINT', 1))
+            current_app.logger.info(f"[矩阵评估 {matrix_id}] 开始评估 {len(evaluation_ids)} 个模型，并发 {max_parallel}。")
+
+        dataset_cache = SharedDatasetCache()
+        # 矩阵中使用同一端点的模型也遵守端点并发上限
+        endpoint_slots = {
+            endpoint_key: threading.Semaphore(max_per_endpoint) for endpoint_key in set(endpoint_keys.values())
+        }
+
+        def run_one(evaluation_id: int) -> None:
+            try:
+                with endpoint_slots[endpoint_keys[evaluation_id]]:
+                    EvaluationService._run_evaluation_task(app, evaluation_id, dataset_cache=dataset_cache)
+            except Exception as e:
+                with app.app_context():
+                    current_app.logger.error(f"[矩阵评估 {matrix_id}] 评估 {evaluation_id} 执行异常: {str(e)}", exc_info=True)
+                    evaluation = ModelEvaluation.query.get(evaluation_id)
+                    if evaluation and evaluation.status not in ('completed', 'cancelled'):
+                        evaluation.status = 'failed'
+                        evaluation.result_summary = {"error": str(e)}
+                        db.session.commit()
+
+        if evaluation_ids:
+            with ThreadPoolExecutor(max_workers=min(max_parallel, len(evaluation_ids))) as executor:
+                list(executor.map(run_one, evaluation_ids))
+
+        with app.app_context():
+            EvaluationService._finalize_matrix(matrix_id)
+
+    @staticmethod
+    def _finalize_matrix(matrix_id: int) -> Optional[MatrixEvaluation]:
+        """根据各模型的评估报告生成对比表，所有模型都结束后更新矩阵评估的状态"""
+        matrix = MatrixEvaluation.query.get(matrix_id)
+        if not matrix:
+            return None
+
+        evaluations = matrix.evaluations.order_by(ModelEvaluation.id.asc()).all()
+        dataset_columns = OrderedDict()
+        rows = []
+        for evaluation in evaluations:
+            scores = {}
+            summary = evaluation.result_summary if evaluation.status == 'completed' else None
+            for dataset_key, report in (summary or {}).items():
+                if isinstance(report, dict) and isinstance(report.get('score'), (int, float)):
+                    scores[dataset_key] = report['score']
+                    dataset_columns.setdefault(dataset_key, report.get('dataset_pretty_name') or dataset_key)
+            rows.append({
+                'evaluation_id': evaluation.id,
+                'model_id': evaluation.model_id,
+                'model_name': evaluation.model.display_name if evaluation.model else str(evaluation.model_id),
+                'status': evaluation.status,
+                'scores': scores,
+                'average': round(sum(scores.values()) / len(scores), 4) if scores else None,
+            })
+        rows.sort(key=lambda row: (row['average'] is None, -(row['average'] or 0)))
+        matrix.comparison = {
+            'datasets': [{'key': key, 'name': display_name} for key, display_name in dataset_columns.items()],
+            'rows': rows,
+        }
+
+        if evaluations and all(evaluation.status in ('completed', 'failed', 'cancelled') for evaluation in evaluations):
+            statuses = {evaluation.status for evaluation in evaluations}
+            if 'failed' in statuses:
+                matrix.status = 'failed'
+            elif 'cancelled' in statuses:
+                matrix.status = 'cancelled'
+            else:
+                matrix.status = 'completed'
+            matrix.completed_at = get_beijing_time()
+        db.session.commit()
+        current_app.logger.info(f"[矩阵评估 {matrix_id}] 对比表已更新，状态: {matrix.status}")
+        return matrix
+
+    @staticmethod
+    def get_matrix_by_id(matrix_id: int, user_id: int) -> Optional[MatrixEvaluation]:
+        matrix = MatrixEvaluation.query.get(matrix_id)
+        if matrix and matrix.user_id == user_id:
+            return matrix
+        return None
+
+    @staticmethod
+    def get_matrices_for_user(user_id: int, limit: int = 5) -> List[MatrixEvaluation]:
+        return MatrixEvaluation.query.filter_by(user_id=user_id).order_by(MatrixEvaluation.created_at.desc()).limit(limit).all()
+
+    @staticmethod
+    def _run_evaluation_task(app, evaluation_id: int, job_id: Optional[int] = None,
+                             dataset_cache: Optional[SharedDatasetCache] = None) -> None: 
         with app.app_context(): 
             current_app.logger.info(f"[评估任务 {evaluation_id}] 开始执行。")
             evaluation = ModelEvaluation.query.get(evaluation_id)
             if not evaluation:
                 current_app.logger.error(f"[评估任务 {evaluation_id}] 无法找到评估记录。")
                 return
+
+            if evaluation.cancel_requested or evaluation.status == 'cancelled':
+                current_app.logger.info(f"[评估任务 {evaluation_id}] 评估在开始执行前已被取消。")
+                if evaluation.status != 'cancelled':
+                    EvaluationService._mark_cancelled(evaluation_id)
+                return
+
+            # 分片作业只评估分配给它的数据集，结果在全部分片完成后合并
+            shard_job = EvaluationJob.query.get(job_id) if job_id else None
+            if shard_job is not None and shard_job.shard_index is None:
+                shard_job = None
+            if shard_job is not None:
+                if evaluation.status == 'failed':
+                    current_app.logger.warning(f"[评估任务 {evaluation_id}] 其他分片已失败，跳过分片 {shard_job.shard_index}。")
+                    return
+                current_app.logger.info(f"[评估任务 {evaluation_id}] 执行分片 {shard_job.shard_index}/{evaluation.shard_count}，数据集: {shard_job.shard_subsets or shard_job.shard_dataset_ids}")
             
             evaluation.status = 'running'
             db.session.commit()
+            ProgressStreamService.publish_evaluation_status(evaluation_id, 'running')
             current_app.logger.info(f"[评估任务 {evaluation_id}] 状态更新为 'running'。")
+
+            # 计划在分片之前计算：队列中的评估作业先算出计划，按样本数拆分为分片后结束，由分片作业执行评估
+            if shard_job is None:
+                EvaluationService._ensure_evaluation_plan(evaluation)
+                if job_id is not None and EvaluationService._split_into_shards(evaluation):
+                    return
             
             model_to_evaluate = AIModel.query.get(evaluation.model_id)
             judge_model_for_evalscope = None if evaluation.judge_model_id is None else AIModel.query.get(evaluation.judge_model_id)
@@ -136,19 +414,28 @@ class EvaluationService:
                 judge_model_identifier = judge_model_for_evalscope.model_identifier
 
             eval_dataset_associations = ModelEvaluationDataset.query.filter_by(evaluation_id=evaluation_id).all()
+            if shard_job is not None:
+                shard_dataset_ids = set(shard_job.shard_dataset_ids or [])
+                eval_dataset_associations = [assoc for assoc in eval_dataset_associations if assoc.dataset_id in shard_dataset_ids]
             dataset_names_for_evalscope = []
             dataset_args = {}  # 新增：为自建数据集准备的dataset_args
+            # 分片负责的子集和样本范围，旧版本入队的分片（没有shard_subsets）评估整个数据集
+            shard_subsets = (shard_job.shard_subsets or {}) if shard_job is not None else {}
+            sample_ranges = {}
 
             # 获取所有参与评估的数据集的名称 (这些是传递给evalscope的名称)
             for assoc in eval_dataset_associations:
                 dataset = Dataset.query.get(assoc.dataset_id)
                 if dataset:
+                    benchmark_key = None
                     if dataset.dataset_type == '系统':
                         # 系统数据集直接使用名称
+                        benchmark_key = dataset.name
                         dataset_names_for_evalscope.append(dataset.name) 
                     elif dataset.dataset_type == '自建':
                         # 自建数据集根据格式使用general_mcq或general_qa
                         if dataset.format == 'MCQ':
+                            benchmark_key = 'general_mcq'
                             if 'general_mcq' not in dataset_names_for_evalscope:
                                 dataset_names_for_evalscope.append('general_mcq')
                             
@@ -170,6 +457,7 @@ class EvaluationService:
                                     dataset_args['general_mcq']['subset_list'].append(dataset_name)
                             
                         elif dataset.format == 'QA':
+                            benchmark_key = 'general_qa'
                             if 'general_qa' not in dataset_names_for_evalscope:
                                 dataset_names_for_evalscope.append('general_qa')
                             
@@ -198,7 +486,14 @@ class EvaluationService:
                             
                             # 动态注册自定义数据集基准测试
                             from app.adapter.custom_dataset_adapter import register_custom_dataset_benchmark
-                            custom_dataset_key = register_custom_dataset_benchmark(dataset.id)
+                            if dataset_cache is not None:
+                                # 矩阵评估中同一数据集只注册一次
+                                custom_dataset_key = dataset_cache.memoize(
+                                    ('benchmark', dataset.id),
+                                    lambda dataset_id=dataset.id: register_custom_dataset_benchmark(dataset_id)
+                                )
+                            else:
+                                custom_dataset_key = register_custom_dataset_benchmark(dataset.id)
                             
                             # 为每个自定义数据集创建单独的配置
                             dataset_args[custom_dataset_key] = {
@@ -212,8 +507,13 @@ class EvaluationService:
                                 dataset_args[custom_dataset_key]['template_content'] = dataset.jinja2_template
                             
                             # 添加到评估数据集列表
+                            benchmark_key = custom_dataset_key
                             dataset_names_for_evalscope.append(custom_dataset_key)
                         current_app.logger.info(f"[评估任务 {evaluation_id}] 添加自建数据集 {dataset.name}，格式: {dataset.format}，文件路径: {dataset.download_url}")
+                    if benchmark_key:
+                        EvaluationService._apply_shard_subsets(
+                            dataset, benchmark_key, shard_subsets.get(str(dataset.id)), dataset_args, sample_ranges
+                        )
                 else:
                     current_app.logger.warning(f"[评估任务 {evaluation_id}] 数据集ID {assoc.dataset_id} 无法找到或名称为空，已跳过。")
             
@@ -224,19 +524,78 @@ class EvaluationService:
                 current_app.logger.error(f"[评估任务 {evaluation_id}] 失败: 没有提供有效的数据集进行评估。")
                 return
 
-            evalscope_run_timestamp = get_beijing_time().strftime('%Y%m%d_%H%M%S')
-            base_output_dir = os.path.join(get_outputs_dir(), f'eval_{evaluation_id}_{evalscope_run_timestamp}') 
-            try:
-                os.makedirs(base_output_dir, exist_ok=True)
-            except Exception as e:
-                current_app.logger.error(f"[评估任务 {evaluation_id}] 创建evalscope输出目录失败: {base_output_dir}, error: {e}")
-                evaluation.status = 'failed'
-                evaluation.result_summary = {"error": f"创建输出目录失败: {e}"}
+            if evaluation.dataset_routing is None:
+                # 早于路由表创建的评估（续评/重试）在这里补齐
+                all_dataset_ids = [assoc.dataset_id for assoc in ModelEvaluationDataset.query.filter_by(evaluation_id=evaluation_id)]
+                evaluation.dataset_routing = EvaluationService._build_dataset_routing(
+                    Dataset.query.filter(Dataset.id.in_(all_dataset_ids)).all()
+                )
+                db.session.commit()
+
+            # 断点续评：已有输出目录时复用上一次的evalscope工作目录，只评估剩余样本
+            resume_work_dir = None
+            if shard_job is not None:
+                # 每个分片在评估输出目录下使用独立的子目录，可单独续评
+                base_output_dir = os.path.join(evaluation.output_dir, f'shard_{shard_job.shard_index}')
+                if os.path.isdir(base_output_dir):
+                    resume_work_dir = EvaluationService._find_run_work_dir(base_output_dir)
+                if resume_work_dir:
+                    EvaluationService._repair_output_jsonl_files(resume_work_dir)
+                    current_app.logger.info(f"[评估任务 {evaluation_id}] 分片 {shard_job.shard_index} 从已有输出目录续评: {resume_work_dir}")
+                else:
+                    try:
+                        os.makedirs(base_output_dir, exist_ok=True)
+                    except Exception as e:
+                        current_app.logger.error(f"[评估任务 {evaluation_id}] 创建分片输出目录失败: {base_output_dir}, error: {e}")
+                        evaluation.status = 'failed'
+                        evaluation.result_summary = {"error": f"创建输出目录失败: {e}"}
+                        db.session.commit()
+                        return
+            elif evaluation.output_dir and os.path.isdir(evaluation.output_dir):
+                base_output_dir = evaluation.output_dir
+                resume_work_dir = EvaluationService._find_run_work_dir(base_output_dir)
+                if resume_work_dir:
+                    EvaluationService._repair_output_jsonl_files(resume_work_dir)
+                    current_app.logger.info(f"[评估任务 {evaluation_id}] 从已有输出目录续评: {resume_work_dir}")
+            else:
+                evalscope_run_timestamp = get_beijing_time().strftime('%Y%m%d_%H%M%S')
+                base_output_dir = os.path.abspath(os.path.join(get_outputs_dir(), f'eval_{evaluation_id}_{evalscope_run_timestamp}'))
+                try:
+                    os.makedirs(base_output_dir, exist_ok=True)
+                except Exception as e:
+                    current_app.logger.error(f"[评估任务 {evaluation_id}] 创建evalscope输出目录失败: {base_output_dir}, error: {e}")
+                    evaluation.status = 'failed'
+                    evaluation.result_summary = {"error": f"创建输出目录失败: {e}"}
+                    db.session.commit()
+                    return
+                evaluation.output_dir = base_output_dir
                 db.session.commit()
-                return
 
             decrypted_api_key = get_decrypted_api_key(model_to_evaluate)
 
+            # 自适应并发：evalscope线程池按上限创建，实际并发由AIMD限制器控制，起始值取同一端点上次学到的并发
+            generation_concurrency = evaluation.eval_batch_size or 4
+            judge_concurrency = evaluation.judge_worker_num
+            generation_limiter = None
+            judge_limiter = None
+            if evaluation.adaptive_concurrency:
+                learned_concurrency = EvaluationService._get_learned_concurrency(model_to_evaluate, judge_model_for_evalscope)
+                generation_limiter = AdaptiveConcurrencyLimiter(
+                    initial_limit=learned_concurrency.get('generation') or generation_concurrency,
+                    max_limit=current_app.config.get('ADAPTIVE_CONCURRENCY_MAX', 32)
+                )
+                generation_concurrency = generation_limiter.max_limit
+                if judge_model_identifier:
+                    judge_limiter = AdaptiveConcurrencyLimiter(
+                        initial_limit=learned_concurrency.get('judge') or judge_concurrency or 1,
+                        max_limit=current_app.config.get('ADAPTIVE_JUDGE_CONCURRENCY_MAX', 32)
+                    )
+                    judge_concurrency = judge_limiter.max_limit
+                current_app.logger.info(
+                    f"[评估任务 {evaluation_id}] 自适应并发已启用，起始生成并发: {generation_limiter.limit}"
+                    f"{f'，起始裁判并发: {judge_limiter.limit}' if judge_limiter else ''}"
+                )
+
             # 使用TaskConfig格式创建任务配置
             try:
                 from evalscope import TaskConfig
@@ -256,11 +615,11 @@ class EvaluationService:
                         'top_k': evaluation.top_k,
                         'top_p': evaluation.top_p
                     },
-                    'eval_batch_size': evaluation.eval_batch_size or 4  # 使用评估并发数
+                    'eval_batch_size': generation_concurrency  # 使用评估并发数
                 }
                 if judge_model_identifier:
                     task_cfg_args['judge_strategy'] = JudgeStrategy.AUTO
-                    task_cfg_args['judge_worker_num'] = evaluation.judge_worker_num
+                    task_cfg_args['judge_worker_num'] = judge_concurrency
                     task_cfg_args['judge_model_args'] = {
                         'model_id': judge_model_identifier,
                         'api_url': judge_api_url if judge_api_url else '',
@@ -279,6 +638,9 @@ class EvaluationService:
                 if evaluation.limit and int(evaluation.limit) > 0:
                     task_cfg_args['limit'] = int(evaluation.limit)
 
+                if resume_work_dir:
+                    task_cfg_args['use_cache'] = resume_work_dir
+
                 # 使用TaskConfig创建配置对象
                 task_cfg = TaskConfig(**task_cfg_args)
                 
@@ -313,164 +675,168 @@ class EvaluationService:
                 if evaluation.limit and int(evaluation.limit) > 0:
                     task_cfg['limit'] = int(evaluation.limit)
 
+                if resume_work_dir:
+                    task_cfg['use_cache'] = resume_work_dir
+
                 current_app.logger.info(f"[评估任务 {evaluation_id}] Evalscope task_cfg: {json.dumps(task_cfg, indent=2)}")
 
             evalscope_final_report = {}
-            detailed_results_to_save = [] # 用于存储 ModelEvaluationResult 对象
             eval_successful = False
 
+            hooks = EvaluationHooks()
+            # 端点限流包在最内层，只有真正发往模型服务的请求才扣减配额
+            generation_rate_limit = get_endpoint_rate_limit(model_to_evaluate)
+            if generation_rate_limit:
+                hooks.add_model_adapter_wrapper(lambda model_adapter: RateLimitedModelAdapter(
+                    model_adapter,
+                    generation_rate_limit['limiter'],
+                    generation_rate_limit['endpoint_key'],
+                    rpm=generation_rate_limit['rpm'],
+                    tpm=generation_rate_limit['tpm']
+                ))
+                current_app.logger.info(f"[评估任务 {evaluation_id}] 生成请求启用端点限流: RPM={generation_rate_limit['rpm']}, TPM={generation_rate_limit['tpm']}")
+            judge_rate_limit = get_endpoint_rate_limit(judge_model_for_evalscope) if judge_model_identifier else None
+            if judge_rate_limit:
+                hooks.add_judge_wrapper(lambda judge: rate_limit_judge(
+                    judge,
+                    judge_rate_limit['limiter'],
+                    judge_rate_limit['endpoint_key'],
+                    rpm=judge_rate_limit['rpm'],
+                    tpm=judge_rate_limit['tpm']
+                ))
+                current_app.logger.info(f"[评估任务 {evaluation_id}] 裁判请求启用端点限流: RPM={judge_rate_limit['rpm']}, TPM={judge_rate_limit['tpm']}")
+
+            # 并发控制包在限流外层，缓存命中的请求不占用并发槽位
+            if generation_limiter:
+                hooks.add_model_adapter_wrapper(lambda model_adapter: ConcurrencyLimitedModelAdapter(model_adapter, generation_limiter))
+            if judge_limiter:
+                hooks.add_judge_wrapper(lambda judge: limit_judge_concurrency(judge, judge_limiter))
+
+            # 在模型调用外层接入跨评估的回答缓存
+            prediction_cache_counter = CacheCounter()
+            if current_app.config.get('PREDICTION_CACHE_ENABLED', True):
+                replay_predictions = PredictionCacheService.is_replay_enabled(evaluation)
+                hooks.add_model_adapter_wrapper(lambda model_adapter: CachedModelAdapter(
+                    model_adapter,
+                    app,
+                    api_base_url=model_to_evaluate.api_base_url,
+                    model_identifier=model_to_evaluate.model_identifier,
+                    counter=prediction_cache_counter,
+                    replay=replay_predictions
+                ))
+                current_app.logger.info(f"[评估任务 {evaluation_id}] 回答缓存已启用，复用缓存回答: {replay_predictions}")
+
+            # 在裁判调用外层接入跨评估的评判结果缓存
+            judge_cache_counter = CacheCounter()
+            if judge_model_identifier and current_app.config.get('JUDGE_CACHE_ENABLED', True):
+                hooks.add_judge_wrapper(lambda judge: CachedJudge(judge, app, judge_cache_counter))
+
+            # 取消检查包在最外层：取消后缓存命中的请求也不再继续，正在等待响应的请求随客户端关闭立即中断
+            cancellation_token = CancellationToken()
+            hooks.add_model_adapter_wrapper(lambda model_adapter: CancellableModelAdapter(model_adapter, cancellation_token))
+            if judge_model_identifier:
+                hooks.add_judge_wrapper(lambda judge: CancellableJudge(judge, cancellation_token))
+
+            # 早停：按子集分层随机抽样，置信区间达到目标宽度后停止；随机种子固定为评估ID，续评时顺序不变
+            early_stopping = None
+            if evaluation.early_stop_margin:
+                early_stopping = EarlyStopping(
+                    margin=evaluation.early_stop_margin,
+                    confidence=evaluation.early_stop_confidence or 0.95,
+                    min_samples=current_app.config.get('EVAL_EARLY_STOP_MIN_SAMPLES', 30),
+                    seed=evaluation.id
+                )
+                current_app.logger.info(f"[评估任务 {evaluation_id}] 早停已启用，目标置信区间: ±{evaluation.early_stop_margin} ({early_stopping.confidence:.0%})")
+
+            # 详细结果在评估过程中增量入库：清理上一次（重试/续评）写入的结果，由tailer从review文件开头重新跟随
+            if not os.path.isabs(base_output_dir):
+                base_output_dir = os.path.abspath(base_output_dir)
+            stale_results = ModelEvaluationResult.query.filter(ModelEvaluationResult.evaluation_id == evaluation_id)
+            if shard_job is not None and shard_job.shard_subsets is not None:
+                # 同一数据集的子集和样本范围可能分给多个分片，只清理本分片写入的结果
+                stale_results = stale_results.filter(ModelEvaluationResult.shard_index == shard_job.shard_index)
+            elif shard_job is not None:
+                stale_results = stale_results.filter(ModelEvaluationResult.dataset_id.in_(shard_job.shard_dataset_ids or []))
+            stale_results.delete(synchronize_session=False)
+            db.session.commit()
+            # fix: model_to_evaluate.model_identifier可能是deepseek/deepseek-r1-0528-qwen3-8b这种格式，需要做个处理
+            result_tailer = ReviewTailer(
+                app,
+                evaluation_id,
+                base_output_dir,
+                model_to_evaluate.model_identifier.split('/')[-1],
+                evaluation.dataset_routing,
+                interval=current_app.config.get('EVAL_RESULT_INGEST_INTERVAL', 5),
+                batch_size=current_app.config.get('EVAL_RESULT_INGEST_BATCH_SIZE', 200),
+                prompt_renderer=EvaluationService.render_user_prompt_for_dataset,
+                shard_index=shard_job.shard_index if shard_job is not None else None
+            )
+            result_tailer.start()
+
+            # 进度由工作进程统计并推送给所有查看者
+            progress_reporter = EvaluationProgressReporter(
+                app,
+                evaluation_id,
+                evaluation.user_id,
+                interval=current_app.config.get('EVAL_PROGRESS_PUBLISH_INTERVAL', 2),
+                current_dataset=lambda: result_tailer.current_dataset_id,
+                should_report=(lambda: EvaluationQueueService.is_progress_reporting_job(job_id)) if shard_job is not None else None
+            )
+            progress_reporter.start()
+
+            cancel_watch_stop = threading.Event()
+            threading.Thread(
+                target=EvaluationService._watch_cancellation,
+                args=(app, evaluation_id, cancellation_token, cancel_watch_stop, job_id),
+                name=f"cancel-watcher-{evaluation_id}",
+                daemon=True
+            ).start()
+
             try:
-                raw_report_from_evalscope = run_task(task_cfg=task_cfg)
+                raw_report_from_evalscope = run_managed_task(task_cfg, hooks, dataset_cache, early_stopping, sample_ranges)
                 current_app.logger.info(f"[评估任务 {evaluation_id}] Evalscope run_task completed.")
                 eval_successful = True
 
+                # 写入review文件中剩余的增量
+                ingested_results = result_tailer.stop()
+                current_app.logger.info(f"[评估任务 {evaluation_id}] 详细结果入库完成，共 {ingested_results} 条。")
+
                 if isinstance(raw_report_from_evalscope, dict):
                     for ds_name_key, report_obj in raw_report_from_evalscope.items():
                         evalscope_final_report[ds_name_key] = serialize_evalscope_report(report_obj)
+                        if early_stopping and ds_name_key in early_stopping.results and isinstance(evalscope_final_report[ds_name_key], dict):
+                            evalscope_final_report[ds_name_key]['early_stopping'] = early_stopping.results[ds_name_key]
                     current_app.logger.info(f"[评估任务 {evaluation_id}] Evalscope report processed and serialized.")
                 else:
                     current_app.logger.error(f"[评估任务 {evaluation_id}] Evalscope run_task did not return a dictionary as expected. Got: {type(raw_report_from_evalscope)}")
                     evalscope_final_report = {"error": "Evalscope did not return a dictionary.", "raw_output": str(raw_report_from_evalscope)}
                     eval_successful = False # 标记evalscope处理报告部分失败
 
-                # 如果Evalscope执行成功并且我们获得了报告字典，尝试解析详细结果
-                if eval_successful and isinstance(evalscope_final_report, dict) and not evalscope_final_report.get("error"):
-                    current_app.logger.info(f"[评估任务 {evaluation_id}] Attempting to parse detailed review files.")
-                    # 确保base_output_dir是绝对路径
-                    if not os.path.isabs(base_output_dir):
-                        base_output_dir = os.path.abspath(base_output_dir)
-                    t_base_output_dir = base_output_dir
-                    for k in os.listdir(base_output_dir):
-                        t_base_output_dir = os.path.join(base_output_dir, k)
-                    
-                    # fix: model_to_evaluate.model_identifier可能是deepseek/deepseek-r1-0528-qwen3-8b这种格式，需要做个处理
-                    t_model_identifier = model_to_evaluate.model_identifier.split('/')[-1]
-                    reviews_base_path = os.path.join(t_base_output_dir, OUTPUTS_STRUCTURE_REVIEWS_DIR, t_model_identifier)
-                    if os.path.isdir(reviews_base_path):
-                        for review_filename_in_dir in os.listdir(reviews_base_path):
-                            review_file_path = os.path.join(reviews_base_path, review_filename_in_dir)
-                            
-                            if os.path.isfile(review_file_path) and review_filename_in_dir.endswith('.jsonl'):
-                                current_app.logger.info(f"[评估任务 {evaluation_id}] Processing review file: {review_file_path}")
-                                
-                                filename_stem = review_filename_in_dir[:-6] # Remove .jsonl
-                                
-                                # 根据filename_stem查找对应的dataset
-                                corresponding_dataset = None
-                                for assoc in eval_dataset_associations:
-                                    dataset = Dataset.query.get(assoc.dataset_id)
-                                    if dataset:
-                                        if dataset.dataset_type == '系统':
-                                            # 系统数据集直接比较名称
-                                            if dataset.name in filename_stem:
-                                                corresponding_dataset = dataset
-                                                break
-                                        elif dataset.dataset_type == '自建':
-                                            # 自建数据集比较文件名（去掉扩展名后的部分）
-                                            if dataset.download_url:
-                                                dataset_filename = os.path.splitext(os.path.basename(dataset.download_url))[0]
-                                                prefix = ''
-                                                if dataset.format.lower() == 'custom':
-                                                    prefix = f'custom_dataset_{dataset.id}'
-                                                elif dataset.format.lower() == 'qa':
-                                                    prefix = 'general_qa'
-                                                elif dataset.format.lower() == 'mcq':
-                                                    prefix = 'general_mcq'
-                                                else:
-                                                    prefix = f'custom_dataset_{dataset.id}'
-                                                if f'{prefix}_{dataset_filename}' == filename_stem:
-                                                    corresponding_dataset = dataset
-                                                    break
-                                
-                                if not corresponding_dataset:
-                                    current_app.logger.warning(f"[评估任务 {evaluation_id}] 无法找到filename_stem '{filename_stem}' 对应的数据集，跳过该文件")
-                                    continue
-
-                                try:
-                                    origin_df = pd.read_json(review_file_path, lines=True)
-                                    for _, item in origin_df.iterrows():
-                                        raw_input = item.get('raw_input', '')
-                                        raw_pred_answer = ''
-                                        choices = item.get('choices', [])
-                                        if choices and isinstance(choices, list) and len(choices) > 0:
-                                            choice = choices[0]
-                                            if isinstance(choice, dict) and 'message' in choice and isinstance(choice['message'], dict):
-                                                raw_pred_answer = choice['message'].get('content', '')
-                                            elif isinstance(choice, dict) and 'content' in choice:
-                                                 raw_pred_answer = choice.get('content', '')
-                                        
-                                        review_data = {}
-                                        if choices and isinstance(choices, list) and len(choices) > 0 and isinstance(choices[0], dict):
-                                            review_data = choices[0].get('review', {})
-
-                                        parsed_gold_answer = review_data.get('gold', '')
-                                        parsed_pred_answer_for_feedback = review_data.get('pred', '') 
-                                        score = review_data.get('result')
-
-                                        # 处理不同格式的result
-                                        try:
-                                            if score is not None:
-                                                if isinstance(score, dict):
-                                                    # 处理复合结果格式: {"intent_result": true, "slots_result": {"miss_count": 1, "correct_count": 1, "fail_count": 0}}
-                                                    if 'intent_result' in score and 'slots_result' in score:
-                                                        intent_result = score.get('intent_result', False)
-                                                        slots_result = score.get('slots_result', {})
-                                                        
-                                                        # 计算slot的F1分数
-                                                        correct_count = slots_result.get('correct_count', 0)
-                                                        miss_count = slots_result.get('miss_count', 0)
-                                                        fail_count = slots_result.get('fail_count', 0)
-                                                        
-                                                        total_predicted = correct_count + fail_count
-                                                        total_actual = correct_count + miss_count
-                                                        
-                                                        if total_predicted > 0 and total_actual > 0:
-                                                            precision = correct_count / total_predicted
-                                                            recall = correct_count / total_actual
-                                                            if precision + recall > 0:
-                                                                slot_f1 = 2 * precision * recall / (precision + recall)
-                                                            else:
-                                                                slot_f1 = 0.0
-                                                        else:
-                                                            slot_f1 = 0.0
-                                                        
-                                                        if correct_count + miss_count + fail_count == 0:
-                                                            slot_f1 = 1.0
-                                                        
-                                                        score = float(intent_result) * 0.5 + 0.5 * slot_f1
-                                                        current_app.logger.debug(f"[评估任务 {evaluation_id}] 复合结果计算: intent={intent_result}, slot_f1={slot_f1:.4f}, final_score={score:.4f}")
-                                                    else:
-                                                        # 其他字典格式，尝试转换为float
-                                                        score = float(score)
-                                                else:
-                                                    # 原有的简单数值格式
-                                                    score = float(score)
-                                        except (ValueError, TypeError) as e:
-                                            current_app.logger.warning(f"[评估任务 {evaluation_id}] Could not parse score '{score}' for an item in {review_file_path}. Error: {str(e)}. Setting to None.")
-                                            score = None
-
-                                        result_entry = ModelEvaluationResult(
-                                            evaluation_id=evaluation.id,
-                                            dataset_id=corresponding_dataset.id,  # 使用corresponding_dataset
-                                            question=str(raw_input),
-                                            model_answer=str(raw_pred_answer),
-                                            reference_answer=str(parsed_gold_answer),
-                                            score=score,
-                                            feedback=str(parsed_pred_answer_for_feedback) 
-                                        )
-                                        detailed_results_to_save.append(result_entry)
-                                    current_app.logger.info(f"[评估任务 {evaluation_id}] Processed {len(detailed_results_to_save)} items from {review_file_path} (total for this file: {len(origin_df)})")
-                                except Exception as df_exc:
-                                    current_app.logger.error(f"[评估任务 {evaluation_id}] Error processing review file {review_file_path}: {str(df_exc)}", exc_info=True)
-                            else:
-                                current_app.logger.debug(f"[评估任务 {evaluation_id}] Skipping non-JSONL file or directory in reviews folder: {review_filename_in_dir}")
+                cache_stats = {
+                    'prediction': prediction_cache_counter.to_dict(),
+                    'judge': judge_cache_counter.to_dict()
+                }
+                concurrency_history = EvaluationService._summarize_concurrency(generation_limiter, judge_limiter)
+                if shard_job is not None:
+                    if eval_successful and not evalscope_final_report.get("error"):
+                        shard_job.shard_result = {
+                            'report': evalscope_final_report,
+                            'cache_stats': cache_stats,
+                            'concurrency_history': concurrency_history
+                        }
+                        db.session.commit()
+                        current_app.logger.info(f"[评估任务 {evaluation_id}] 分片 {shard_job.shard_index} 完成。")
+                        EvaluationService._finalize_sharded_evaluation(evaluation_id)
                     else:
-                        current_app.logger.warning(f"[评估任务 {evaluation_id}] Reviews directory not found: {reviews_base_path}. Skipping detailed results parsing.")
-                
-                # 保存详细结果到数据库
-                if detailed_results_to_save:
-                    db.session.bulk_save_objects(detailed_results_to_save)
-                    current_app.logger.info(f"[评估任务 {evaluation_id}] Saved {len(detailed_results_to_save)} detailed judge results to database.")
+                        evaluation.status = 'failed'
+                        evaluation.result_summary = {
+                            "error": f"分片 {shard_job.shard_index} 执行失败",
+                            "shard_report": evalscope_final_report
+                        }
+                        db.session.commit()
+                    PredictionCacheService.evict()
+                    JudgeCacheService.evict()
+                    return
 
                 evaluation.result_summary = evalscope_final_report
                 evaluation.status = 'completed' if eval_successful else 'failed' # 如果evalscope执行本身就失败了，则最终状态为failed
@@ -484,22 +850,50 @@ class EvaluationService:
 
 
                 evaluation.completed_at = get_beijing_time()
+                evaluation.cache_stats = cache_stats
+                evaluation.concurrency_history = concurrency_history
                 db.session.commit() # 提交所有更改，包括状态、摘要和详细结果
+                PredictionCacheService.evict()
+                JudgeCacheService.evict()
                 current_app.logger.info(f"[评估任务 {evaluation_id}] 评估任务处理完毕，状态: {evaluation.status}。Summary: {json.dumps(evalscope_final_report, indent=2)}")
-                
-                # 清理评估缓存
-                EvaluationService._clear_evaluation_cache(evaluation_id)
 
             except Exception as es_exc:
-                current_app.logger.error(f"[评估任务 {evaluation_id}] Error during evalscope execution or result processing: {str(es_exc)}", exc_info=True)
+                db.session.rollback()
+                if cancellation_token.cancelled:
+                    current_app.logger.info(f"[评估任务 {evaluation_id}] 评估已被取消，已中止未完成的请求。")
+                elif cancellation_token.preempted:
+                    current_app.logger.info(f"[评估任务 {evaluation_id}] 评估被更高优先级的作业抢占，已停止发出新请求。")
+                else:
+                    current_app.logger.error(f"[评估任务 {evaluation_id}] Error during evalscope execution or result processing: {str(es_exc)}", exc_info=True)
+                ingested_results = None
+                try:
+                    # 保留已完成样本的详细结果，续评时会重新跟随
+                    ingested_results = result_tailer.stop()
+                except Exception as tail_exc:
+                    current_app.logger.warning(f"[评估任务 {evaluation_id}] 写入剩余详细结果失败: {str(tail_exc)}")
+                if cancellation_token.cancelled:
+                    EvaluationService._mark_cancelled(evaluation_id, ingested_results)
+                    return
+                if cancellation_token.preempted:
+                    EvaluationQueueService.requeue_preempted(job_id)
+                    return
+
                 evaluation.status = 'failed'
                 evaluation.result_summary = {"error": f"Evalscope execution/processing failed: {str(es_exc)}"}
+                if shard_job is not None:
+                    evaluation.result_summary['shard_index'] = shard_job.shard_index
+                evaluation.concurrency_history = EvaluationService._summarize_concurrency(generation_limiter, judge_limiter)
                 db.session.commit() # 确保即使发生异常也提交状态
-                
-                # 清理评估缓存
-                EvaluationService._clear_evaluation_cache(evaluation_id)
             
             finally:
+                cancel_watch_stop.set()
+                progress_reporter.stop()
+                try:
+                    final_status = db.session.query(ModelEvaluation.status).filter(ModelEvaluation.id == evaluation_id).scalar()
+                    if final_status:
+                        ProgressStreamService.publish_evaluation_status(evaluation_id, final_status)
+                except Exception as publish_exc:
+                    current_app.logger.warning(f"[评估任务 {evaluation_id}] 发布评估状态失败: {str(publish_exc)}")
                 if os.path.isdir(base_output_dir):
                     try:
                         # shutil.rmtree(base_output_dir)
@@ -510,6 +904,509 @@ class EvaluationService:
                     current_app.logger.warning(f"[评估任务 {evaluation_id}] Evalscope output directory not found for cleanup: {base_output_dir}")
             current_app.logger.info(f"[评估任务 {evaluation_id}] 执行线程结束。")
 
+    @staticmethod
+    def _watch_cancellation(app, evaluation_id: int, token: CancellationToken, stop_event: threading.Event,
+                            job_id: Optional[int] = None) -> None:
+        """
+        评估执行期间定期检查取消请求（评估记录被删除也视为取消），检测到后中止该评估的所有请求；
+        传入job_id时同时检查作业的抢占请求，被抢占时只停止发出新请求。
+        """
+        with app.app_context():
+            interval = current_app.config.get('EVAL_CANCEL_POLL_INTERVAL', 2)
+        while not stop_event.wait(interval):
+            try:
+                with app.app_context():
+                    row = db.session.query(ModelEvaluation.cancel_requested).filter(ModelEvaluation.id == evaluation_id).first()
+                    if row is None or row[0]:
+                        current_app.logger.info(f"[评估任务 {evaluation_id}] 检测到取消请求，正在中止评估。")
+                        token.cancel()
+                        return
+                    if job_id is not None and not token.preempted and db.session.query(
+                        EvaluationJob.preempt_requested
+                    ).filter(EvaluationJob.id == job_id).scalar():
+                        current_app.logger.info(f"[评估任务 {evaluation_id}] 作业 {job_id} 被请求抢占，正在让出执行。")
+                        token.preempt()
+            except Exception as e:
+                app.logger.warning(f"[评估任务 {evaluation_id}] 检查取消请求失败: {str(e)}")
+
+    @staticmethod
+    def _mark_cancelled(evaluation_id: int, ingested_results: Optional[int] = None) -> None:
+        evaluation = ModelEvaluation.query.get(evaluation_id)
+        if not evaluation:
+            return
+        evaluation.status = 'cancelled'
+        evaluation.completed_at = get_beijing_time()
+        message = "评估已被取消"
+        if ingested_results:
+            message += f"，已保留取消前完成的 {ingested_results} 条详细结果"
+        evaluation.result_summary = {"cancelled": True, "message": message}
+        db.session.commit()
+
+    @staticmethod
+    def cancel_evaluation(evaluation_id: int, user_id: int) -> Tuple[bool, str]:
+        """
+        取消排队中或执行中的评估。
+        排队中的作业直接取消；执行中的作业在数秒内检测到取消请求，中止未完成的请求，已完成样本的详细结果会保留。
+
+        Returns:
+            Tuple[bool, str]: (是否已取消或已请求取消, 提示信息)
+        """
+        try:
+            evaluation = ModelEvaluation.query.get(evaluation_id)
+            if not evaluation or evaluation.user_id != user_id:
+                return False, "评估不存在或您无权访问"
+            if evaluation.status not in ('pending', 'running'):
+                return False, "评估已结束，无法取消"
+
+            evaluation.cancel_requested = True
+            now = get_beijing_time()
+            # 矩阵评估作业由其中所有模型共用，只取消本模型的评估，矩阵执行时会跳过已取消的模型
+            for job in EvaluationJob.query.filter_by(evaluation_id=evaluation_id, status='pending', matrix_id=None).all():
+                job.status = 'cancelled'
+                job.finished_at = now
+            if evaluation.status == 'pending':
+                # 还没有作业开始执行（已被认领的作业开始执行时会检测到取消请求）
+                evaluation.status = 'cancelled'
+                evaluation.completed_at = now
+                evaluation.result_summary = {"cancelled": True, "message": "评估在开始执行前已被取消"}
+            db.session.commit()
+
+            if evaluation.matrix_id is not None and evaluation.status == 'cancelled':
+                EvaluationService._cancel_matrix_if_all_cancelled(evaluation.matrix_id)
+
+            if evaluation.status == 'cancelled':
+                ProgressStreamService.publish_evaluation_status(evaluation_id, 'cancelled')
+                current_app.logger.info(f"[评估任务 {evaluation_id}] 已取消排队中的评估。")
+                return True, "评估已取消"
+            current_app.logger.info(f"[评估任务 {evaluation_id}] 已请求取消执行中的评估。")
+            return True, "已请求取消，正在中止评估，已完成样本的结果会保留"
+
+        except Exception as e:
+            current_app.logger.error(f"取消评估任务 {evaluation_id} 失败: {str(e)}", exc_info=True)
+            db.session.rollback()
+            return False, f"取消失败: {str(e)}"
+
+    @staticmethod
+    def _cancel_matrix_if_all_cancelled(matrix_id: int) -> None:
+        """矩阵评估中的模型都已在开始前取消时，取消排队中的矩阵作业并结束矩阵评估"""
+        members = ModelEvaluation.query.filter_by(matrix_id=matrix_id).all()
+        if not members or any(member.status != 'cancelled' for member in members):
+            return
+        now = get_beijing_time()
+        for job in EvaluationJob.query.filter_by(matrix_id=matrix_id, status='pending').all():
+            job.status = 'cancelled'
+            job.finished_at = now
+        db.session.commit()
+        EvaluationService._finalize_matrix(matrix_id)
+
+    @staticmethod
+    def _summarize_concurrency(generation_limiter, judge_limiter) -> Optional[Dict[str, Any]]:
+        if not generation_limiter and not judge_limiter:
+            return None
+        return {
+            'generation': generation_limiter.summary() if generation_limiter else None,
+            'judge': judge_limiter.summary() if judge_limiter else None,
+        }
+
+    @staticmethod
+    def _get_learned_concurrency(model: AIModel, judge_model: Optional[AIModel]) -> Dict[str, int]:
+        """取同一模型端点（及同一裁判端点）最近一次自适应评估学到的稳定并发数"""
+        learned = {}
+
+        def latest_final(model_column, target_model, key):
+            candidates = ModelEvaluation.query.join(
+                AIModel, model_column == AIModel.id
+            ).filter(
+                AIModel.api_base_url == target_model.api_base_url,
+                AIModel.model_identifier == target_model.model_identifier,
+                ModelEvaluation.adaptive_concurrency == True
+            ).order_by(ModelEvaluation.id.desc()).limit(10).all()
+            for candidate in candidates:
+                history = candidate.concurrency_history
+                if isinstance(history, dict) and isinstance(history.get(key), dict):
+                    learned_value = history[key].get('recommended') or history[key].get('final')
+                    if learned_value:
+                        return int(learned_value)
+            return None
+
+        try:
+            learned['generation'] = latest_final(ModelEvaluation.model_id, model, 'generation')
+            if judge_model:
+                learned['judge'] = latest_final(ModelEvaluation.judge_model_id, judge_model, 'judge')
+        except Exception as e:
+            current_app.logger.warning(f"读取历史并发数失败: {str(e)}")
+        return learned
+
+    @staticmethod
+    def _split_into_shards(evaluation: ModelEvaluation) -> bool:
+        """
+        按评估计划中各子集的样本数把评估拆分为分片作业，由多个工作进程并行执行，全部分片完成后合并结果。
+        在评估作业算出计划后调用，返回是否已拆分（已拆分时当前作业直接结束）。
+        已有输出目录的评估（续评、重试）沿用原来的执行方式，不再拆分。
+        """
+        if evaluation.shard_count:
+            # 计划作业在拆分后被回收重试，分片作业已经入队
+            return True
+        if evaluation.output_dir:
+            return False
+        plan_datasets = (evaluation.plan or {}).get('datasets') or {}
+        dataset_ids = []
+        subset_counts = {}
+        for assoc in ModelEvaluationDataset.query.filter_by(evaluation_id=evaluation.id):
+            dataset_ids.append(assoc.dataset_id)
+            dataset_plan = plan_datasets.get(str(assoc.dataset_id)) or {}
+            subsets = dataset_plan.get('subsets') if dataset_plan.get('total') is not None else None
+            dataset = Dataset.query.get(assoc.dataset_id)
+            if subsets is not None and dataset is not None and dataset.dataset_type == '自建':
+                # 自建数据集在evalscope中整个文件为一个子集，子集名即上传文件名
+                subsets = {os.path.splitext(os.path.basename(dataset.download_url))[0]: dataset_plan['total']}
+            subset_counts[assoc.dataset_id] = subsets
+        shards = EvaluationService._plan_shards(
+            dataset_ids, current_app.config.get('EVAL_MAX_SHARDS_PER_EVALUATION', 4), subset_counts
+        )
+        if len(shards) <= 1:
+            return False
+
+        # 分片共用一个评估输出目录，各自写入shard_<序号>子目录
+        evalscope_run_timestamp = get_beijing_time().strftime('%Y%m%d_%H%M%S')
+        evaluation.output_dir = os.path.abspath(os.path.join(get_outputs_dir(), f'eval_{evaluation.id}_{evalscope_run_timestamp}'))
+        evaluation.shard_count = len(shards)
+        for shard_index, shard in enumerate(shards):
+            EvaluationQueueService.enqueue(
+                evaluation, shard_index=shard_index, shard_dataset_ids=list(shard),
+                shard_subsets={str(dataset_id): subsets for dataset_id, subsets in shard.items()}
+            )
+        db.session.commit()
+        notify_evaluation_workers()
+        current_app.logger.info(f"[评估任务 {evaluation.id}] 拆分为 {len(shards)} 个分片: {shards}")
+        return True
+
+    @staticmethod
+    def _plan_shards(dataset_ids: List[int], max_shards: int,
+                     subset_counts: Dict[int, Optional[Dict[str, int]]]) -> List[Dict[int, Optional[Dict[str, Optional[List[int]]]]]]:
+        """
+        按评估计划中各子集的样本数把评估拆分为至多max_shards个分片，返回每个分片负责的
+        {dataset_id: {子集: [起, 止) 或None表示整个子集} 或None表示整个数据集}。
+        拆分单元为子集，样本数超过每个分片平均样本数的子集再按该样本数切成若干段，
+        从大到小依次放入当前样本数最少的分片（同一子集的各段放入不同分片），分片按数据集和子集的顺序排列。
+        计划中没有样本数的数据集（加载失败）整体作为一个单元，按已知数据集的平均样本数计。
+        """
+        dataset_ids = [dataset_id for dataset_id in dataset_ids if dataset_id is not None]
+        known_totals = [sum(counts.values()) for counts in (subset_counts.get(d) for d in dataset_ids) if counts is not None]
+        unknown_weight = max(1, round(sum(known_totals) / len(known_totals))) if known_totals else 1
+
+        # 单元: (样本数, dataset_id, 子集, 样本范围)
+        units = []
+        for dataset_id in dataset_ids:
+            counts = subset_counts.get(dataset_id)
+            if counts is None:
+                units.append((unknown_weight, dataset_id, None, None))
+                continue
+            units.extend((count, dataset_id, subset_name, None) for subset_name, count in counts.items() if count)
+        total = sum(unit[0] for unit in units)
+        shard_count = min(max_shards, total)
+        if shard_count <= 1 or not units:
+            return [{dataset_id: None for dataset_id in dataset_ids}]
+
+        per_shard = ceil(total / shard_count)
+        split_units = []
+        for weight, dataset_id, subset_name, _ in units:
+            if subset_name is None or weight <= per_shard:
+                split_units.append((weight, dataset_id, subset_name, None))
+                continue
+            for start in range(0, weight, per_shard):
+                end = min(weight, start + per_shard)
+                split_units.append((end - start, dataset_id, subset_name, [start, end]))
+        shard_count = min(shard_count, len(split_units))
+        if shard_count <= 1:
+            return [{dataset_id: None for dataset_id in dataset_ids}]
+
+        assigned = [[] for _ in range(shard_count)]
+        loads = [0] * shard_count
+        for unit in sorted(split_units, key=lambda u: u[0], reverse=True):
+            _, dataset_id, subset_name, sample_range = unit
+            candidates = [
+                index for index in range(shard_count)
+                if sample_range is None or not any(u[1] == dataset_id and u[2] == subset_name for u in assigned[index])
+            ]
+            target = min(candidates, key=lambda index: loads[index])
+            assigned[target].append(unit)
+            loads[target] += unit[0]
+
+        def position(unit):
+            counts = subset_counts.get(unit[1]) or {}
+            subset_position = list(counts).index(unit[2]) if unit[2] in counts else 0
+            return dataset_ids.index(unit[1]), subset_position, unit[3][0] if unit[3] else 0
+
+        shards = []
+        for shard_units in sorted((u for u in assigned if u), key=lambda shard_units: min(map(position, shard_units))):
+            shard = {}
+            for dataset_id in dataset_ids:
+                dataset_units = [u for u in shard_units if u[1] == dataset_id]
+                if not dataset_units:
+                    continue
+                counts = subset_counts.get(dataset_id)
+                whole_subsets = [u[2] for u in dataset_units if u[3] is None]
+                if counts is None or sorted(whole_subsets) == sorted(name for name, count in counts.items() if count):
+                    shard[dataset_id] = None
+                else:
+                    shard[dataset_id] = {
+                        subset_name: next(u[3] for u in dataset_units if u[2] == subset_name)
+                        for subset_name in counts if any(u[2] == subset_name for u in dataset_units)
+                    }
+            shards.append(shard)
+        return shards
+
+    @staticmethod
+    def _apply_shard_subsets(dataset: Dataset, benchmark_key: str, subset_ranges: Optional[Dict[str, Optional[List[int]]]],
+                             dataset_args: Dict[str, Any], sample_ranges: Dict[str, Dict[str, List[int]]]) -> None:
+        """分片只评估分配给它的子集（系统数据集通过subset_list指定）以及子集中的样本范围"""
+        if not subset_ranges:
+            return
+        if dataset.dataset_type == '系统':
+            dataset_args.setdefault(benchmark_key, {})['subset_list'] = list(subset_ranges)
+        for subset_name, sample_range in subset_ranges.items():
+            if sample_range is not None:
+                sample_ranges.setdefault(benchmark_key, {})[subset_name] = sample_range
+
+    @staticmethod
+    def _finalize_sharded_evaluation(evaluation_id: int) -> bool:
+        """全部分片都产出结果后合并报告、缓存统计和并发记录，并将评估标记为完成"""
+        evaluation = ModelEvaluation.query.get(evaluation_id)
+        if not evaluation or not evaluation.shard_count or evaluation.status in ('completed', 'cancelled'):
+            return False
+        if evaluation.cancel_requested:
+            return False
+
+        shard_results = {}
+        for job in EvaluationJob.query.filter(
+            EvaluationJob.evaluation_id == evaluation_id,
+            EvaluationJob.shard_index.isnot(None)
+        ).order_by(EvaluationJob.id.asc()).all():
+            if job.shard_result is not None:
+                shard_results[job.shard_index] = job.shard_result
+        if len(shard_results) < evaluation.shard_count:
+            return False
+
+        ordered_results = [shard_results[index] for index in sorted(shard_results)]
+        evaluation.result_summary = EvaluationService._merge_shard_reports([r.get('report') for r in ordered_results])
+        evaluation.cache_stats = {
+            key: EvaluationService._sum_counters([(r.get('cache_stats') or {}).get(key) for r in ordered_results])
+            for key in ('prediction', 'judge')
+        }
+        evaluation.concurrency_history = EvaluationService._merge_concurrency_histories(
+            [r.get('concurrency_history') for r in ordered_results]
+        )
+        evaluation.status = 'completed'
+        evaluation.completed_at = get_beijing_time()
+        db.session.commit()
+        current_app.logger.info(f"[评估任务 {evaluation_id}] {evaluation.shard_count} 个分片全部完成，结果已合并。")
+        return True
+
+    @staticmethod
+    def _merge_shard_reports(shard_reports: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        合并各分片的evalscope报告。
+        同一数据集出现在多个分片中时（如多个自建问答数据集共用general_qa），按指标和类别合并子集后重新计算得分。
+        """
+        from evalscope.report.utils import Report
+
+        grouped_reports = OrderedDict()
+        for shard_report in shard_reports:
+            for dataset_key, report_dict in (shard_report or {}).items():
+                grouped_reports.setdefault(dataset_key, []).append(report_dict)
+
+        merged = {}
+        for dataset_key, report_dicts in grouped_reports.items():
+            if len(report_dicts) == 1:
+                merged[dataset_key] = report_dicts[0]
+                continue
+            try:
+                metrics = OrderedDict()
+                for report_dict in report_dicts:
+                    for metric in report_dict.get('metrics', []):
+                        categories = metrics.setdefault(metric['name'], OrderedDict())
+                        for category in metric.get('categories', []):
+                            category_name = tuple(category['name']) if isinstance(category['name'], (list, tuple)) else (category['name'],)
+                            categories.setdefault(category_name, []).extend(category.get('subsets', []))
+                merged_dict = dict(report_dicts[0])
+                merged_dict['metrics'] = [
+                    {
+                        'name': metric_name,
+                        'categories': [
+                            {'name': name, 'subsets': EvaluationService._merge_subset_scores(subsets)}
+                            for name, subsets in categories.items()
+                        ]
+                    }
+                    for metric_name, categories in metrics.items()
+                ]
+                merged[dataset_key] = Report.from_dict(merged_dict).to_dict()
+                early_stopping_stats = [report_dict['early_stopping'] for report_dict in report_dicts if report_dict.get('early_stopping')]
+                if early_stopping_stats:
+                    merged[dataset_key]['early_stopping'] = merge_early_stopping_stats(early_stopping_stats)
+            except Exception as e:
+                current_app.logger.warning(f"合并数据集 {dataset_key} 的分片报告失败，保留第一个分片的报告: {str(e)}")
+                merged[dataset_key] = report_dicts[0]
+        return merged
+
+    @staticmethod
+    def _merge_subset_scores(subsets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """同一子集按样本范围拆到多个分片时合并为一个子集：样本数相加，得分按样本数加权平均"""
+        merged = OrderedDict()
+        for subset in subsets:
+            entry = merged.get(subset['name'])
+            if entry is None:
+                merged[subset['name']] = dict(subset)
+                continue
+            entry_num, subset_num = entry.get('num') or 0, subset.get('num') or 0
+            if entry_num + subset_num:
+                entry['score'] = ((entry.get('score') or 0) * entry_num + (subset.get('score') or 0) * subset_num) / (entry_num + subset_num)
+            entry['num'] = entry_num + subset_num
+        return list(merged.values())
+
+    @staticmethod
+    def _sum_counters(counters: List[Optional[Dict[str, int]]]) -> Dict[str, int]:
+        total = defaultdict(int)
+        for counter in counters:
+            for key, value in (counter or {}).items():
+                total[key] += value or 0
+        return dict(total)
+
+    @staticmethod
+    def _merge_concurrency_histories(histories: List[Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """
+        合并各分片的并发记录：分片并行访问同一端点，端点承受的并发是各分片之和，
+        因此标量取和，历史曲线按各分片的阶梯函数逐点相加（以各分片开始时间对齐）。
+        """
+        histories = [history for history in histories if isinstance(history, dict)]
+        if not histories:
+            return None
+        merged = {}
+        for key in ('generation', 'judge'):
+            summaries = [history[key] for history in histories if isinstance(history.get(key), dict)]
+            if not summaries:
+                merged[key] = None
+                continue
+            summary = {
+                field: sum(s.get(field) or 0 for s in summaries)
+                for field in ('final', 'recommended', 'max_reached', 'successes', 'overloads')
+            }
+            time_points = sorted({point[0] for s in summaries for point in s.get('history', [])})
+            summed_history = []
+            for time_point in time_points:
+                total = 0
+                for s in summaries:
+                    value = 0
+                    for point in s.get('history', []):
+                        if point[0] > time_point:
+                            break
+                        value = point[1]
+                    total += value
+                if not summed_history or summed_history[-1][1] != total:
+                    summed_history.append([time_point, total])
+            summary['history'] = summed_history
+            merged[key] = summary
+        return merged
+
+    @staticmethod
+    def resume_evaluation(evaluation_id: int, user_id: int) -> Tuple[bool, str]:
+        """
+        续评中断或失败的评估任务，复用已有输出目录，已有评审结果的样本不会重新推理和评审
+
+        Returns:
+            Tuple[bool, str]: (是否已重新加入队列, 提示信息)
+        """
+        try:
+            evaluation = ModelEvaluation.query.get(evaluation_id)
+            if not evaluation or evaluation.user_id != user_id:
+                return False, "评估不存在或您无权访问"
+            if evaluation.status == 'completed':
+                return False, "评估已完成，无需续评"
+
+            active_job = EvaluationJob.query.filter(
+                EvaluationJob.evaluation_id == evaluation_id,
+                EvaluationJob.status.in_(('pending', 'claimed', 'running'))
+            ).first()
+            if active_job:
+                return False, "评估仍在队列中或正在执行"
+
+            if not evaluation.output_dir or not os.path.isdir(evaluation.output_dir):
+                current_app.logger.info(f"[评估任务 {evaluation_id}] 未找到可复用的输出目录，将从头开始评估。")
+
+            evaluation.status = 'pending'
+            evaluation.cancel_requested = False
+            evaluation.result_summary = None
+            evaluation.completed_at = None
+            if evaluation.shard_count:
+                # 分片评估只重新排队尚未产出结果的分片，已完成分片的结果保留
+                shard_jobs = {}
+                completed_shards = set()
+                for job in evaluation.jobs.filter(EvaluationJob.shard_index.isnot(None)).all():
+                    shard_jobs[job.shard_index] = job
+                    if job.shard_result is not None:
+                        completed_shards.add(job.shard_index)
+                for shard_index in sorted(set(shard_jobs) - completed_shards):
+                    EvaluationQueueService.enqueue(evaluation, shard_index=shard_index,
+                                                   shard_dataset_ids=shard_jobs[shard_index].shard_dataset_ids,
+                                                   shard_subsets=shard_jobs[shard_index].shard_subsets)
+            else:
+                # 清理上一次写入的部分结果，执行时会从review文件重新增量入库
+                ModelEvaluationResult.query.filter_by(evaluation_id=evaluation_id).delete()
+                EvaluationQueueService.enqueue(evaluation)
+            db.session.commit()
+
+            start_evaluation_workers(current_app._get_current_object())
+            notify_evaluation_workers()
+            current_app.logger.info(f"[评估任务 {evaluation_id}] 已重新加入队列，将从上次完成的样本继续。")
+            return True, "评估已重新加入队列，将从上次完成的样本继续"
+
+        except Exception as e:
+            current_app.logger.error(f"续评评估任务 {evaluation_id} 失败: {str(e)}", exc_info=True)
+            db.session.rollback()
+            return False, f"续评失败: {str(e)}"
+
+    @staticmethod
+    def _find_run_work_dir(base_output_dir: str) -> Optional[str]:
+        """找到evalscope在输出目录下创建的时间戳工作目录（取最新的一个）"""
+        run_dirs = sorted(
+            d for d in os.listdir(base_output_dir)
+            if os.path.isdir(os.path.join(base_output_dir, d))
+        )
+        return os.path.join(base_output_dir, run_dirs[-1]) if run_dirs else None
+
+    @staticmethod
+    def _repair_output_jsonl_files(work_dir: str) -> None:
+        """截断predictions和reviews文件末尾因进程中断而写了一半的行，保证evalscope可以读取缓存"""
+        for sub_dir in ('predictions', OUTPUTS_STRUCTURE_REVIEWS_DIR):
+            for root, _, files in os.walk(os.path.join(work_dir, sub_dir)):
+                for filename in files:
+                    if filename.endswith('.jsonl'):
+                        EvaluationService._truncate_partial_jsonl_tail(os.path.join(root, filename))
+
+    @staticmethod
+    def _truncate_partial_jsonl_tail(file_path: str, chunk_size: int = 64 * 1024) -> None:
+        with open(file_path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+            # 从文件末尾向前查找最后一个换行符
+            position = size
+            keep = 0
+            while position > 0:
+                read_size = min(chunk_size, position)
+                position -= read_size
+                f.seek(position)
+                newline_index = f.read(read_size).rfind(b'\n')
+                if newline_index != -1:
+                    keep = position + newline_index + 1
+                    break
+            f.truncate(keep)
+            current_app.logger.warning(f"截断不完整的JSONL末行: {file_path} ({size} -> {keep} bytes)")
+
     @staticmethod
     def get_evaluation_by_id(evaluation_id: int, user_id: int) -> Optional[ModelEvaluation]:
         evaluation = ModelEvaluation.query.get(evaluation_id)
@@ -532,28 +1429,40 @@ class EvaluationService:
         per_page: int = 10,
         search_query: Optional[str] = None,  # 搜索查询参数
         min_score: Optional[float] = None,   # 最小分数筛选
-        max_score: Optional[float] = None    # 最大分数筛选
+        max_score: Optional[float] = None,   # 最大分数筛选
+        after_id: Optional[int] = None,      # 上一页最后一条结果的ID（向后翻页）
+        before_id: Optional[int] = None      # 下一页第一条结果的ID（向前翻页）
     ) -> Tuple[List[ModelEvaluationResult], int]:
         evaluation = ModelEvaluation.query.get(evaluation_id)
         if not evaluation or evaluation.user_id != user_id:
             return [], 0
         
-        query = ModelEvaluationResult.query.filter_by(evaluation_id=evaluation_id)
-        
-        # 如果提供了搜索查询，则添加模糊搜索条件
-        if search_query:
-            query = query.filter(ModelEvaluationResult.question.ilike(f"%{search_query}%"))
-        
-        # 添加分数范围筛选条件
-        if min_score is not None:
-            query = query.filter(ModelEvaluationResult.score >= min_score)
-        if max_score is not None:
-            query = query.filter(ModelEvaluationResult.score <= max_score)
-            
-        query = query.order_by(ModelEvaluationResult.id.asc())
-        
-        total = query.count()
-        results = query.paginate(page=page, per_page=per_page, error_out=False).items
+        if search_query and search_query.strip():
+            # 全文搜索问题、模型回答和裁判反馈，按相关度排序
+            results, total = ResultSearchService.search(
+                evaluation_id, search_query, min_score, max_score, page, per_page
+            )
+        else:
+            query = ModelEvaluationResult.query.filter_by(evaluation_id=evaluation_id)
+
+            # 添加分数范围筛选条件
+            if min_score is not None:
+                query = query.filter(ModelEvaluationResult.score >= min_score)
+            if max_score is not None:
+                query = query.filter(ModelEvaluationResult.score <= max_score)
+
+            # 按(evaluation_id, id)索引分页，深页与首页代价相同
+            total = EvaluationService.count_results(evaluation, query, min_score, max_score)
+            id_column = ModelEvaluationResult.id
+            last_page = ceil(total / per_page) if total else 1
+            if after_id is not None or before_id is not None:
+                results = seek_page(query, id_column, per_page, after_id=after_id, before_id=before_id)
+            elif page <= 1:
+                results = seek_page(query, id_column, per_page)
+            elif page == last_page:
+                results = seek_page(query, id_column, total - (page - 1) * per_page, from_end=True)
+            else:
+                results = offset_page(query, id_column, (page - 1) * per_page, per_page, total)
         # 为每个结果添加userPrompt
         for result in results:
             try:
@@ -566,159 +1475,67 @@ class EvaluationService:
         return results, total
 
     @staticmethod
-    def export_evaluation_results_to_excel(
-        evaluation_id: int, 
-        user_id: int, 
-        search_query: Optional[str] = None,
-        min_score: Optional[float] = None,
-        max_score: Optional[float] = None
-    ) -> Optional[bytes]:
+    def count_results(evaluation: ModelEvaluation, query, min_score: Optional[float],
+                       max_score: Optional[float]) -> int:
         """
-        导出评估结果为Excel文件
-        
-        Args:
-            evaluation_id: 评估ID
-            user_id: 用户ID
-            search_query: 搜索查询
-            min_score: 最小分数
-            max_score: 最大分数
-            
-        Returns:
-            bytes: Excel文件的二进制数据，失败返回None
+        统计筛选后的结果数并缓存。执行中的评估结果不断增加，计数缓存RESULT_COUNT_RUNNING_TTL秒（近似值）；
+        其他状态以结果的最大ID作为缓存键的一部分，结果被清理或重新入库后最大ID变化，缓存随之失效。
         """
-        try:
-            # 验证权限
-            evaluation = ModelEvaluation.query.get(evaluation_id)
-            if not evaluation or evaluation.user_id != user_id:
-                return None
-            
-            # 构建查询
-            query = ModelEvaluationResult.query.filter_by(evaluation_id=evaluation_id)
-            
-            # 应用筛选条件
-            if search_query:
-                query = query.filter(ModelEvaluationResult.question.ilike(f"%{search_query}%"))
-            if min_score is not None:
-                query = query.filter(ModelEvaluationResult.score >= min_score)
-            if max_score is not None:
-                query = query.filter(ModelEvaluationResult.score <= max_score)
-                
-            query = query.order_by(ModelEvaluationResult.id.asc())
-            
-            # 获取总数但不加载数据
-            total_count = query.count()
-            if total_count == 0:
-                return None
-            
-            current_app.logger.info(f"开始导出评估结果，总数: {total_count}")
-            
-            # 创建Excel文件
-            from io import BytesIO
-            output = BytesIO()
-            
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                # 分批处理数据，避免OOM
-                batch_size = 100  # 每批处理1000条记录
-                all_data = []
-                
-                # 使用yield_per进行流式查询
-                for batch_start in range(0, total_count, batch_size):
-                    current_app.logger.info(f"处理批次: {batch_start}-{min(batch_start + batch_size, total_count)}")
-                    
-                    # 分页查询当前批次
-                    batch_results = query.offset(batch_start).limit(batch_size).all()
-                    
-                    # 处理当前批次数据
-                    for idx, result in enumerate(batch_results, start=batch_start + 1):
-                        # 使用统一的user_prompt获取方法
-                        try:
-                            formatted_question = EvaluationService._get_user_prompt_for_result(result)
-                        except Exception as e:
-                            current_app.logger.error(f"获取结果 {result.id} 的userPrompt失败: {str(e)}")
-                            formatted_question = result.question
-                        
-                        all_data.append({
-                            '序号': idx,
-                            '问题': formatted_question,
-                            '模型回答': result.model_answer,
-                            '参考答案': result.reference_answer or '无',
-                            '得分': result.score if result.score is not None else '无评分',
-                            '数据集': result.dataset.name if result.dataset else '未知数据集'
-                        })
-                    
-                    # 清理当前批次以释放内存
-                    del batch_results
-                
-                # 创建DataFrame
-                df = pd.DataFrame(all_data)
-                current_app.logger.info(f"创建DataFrame完成，共 {len(df)} 行")
-                
-                # 写入Excel
-                df.to_excel(writer, sheet_name='评估结果', index=False)
-                
-                # 获取工作表对象进行格式化
-                worksheet = writer.sheets['评估结果']
-                
-                # 调整列宽
-                column_widths = {
-                    'A': 8,   # 序号
-                    'B': 50,  # 问题
-                    'C': 50,  # 模型回答
-                    'D': 30,  # 参考答案
-                    'E': 10,  # 得分
-                    'F': 20   # 数据集
-                }
-                
-                for col, width in column_widths.items():
-                    worksheet.column_dimensions[col].width = width
-                
-                # 设置表头样式
-                from openpyxl.styles import Font, PatternFill, Alignment
-                header_font = Font(bold=True, color='FFFFFF')
-                header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-                
-                for cell in worksheet[1]:
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-                
-                # 设置数据行样式
-                for row in worksheet.iter_rows(min_row=2):
-                    for cell in row:
-                        cell.alignment = Alignment(vertical='top', wrap_text=True)
-                
-                # 清理DataFrame以释放内存
-                del df
-                del all_data
-            
-            output.seek(0)
-            file_data = output.getvalue()
-            current_app.logger.info(f"Excel导出完成，文件大小: {len(file_data)} bytes")
-            return file_data
-            
-        except Exception as e:
-            current_app.logger.error(f"导出Excel失败: {str(e)}", exc_info=True)
-            return None 
+        if evaluation.status == 'running':
+            version, ttl = 'running', current_app.config.get('RESULT_COUNT_RUNNING_TTL', 5)
+        else:
+            max_id = db.session.query(func.max(ModelEvaluationResult.id)).filter(
+                ModelEvaluationResult.evaluation_id == evaluation.id
+            ).scalar()
+            version, ttl = f'max_id={max_id}', None
+        return get_cache('result_count', current_app.config).get_or_set(
+            f'{evaluation.id}:{version}:{min_score}:{max_score}', query.count, ttl
+        )
 
     @staticmethod
     def _get_user_prompt_for_result(result: 'ModelEvaluationResult') -> str:
-        """为单个评估结果获取格式化的userPrompt"""
+        """为单个评估结果获取格式化的userPrompt：优先使用入库时渲染好的结果，早于该字段的记录再现场渲染"""
+        if result.rendered_prompt is not None:
+            return result.rendered_prompt
         try:
             # 解析question字段获取原始输入数据
-            import ast
+            raw_input_data = EvaluationService._parse_raw_input(result)
+            if raw_input_data is None:
+                # 如果都失败，直接返回原始问题
+                return result.question
+            return EvaluationService.render_user_prompt(raw_input_data, result.dataset)
+        except Exception as e:
+            current_app.logger.error(f"解析结果userPrompt时出错: {str(e)}", exc_info=True)
+            return "解析错误"
+
+    @staticmethod
+    def _parse_raw_input(result: 'ModelEvaluationResult') -> Optional[Any]:
+        """取出结果的原始输入：优先读取规范化的JSON，旧记录的question可能是JSON或Python repr"""
+        if result.raw_input_json:
+            return json.loads(result.raw_input_json)
+        import ast
+        try:
+            return json.loads(result.question)
+        except (json.JSONDecodeError, TypeError):
+            # 如果JSON解析失败，尝试使用ast.literal_eval
             try:
-                raw_input_data = json.loads(result.question)
-            except (json.JSONDecodeError, TypeError):
-                # 如果JSON解析失败，尝试使用ast.literal_eval
-                try:
-                    raw_input_data = ast.literal_eval(result.question)
-                except (ValueError, SyntaxError):
-                    # 如果都失败，直接返回原始问题
-                    return result.question
-            
+                return ast.literal_eval(result.question)
+            except (ValueError, SyntaxError):
+                return None
+
+    @staticmethod
+    def render_user_prompt_for_dataset(raw_input_data: Any, dataset_id: int) -> Optional[str]:
+        """详细结果入库时渲染userPrompt（在ReviewTailer中调用），与查看结果时现场渲染的结果一致"""
+        if isinstance(raw_input_data, str):
+            return raw_input_data
+        return EvaluationService.render_user_prompt(raw_input_data, Dataset.query.get(dataset_id))
+
+    @staticmethod
+    def render_user_prompt(raw_input_data: Any, dataset: Optional[Dataset]) -> str:
+        """用数据集adapter的gen_prompt生成完整的userPrompt，失败时按原始数据格式化"""
+        try:
             # 首先尝试使用adapter生成完整的prompt
             # 通过result.dataset获取数据集信息，然后使用benchmark_name
-            dataset = result.dataset
             if not dataset:
                 # 如果没有dataset关系，回退到格式化逻辑
                 return EvaluationService._format_prompt_from_raw_data(raw_input_data)
@@ -755,6 +1572,42 @@ class EvaluationService:
             current_app.logger.error(f"解析结果userPrompt时出错: {str(e)}", exc_info=True)
             return "解析错误"
 
+    @staticmethod
+    def backfill_rendered_prompts(evaluation_id: Optional[int] = None, batch_size: int = 500) -> int:
+        """
+        为早于rendered_prompt字段的详细结果补算规范化原始输入和userPrompt（一次性任务，可重复执行）。
+        按主键分批处理，每批一次executemany更新并提交；返回处理的记录数。
+        """
+        table = ModelEvaluationResult.__table__
+        update_stmt = table.update().where(table.c.id == bindparam('result_id')).values(
+            rendered_prompt=bindparam('rendered_prompt'), raw_input_json=bindparam('raw_input_json')
+        )
+        processed = 0
+        last_id = 0
+        while True:
+            query = ModelEvaluationResult.query.filter(
+                ModelEvaluationResult.rendered_prompt.is_(None), ModelEvaluationResult.id > last_id
+            )
+            if evaluation_id is not None:
+                query = query.filter(ModelEvaluationResult.evaluation_id == evaluation_id)
+            batch = query.order_by(ModelEvaluationResult.id.asc()).limit(batch_size).all()
+            if not batch:
+                break
+            updates = []
+            for result in batch:
+                raw_input_data = EvaluationService._parse_raw_input(result)
+                updates.append({
+                    'result_id': result.id,
+                    'rendered_prompt': EvaluationService._get_user_prompt_for_result(result),
+                    'raw_input_json': normalize_raw_input(raw_input_data) if raw_input_data is not None else None,
+                })
+            last_id = batch[-1].id
+            db.session.execute(update_stmt, updates)
+            db.session.commit()
+            processed += len(updates)
+            current_app.logger.info(f"[回填userPrompt] 已处理 {processed} 条（最大ID {last_id}）")
+        return processed
+
     @staticmethod
     def _format_prompt_from_raw_data(raw_input_data: dict) -> str:
         """从原始数据格式化完整的prompt显示"""
@@ -848,33 +1701,63 @@ class EvaluationService:
             current_app.logger.error(f"格式化选项时出错: {str(e)}")
             return ""
 
+    @staticmethod
+    def _adapter_cache():
+        return get_cache(
+            'dataset_adapter', current_app.config, backend='memory',
+            max_entries=current_app.config.get('ADAPTER_CACHE_MAX_ENTRIES', 64)
+        )
+
+    @staticmethod
+    def invalidate_adapter_cache(dataset_id: int) -> None:
+        """数据集被删除或修改后清除本进程缓存的adapter（模板内容变化时缓存键本身也会变化）"""
+        EvaluationService._adapter_cache().backend.delete_prefix(f'dataset_adapter:{dataset_id}:')
+
     @staticmethod
     def get_adapter_for_dataset(dataset_id: int):
-        """根据数据集名称获取对应的adapter实例"""
+        """
+        根据数据集名称获取对应的adapter实例。
+        实例按(数据集ID, 模板内容哈希)缓存在进程内（LRU），渲染一页结果时同一数据集的模板只编译一次。
+        """
         try:
             dataset = Dataset.query.get(dataset_id)
             if not dataset:
                 return None
-            dataset_name = f'custom_dataset_{dataset.id}' if dataset.format.lower() == 'custom' else dataset.name
-            # 导入BENCHMARK_MAPPINGS
-            from evalscope.benchmarks.benchmark import BENCHMARK_MAPPINGS
-            # 动态注册自定义数据集基准测试[重启后内存数据会丢失，所以动态注册下]
-            from app.adapter.custom_dataset_adapter import register_custom_dataset_benchmark
-            register_custom_dataset_benchmark(dataset.id)
-            # 统一通过BENCHMARK_MAPPINGS获取adapter
-            if dataset_name in BENCHMARK_MAPPINGS:
-                benchmark_meta = BENCHMARK_MAPPINGS[dataset_name]
-                adapter_class = benchmark_meta.data_adapter
-                if dataset.format.lower() == 'custom':
-                    return adapter_class(**benchmark_meta.to_dict(), template_content=dataset.jinja2_template)
-                else:
-                    return adapter_class(**benchmark_meta.to_dict())
-            return None
-            
+            template_hash = ''
+            if dataset.format.lower() == 'custom' and dataset.jinja2_template:
+                template_hash = hashlib.sha256(dataset.jinja2_template.encode('utf-8')).hexdigest()
+            adapter_cache = EvaluationService._adapter_cache()
+            cache_key = f'{dataset.id}:{template_hash}'
+            adapter = adapter_cache.get(cache_key)
+            if adapter is None:
+                adapter = EvaluationService._create_adapter(dataset)
+                if adapter is not None:
+                    adapter_cache.set(cache_key, adapter)
+            return adapter
+
         except Exception as e:
             current_app.logger.error(f"获取数据集 {dataset_id} 的adapter失败: {str(e)}")
             raise e
 
+    @staticmethod
+    def _create_adapter(dataset: Dataset):
+        """构造数据集的adapter实例（不经过缓存）"""
+        dataset_name = f'custom_dataset_{dataset.id}' if dataset.format.lower() == 'custom' else dataset.name
+        # 导入BENCHMARK_MAPPINGS
+        from evalscope.benchmarks.benchmark import BENCHMARK_MAPPINGS
+        # 动态注册自定义数据集基准测试[重启后内存数据会丢失，所以动态注册下]
+        from app.adapter.custom_dataset_adapter import register_custom_dataset_benchmark
+        register_custom_dataset_benchmark(dataset.id)
+        # 统一通过BENCHMARK_MAPPINGS获取adapter
+        if dataset_name in BENCHMARK_MAPPINGS:
+            benchmark_meta = BENCHMARK_MAPPINGS[dataset_name]
+            adapter_class = benchmark_meta.data_adapter
+            if dataset.format.lower() == 'custom':
+                return adapter_class(**benchmark_meta.to_dict(), template_content=dataset.jinja2_template)
+            else:
+                return adapter_class(**benchmark_meta.to_dict())
+        return None
+
     @staticmethod
     def get_evaluation_progress(evaluation_id: int, user_id: int) -> Dict[str, Any]:
         """
@@ -893,8 +1776,8 @@ class EvaluationService:
             if not evaluation or evaluation.user_id != user_id:
                 return {"error": "评估不存在或您无权访问"}
             
-            # 如果评估已完成或失败，直接返回状态
-            if evaluation.status in ['completed', 'failed']:
+            # 如果评估已结束（完成、失败或取消），直接返回状态，不再扫描review文件
+            if evaluation.status in EVALUATION_TERMINAL_STATUSES:
                 return {
                     "status": evaluation.status,
                     "total_prompts": 0,
@@ -902,15 +1785,21 @@ class EvaluationService:
                     "progress_percentage": 100.0 if evaluation.status == 'completed' else 0.0
                 }
             
+            # 总样本数取自工作进程开始执行时计算的评估计划，计划尚未算出时总数记为0
+            total_prompts = (evaluation.plan or {}).get('total_prompts') or 0
+
             # 获取评估输出目录
-            evalscope_run_timestamp = evaluation.created_at.strftime('%Y%m%d_%H%M%S')
-            base_output_dir = os.path.join(get_outputs_dir(), f'eval_{evaluation_id}_{evalscope_run_timestamp}')
+            if evaluation.output_dir:
+                base_output_dir = evaluation.output_dir
+            else:
+                evalscope_run_timestamp = evaluation.created_at.strftime('%Y%m%d_%H%M%S')
+                base_output_dir = os.path.join(get_outputs_dir(), f'eval_{evaluation_id}_{evalscope_run_timestamp}')
             current_app.logger.info(f"++++base_output_dir: {base_output_dir}")
             # 检查输出目录是否存在
             if not os.path.exists(base_output_dir):
                 return {
                     "status": evaluation.status,
-                    "total_prompts": 0,
+                    "total_prompts": total_prompts,
                     "completed_prompts": 0,
                     "progress_percentage": 0.0
                 }
@@ -926,25 +1815,28 @@ class EvaluationService:
             for k in os.listdir(base_output_dir):
                 t_base_output_dir = os.path.join(base_output_dir, k)
 
+            # 分片评估的每个分片在shard_<序号>子目录下有各自的evalscope工作目录
+            run_work_dirs = [t_base_output_dir]
+            if evaluation.shard_count:
+                run_work_dirs = [
+                    EvaluationService._find_run_work_dir(os.path.join(base_output_dir, shard_dir))
+                    for shard_dir in sorted(os.listdir(base_output_dir))
+                    if shard_dir.startswith('shard_') and os.path.isdir(os.path.join(base_output_dir, shard_dir))
+                ]
+
             t_model_identifier = model.model_identifier.split('/')[-1]
-            reviews_base_path = os.path.join(t_base_output_dir, OUTPUTS_STRUCTURE_REVIEWS_DIR, t_model_identifier)
-            current_app.logger.info(f"reviews_base_path: {reviews_base_path}")
-            # 计算已完成的prompt数量（通过reviews目录中的json文件）
-            completed_prompts = EvaluationService._calculate_completed_prompts(reviews_base_path)
-            
-            # 检查是否需要计算total_prompts（只在首次或completed_prompts为0时计算）
-            total_prompts = 0
-            progress_percentage = 0.0
-            
-            # 检查缓存中是否已有total_prompts
-            if evaluation_id in _evaluation_total_prompts_cache:
-                total_prompts = _evaluation_total_prompts_cache[evaluation_id]
-            else:
-                # 如果缓存中没有，则计算并缓存
-                total_prompts = EvaluationService._calculate_total_prompts(evaluation_id)
-                _evaluation_total_prompts_cache[evaluation_id] = total_prompts
+            routing = DatasetRouting(evaluation.dataset_routing) if evaluation.dataset_routing is not None else None
+            completed_prompts = 0
+            for run_work_dir in run_work_dirs:
+                if not run_work_dir:
+                    continue
+                reviews_base_path = os.path.join(run_work_dir, OUTPUTS_STRUCTURE_REVIEWS_DIR, t_model_identifier)
+                current_app.logger.info(f"reviews_base_path: {reviews_base_path}")
+                # 计算已完成的prompt数量（通过reviews目录中的json文件）
+                completed_prompts += EvaluationService._calculate_completed_prompts(evaluation_id, reviews_base_path, routing)
             
             # 计算进度百分比
+            progress_percentage = 0.0
             if total_prompts > 0:
                 progress_percentage = min(100.0, (completed_prompts / total_prompts) * 100.0)
             
@@ -960,74 +1852,66 @@ class EvaluationService:
             return {"error": f"获取进度失败: {str(e)}"}
     
     @staticmethod
-    def _calculate_total_prompts(evaluation_id: int) -> int:
+    def _ensure_evaluation_plan(evaluation: ModelEvaluation) -> None:
+        """评估还没有计划时计算并保存（在工作进程中调用，系统数据集需要完整加载，可能耗时较长）"""
+        if evaluation.plan is not None:
+            return
+        dataset_ids = [assoc.dataset_id for assoc in ModelEvaluationDataset.query.filter_by(evaluation_id=evaluation.id)]
+        evaluation.plan = EvaluationService._build_evaluation_plan(dataset_ids, evaluation.limit)
+        db.session.commit()
+        current_app.logger.info(f"[评估任务 {evaluation.id}] 评估计划已计算，总样本数: {evaluation.plan['total_prompts']}")
+
+    @staticmethod
+    def _build_evaluation_plan(dataset_ids: List[int], limit: Optional[int] = None) -> Dict[str, Any]:
         """
-        计算评估任务的总prompt数量，通过data_adapter.load加载数据集
+        计算评估计划：各数据集、各子集参与评估的样本数（每个子集最多limit个）。
+        只统计数据集评估split的行数，不渲染prompt；无法加载的数据集记录错误，不计入总数。
         """
-        try:
-            total_prompts = 0
-            
-            # 获取评估记录
-            evaluation = ModelEvaluation.query.get(evaluation_id)
-            if not evaluation:
-                return 0
-            # 获取评估关联的数据集
-            eval_dataset_associations = ModelEvaluationDataset.query.filter_by(evaluation_id=evaluation_id).all()
-            
-            for assoc in eval_dataset_associations:
-                dataset = Dataset.query.get(assoc.dataset_id)
-                adapter = EvaluationService.get_adapter_for_dataset(dataset.id)
-                data_dict = adapter.load(dataset_name_or_path=dataset.download_url)
-                prompts = adapter.gen_prompts(data_dict=data_dict)
-
-                limited_prompts = defaultdict(list)
-                for subset_name, prompts_list in prompts.items():
-                    limit = evaluation.limit or len(prompts_list)
-                    for index, prompt in enumerate(prompts_list[:limit]):
-                        limited_prompts[subset_name].append(prompt)
-                    total_prompts += len(limited_prompts[subset_name])
-            return total_prompts
-            
-        except Exception as e:
-            current_app.logger.error(f"计算总prompt数量失败: {str(e)}")
-            return 0
+        plan = {'total_prompts': 0, 'datasets': {}}
+        for dataset_id in dataset_ids:
+            if dataset_id is None:
+                continue
+            dataset_plan = {'subsets': {}, 'total': 0}
+            try:
+                dataset = Dataset.query.get(dataset_id)
+                if not dataset:
+                    raise ValueError("数据集不存在")
+                # 问答格式的自建数据集整个文件为一个子集，上传时建立的索引中已有行数，不必加载数据
+                index = None
+                if dataset.dataset_type == '自建' and dataset.format == 'QA' and dataset.download_url:
+                    index = DatasetIndexService.load_index(dataset.download_url)
+                if index is not None and not index['invalid_rows']:
+                    subset_counts = {os.path.splitext(os.path.basename(dataset.download_url))[0]: index['row_count']}
+                else:
+                    adapter = EvaluationService.get_adapter_for_dataset(dataset_id)
+                    if not adapter:
+                        raise ValueError("数据集或其adapter不存在")
+                    data_dict = adapter.load(dataset_name_or_path=dataset.download_url)
+                    subset_counts = {
+                        subset_name: len(subset_data.get(adapter.eval_split) or [])
+                        for subset_name, subset_data in data_dict.items()
+                    }
+                for subset_name, sample_count in subset_counts.items():
+                    if limit and int(limit) > 0:
+                        sample_count = min(sample_count, int(limit))
+                    dataset_plan['subsets'][subset_name] = sample_count
+                    dataset_plan['total'] += sample_count
+            except Exception as e:
+                current_app.logger.error(f"计算数据集 {dataset_id} 的样本数失败: {str(e)}")
+                dataset_plan = {'subsets': {}, 'total': None, 'error': str(e)}
+            plan['datasets'][str(dataset_id)] = dataset_plan
+            plan['total_prompts'] += dataset_plan['total'] or 0
+        return plan
 
     @staticmethod
-    def _calculate_completed_prompts(reviews_base_path: str) -> int:
+    def _calculate_completed_prompts(evaluation_id: int, reviews_base_path: str, routing: Optional[DatasetRouting] = None) -> int:
         """
-        计算已完成的prompt数量（通过reviews目录中的json文件）
+        计算已完成的prompt数量（reviews目录中jsonl文件的行数），只扫描上次统计之后新追加的内容
+        有路由表时只统计能路由到本评估数据集的文件，与详细结果入库的口径一致
         """
         try:
-            if not os.path.exists(reviews_base_path):
-                return 0
-            
-            completed_count = 0
-            
-            # 遍历reviews目录中的所有jsonl文件
-            for review_filename in os.listdir(reviews_base_path):
-                review_file_path = os.path.join(reviews_base_path, review_filename)
-                if os.path.isfile(review_file_path) and review_filename.endswith('.jsonl'):
-                    try:
-                        # 计算文件中的行数（每个行代表一个完成的prompt）
-                        with open(review_file_path, 'r', encoding='utf-8') as f:
-                            file_count = sum(1 for line in f if line.strip())
-                            completed_count += file_count
-                    except Exception as e:
-                        current_app.logger.warning(f"读取review文件失败 {review_file_path}: {str(e)}")
-                        continue
-            
-            return completed_count
-            
+            return ReviewProgressTracker.count_completed(evaluation_id, reviews_base_path, routing)
         except Exception as e:
             current_app.logger.error(f"计算已完成prompt数量失败: {str(e)}")
-            return 0 
-
-    @staticmethod
-    def _clear_evaluation_cache(evaluation_id: int) -> None:
-        """
-        清理评估任务的缓存
-        """
-        global _evaluation_total_prompts_cache
-        if evaluation_id in _evaluation_total_prompts_cache:
-            del _evaluation_total_prompts_cache[evaluation_id]
-            current_app.logger.debug(f"[评估任务 {evaluation_id}] 已清理缓存") 
\ No newline at end of file
+            db.session.rollback()
+            return 0
@@ -0,0 +1,80 @@
+from typing import Any, Dict, Optional
+from app import db
+from app.models import JudgeCache
+from app.services.prediction_cache_service import evict_least_recently_hit
+from app.utils import get_beijing_time
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+import hashlib
+import json
+import re
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+class JudgeCacheService:
+    """跨评估任务的裁判评判结果缓存服务"""
+
+    @staticmethod
+    def normalize_text(text: Optional[str]) -> str:
+        """合并连续空白并去掉首尾空白，使仅有空白差异的回答命中同一条缓存"""
+        return _WHITESPACE_PATTERN.sub(' ', text or '').strip()
+
+    @staticmethod
+    def make_key(
+        judge_model_identifier: str,
+        judge_api_url: str,
+        system_prompt: Optional[str],
+        prompt: str,
+        generation_config: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        生成裁判缓存键。
+        评判提示词由模板（包括自定义数据集get_config中的judge_prompt）渲染问题、参考答案和模型回答得到，
+        因此按渲染结果寻址即可同时覆盖模板和gold/pred。
+        """
+        key_source = json.dumps({
+            'judge_model': judge_model_identifier,
+            'api_url': (judge_api_url or '').rstrip('/'),
+            'system_prompt': JudgeCacheService.normalize_text(system_prompt),
+            'prompt': JudgeCacheService.normalize_text(prompt),
+            'generation_config': generation_config or {},
+        }, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get(cache_key: str) -> Optional[str]:
+        try:
+            entry = JudgeCache.query.filter_by(cache_key=cache_key).first()
+            if not entry:
+                return None
+            entry.hit_count = (entry.hit_count or 0) + 1
+            entry.last_hit_at = get_beijing_time()
+            verdict = entry.verdict
+            db.session.commit()
+            return verdict
+        except Exception as e:
+            current_app.logger.warning(f"[裁判缓存] 读取缓存失败: {str(e)}")
+            db.session.rollback()
+            return None
+
+    @staticmethod
+    def put(cache_key: str, judge_model_identifier: str, verdict: str) -> None:
+        try:
+            db.session.add(JudgeCache(
+                cache_key=cache_key,
+                judge_model_identifier=judge_model_identifier,
+                verdict=verdict
+            ))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+        except Exception as e:
+            current_app.logger.warning(f"[裁判缓存] 写入缓存失败: {str(e)}")
+            db.session.rollback()
+
+    @staticmethod
+    def evict(max_entries: Optional[int] = None) -> int:
+        if max_entries is None:
+            max_entries = current_app.config.get('JUDGE_CACHE_MAX_ENTRIES', 500000)
+        return evict_least_recently_hit(JudgeCache, max_entries, '裁判缓存')
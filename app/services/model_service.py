@@ -3,11 +3,15 @@ from app import db
 from app.models import AIModel
 from flask_login import current_user
 import requests
-from app.utils import get_beijing_time
+from app.utils.rate_limiter import get_rate_limiter
+from app.utils.cache import get_cache
+import time
 
 # --- System Models Cache ---
-_system_models_cache = {"data": None, "last_fetched_utc": None}
+# 缓存在共享缓存中，所有gunicorn worker共用；过期后仍保留一段时间，拉取失败时作为旧数据返回
+SYSTEM_MODELS_CACHE_KEY = 'provider_models'
 CACHE_DURATION_SECONDS = 360 * 24  # 24 小时
+STALE_CACHE_DURATION_SECONDS = 7 * 24 * 3600
 
 # --- System Models Configuration ---
 # SYSTEM_PROVIDER_BASE_URL is now fetched from app.config
@@ -28,22 +32,24 @@ def _get_system_provider_base_url():
         )
     return base_url
 
+def _system_models_cache():
+    return get_cache('system_models', current_app.config, default_ttl=STALE_CACHE_DURATION_SECONDS)
+
 def _fetch_system_models_from_provider_with_cache(models_url: str, headers: dict):
     """
-    从系统提供商获取模型数据，使用1小时缓存策略。
+    从系统提供商获取模型数据，缓存CACHE_DURATION_SECONDS秒。
     如果获取失败，但存在（即使已过期的）缓存，则返回旧缓存。
     """
-    global _system_models_cache
     app_logger = current_app.logger # 在函数开始时获取logger
-
-    now_beijing = get_beijing_time()
+    cache = _system_models_cache()
+    cached = cache.get(SYSTEM_MODELS_CACHE_KEY)
 
     # 检查缓存是否仍然有效
-    if _system_models_cache["data"] is not None and _system_models_cache["last_fetched_utc"] is not None:
-        age_seconds = (now_beijing - _system_models_cache["last_fetched_utc"]).total_seconds()
+    if cached is not None:
+        age_seconds = time.time() - cached["fetched_at"]
         if age_seconds < CACHE_DURATION_SECONDS:
             app_logger.info("Returning system models from active cache.")
-            return _system_models_cache["data"]
+            return cached["data"]
         else:
             app_logger.info("System models cache expired, will attempt to refresh.")
 
@@ -55,22 +61,21 @@ def _fetch_system_models_from_provider_with_cache(models_url: str, headers: dict
         provider_models_data = response.json()
         
         # 更新缓存
-        _system_models_cache["data"] = provider_models_data
-        _system_models_cache["last_fetched_utc"] = now_beijing
+        cache.set(SYSTEM_MODELS_CACHE_KEY, {"data": provider_models_data, "fetched_at": time.time()})
         app_logger.info("Successfully fetched and cached new system models.")
         return provider_models_data
     except requests.exceptions.RequestException as e:
         app_logger.error(f"Failed to fetch models from system provider: {e}")
         # 如果获取失败，但存在旧缓存，则返回旧缓存以提高弹性
-        if _system_models_cache["data"] is not None:
+        if cached is not None:
             app_logger.warning("Returning stale system models from cache due to fetch failure.")
-            return _system_models_cache["data"]
+            return cached["data"]
         return None # 获取失败且无任何缓存
     except ValueError as e: # 包括 JSONDecodeError
         app_logger.error(f"Failed to parse JSON response from system provider: {e}")
-        if _system_models_cache["data"] is not None:
+        if cached is not None:
             app_logger.warning("Returning stale system models from cache due to JSON parse failure.")
-            return _system_models_cache["data"]
+            return cached["data"]
         return None # 解析失败且无任何缓存
 
 def sync_system_models():
@@ -200,6 +205,8 @@ def create_user_model(data, user):
         model_type=data.get('model_type', 'openai_compatible'), # Defaulting to openai_compatible for user models too
         system_prompt=data.get('system_prompt'),
         default_temperature=data.get('default_temperature'),
+        rate_limit_rpm=data.get('rate_limit_rpm'),
+        rate_limit_tpm=data.get('rate_limit_tpm'),
         notes=data.get('notes'),
         is_system_model=False,
         is_validated=False # Validate separately
@@ -224,6 +231,8 @@ def update_user_model(model, data):
     model.model_type = data.get('model_type', 'openai_compatible')
     model.system_prompt = data.get('system_prompt')
     model.default_temperature = data.get('default_temperature')
+    model.rate_limit_rpm = data.get('rate_limit_rpm')
+    model.rate_limit_tpm = data.get('rate_limit_tpm')
     model.notes = data.get('notes')
 
     if 'api_key' in data:
@@ -317,4 +326,20 @@ def get_decrypted_api_key(model):
         except Exception as e:
             current_app.logger.error(f"Failed to decrypt API key for model {model.id}: {e}")
             return "[decryption_error]"
-    return None 
\ No newline at end of file
+    return None
+
+def get_endpoint_rate_limit(model):
+    """
+    获取模型端点的限流配置。
+
+    Returns:
+        dict: {'limiter', 'endpoint_key', 'rpm', 'tpm'}，模型未配置RPM/TPM时返回None
+    """
+    if not model or (not model.rate_limit_rpm and not model.rate_limit_tpm):
+        return None
+    return {
+        'limiter': get_rate_limiter(current_app.config['RATE_LIMIT_DB_PATH']),
+        'endpoint_key': model.endpoint_key,
+        'rpm': model.rate_limit_rpm,
+        'tpm': model.rate_limit_tpm,
+    }
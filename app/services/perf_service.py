@@ -1,6 +1,7 @@
 from flask import current_app
 from app import db
 from app.models import PerformanceEvalTask, AIModel, Dataset
+from app.services.progress_stream_service import ProgressStreamService
 from app.utils import get_beijing_time
 import multiprocessing
 import tempfile
@@ -20,6 +21,9 @@ from evalscope.perf.main import run_perf_benchmark
 
 # 导入自定义数据集插件，确保装饰器能够正确注册
 from app.adapter.custom_dataset_plugin import CustomDatasetPlugin
+# 导入限流的OpenAI接口插件，确保@register_api装饰器注册openai_rate_limited
+from app.adapter.rate_limited_perf_plugin import RateLimitedOpenaiPlugin  # noqa: F401
+from app.adapter.rate_limited_perf_plugin import configure_perf_rate_limit
 
 
 class PerformanceEvaluationService:
@@ -122,7 +126,8 @@ class PerformanceEvaluationService:
             return False, f"模型验证失败: {str(e)}"
 
     @staticmethod
-    def run_performance_eval_task_process(task_id: int, task_cfg: Dict[str, Any], output_file_path: str):
+    def run_performance_eval_task_process(task_id: int, task_cfg: Dict[str, Any], output_file_path: str,
+                                          rate_limit: Optional[Dict[str, Any]] = None):
         """
         在独立进程中执行性能评估任务，并将结果元组直接保存到输出文件
         
@@ -130,6 +135,7 @@ class PerformanceEvaluationService:
             task_id: 评估任务ID (仅用于日志)
             task_cfg: 评估任务配置
             output_file_path: 存储结果的临时文件路径
+            rate_limit: 端点限流配置（db_path、endpoint_key、rpm、tpm），为空表示不限流
         """
         # 获取一个标准的logger实例，用于在此独立进程中记录日志
         process_logger = logging.getLogger(f"perf_eval_process.{task_id}")
@@ -139,6 +145,9 @@ class PerformanceEvaluationService:
         
         try:
             process_logger.info(f"开始执行性能评估任务 {task_id}, 配置: {task_cfg}")
+
+            if rate_limit:
+                configure_perf_rate_limit(**rate_limit)
             
             # 设置总任务超时时间（15分钟）
             signal.signal(signal.SIGALRM, timeout_handler)
@@ -196,6 +205,7 @@ class PerformanceEvaluationService:
             output_file_path: 结果文件路径
         """
         with app.app_context():
+            task = None
             try:
                 # 获取任务
                 task = PerformanceEvalTask.query.get(task_id)
@@ -207,12 +217,14 @@ class PerformanceEvaluationService:
                 task.status = 'running'
                 task.started_at = get_beijing_time()
                 db.session.commit()
+                ProgressStreamService.publish_perf_status(task_id, 'running')
                 
                 # 循环检查输出文件是否已完成
                 max_wait_time = 15 * 60  # 最长等待时间 (15分钟，与执行超时时间一致)
                 start_time = time.time()
                 
                 while time.time() - start_time < max_wait_time:
+                    ProgressStreamService.publish_perf_progress(task_id, time.time() - start_time)
                     # 进程是否仍在运行
                     if output_file_path and os.path.exists(output_file_path):
                         # 检查文件是否有内容
@@ -317,6 +329,11 @@ class PerformanceEvaluationService:
                     current_app.logger.error(f"更新任务状态失败: {update_error}")
                     
             finally:
+                if task is not None:
+                    try:
+                        ProgressStreamService.publish_perf_status(task_id, task.status)
+                    except Exception as publish_error:
+                        current_app.logger.warning(f"发布性能评估任务状态失败: {publish_error}")
                 # 清理临时文件
                 if output_file_path and os.path.exists(output_file_path):
                     try:
@@ -488,6 +505,17 @@ class PerformanceEvaluationService:
             }
             if dataset != 'openqa':
                 task_cfg['dataset_path'] = selected_dataset.download_url
+
+            # 模型配置了RPM/TPM时，改用带端点限流的API插件，与评估、对话共享配额
+            rate_limit = None
+            if selected_model.rate_limit_rpm or selected_model.rate_limit_tpm:
+                task_cfg['api'] = 'openai_rate_limited'
+                rate_limit = {
+                    'db_path': current_app.config['RATE_LIMIT_DB_PATH'],
+                    'endpoint_key': selected_model.endpoint_key,
+                    'rpm': selected_model.rate_limit_rpm,
+                    'tpm': selected_model.rate_limit_tpm,
+                }
             
             # 创建临时文件存储结果
             output_file_path = tempfile.mktemp(suffix=f"_perf_eval_{task_id}.pkl")
@@ -495,7 +523,7 @@ class PerformanceEvaluationService:
             # 启动评估进程
             process = multiprocessing.Process(
                 target=PerformanceEvaluationService.run_performance_eval_task_process,
-                args=(task_id, task_cfg, output_file_path)
+                args=(task_id, task_cfg, output_file_path, rate_limit)
             )
             process.start()
             
@@ -576,6 +604,7 @@ class PerformanceEvaluationService:
             
             db.session.delete(task)
             db.session.commit()
+            ProgressStreamService.remove_topic(ProgressStreamService.perf_topic(task_id))
             
             current_app.logger.info(f"删除性能评估任务 {task_id} 成功")
             return True
@@ -0,0 +1,125 @@
+from typing import Any, Dict, Optional
+from app import db
+from app.models import ModelEvaluation, PredictionCache
+from app.utils import get_beijing_time
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+import hashlib
+import json
+import threading
+
+# 与回答内容无关的传输层参数，不参与缓存键计算
+_TRANSPORT_REQUEST_KEYS = ('timeout', 'stream', 'stream_options')
+
+# 淘汰时每批删除的记录数
+_EVICT_BATCH_SIZE = 1000
+
+
+class CacheCounter:
+    """线程安全的缓存命中计数器，evalscope会在线程池中并发调用模型"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def to_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+class PredictionCacheService:
+    """跨评估任务的模型回答缓存服务"""
+
+    @staticmethod
+    def make_key(api_base_url: str, request_json: Dict[str, Any]) -> str:
+        """
+        根据模型端点和请求内容生成缓存键。
+        请求内容包含模型标识、渲染后的messages以及temperature/top_p/top_k/max_tokens等生成参数。
+        """
+        payload = {k: v for k, v in request_json.items() if k not in _TRANSPORT_REQUEST_KEYS}
+        key_source = json.dumps(
+            {'api_base_url': (api_base_url or '').rstrip('/'), 'request': payload},
+            ensure_ascii=False, sort_keys=True, default=str
+        )
+        return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def is_replay_enabled(evaluation: ModelEvaluation) -> bool:
+        """生成配置是确定性的（temperature为0）或用户显式开启时才复用缓存回答"""
+        if not current_app.config.get('PREDICTION_CACHE_ENABLED', True):
+            return False
+        return bool(evaluation.use_prediction_cache) or evaluation.temperature == 0
+
+    @staticmethod
+    def get(cache_key: str) -> Optional[Dict[str, Any]]:
+        try:
+            entry = PredictionCache.query.filter_by(cache_key=cache_key).first()
+            if not entry:
+                return None
+            entry.hit_count = (entry.hit_count or 0) + 1
+            entry.last_hit_at = get_beijing_time()
+            response = entry.response
+            db.session.commit()
+            return response
+        except Exception as e:
+            current_app.logger.warning(f"[回答缓存] 读取缓存失败: {str(e)}")
+            db.session.rollback()
+            return None
+
+    @staticmethod
+    def put(cache_key: str, model_identifier: str, response: Dict[str, Any]) -> None:
+        try:
+            db.session.add(PredictionCache(
+                cache_key=cache_key,
+                model_identifier=model_identifier,
+                response=response
+            ))
+            db.session.commit()
+        except IntegrityError:
+            # 并发请求相同内容时可能已被其他线程写入
+            db.session.rollback()
+        except Exception as e:
+            current_app.logger.warning(f"[回答缓存] 写入缓存失败: {str(e)}")
+            db.session.rollback()
+
+    @staticmethod
+    def evict(max_entries: Optional[int] = None) -> int:
+        """按最近命中时间淘汰超出容量的缓存记录，返回删除的条数"""
+        if max_entries is None:
+            max_entries = current_app.config.get('PREDICTION_CACHE_MAX_ENTRIES', 200000)
+        return evict_least_recently_hit(PredictionCache, max_entries, '回答缓存')
+
+
+def evict_least_recently_hit(cache_model, max_entries: int, cache_label: str) -> int:
+    """
+    通用的LRU淘汰：删除last_hit_at最早的记录直到不超过max_entries。
+    cache_model需要包含id和last_hit_at列。
+    """
+    try:
+        overflow = cache_model.query.count() - max_entries
+        deleted = 0
+        while overflow > 0:
+            stale_ids = [row.id for row in db.session.query(cache_model.id).order_by(
+                cache_model.last_hit_at.asc(), cache_model.id.asc()
+            ).limit(min(overflow, _EVICT_BATCH_SIZE)).all()]
+            if not stale_ids:
+                break
+            cache_model.query.filter(cache_model.id.in_(stale_ids)).delete(synchronize_session=False)
+            db.session.commit()
+            deleted += len(stale_ids)
+            overflow -= len(stale_ids)
+        if deleted:
+            current_app.logger.info(f"[{cache_label}] 淘汰 {deleted} 条最久未命中的缓存记录。")
+        return deleted
+    except Exception as e:
+        current_app.logger.error(f"[{cache_label}] 淘汰缓存失败: {str(e)}")
+        db.session.rollback()
+        return 0
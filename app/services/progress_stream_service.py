@@ -0,0 +1,175 @@
+from typing import Any, Callable, Dict, Iterator, Optional
+from app import db
+from app.models import Dataset
+from app.utils.progress_bus import get_progress_bus
+from flask import current_app
+import json
+import threading
+import time
+
+# 评估和性能测试结束后不再变化的状态，推送流发出后即结束
+EVALUATION_TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+PERF_TERMINAL_STATUSES = ('completed', 'failed')
+
+
+class ProgressStreamService:
+    """评估/性能测试进度的发布和SSE推送"""
+
+    @staticmethod
+    def evaluation_topic(evaluation_id: int) -> str:
+        return f'evaluation_{evaluation_id}'
+
+    @staticmethod
+    def perf_topic(task_id: int) -> str:
+        return f'perf_{task_id}'
+
+    @staticmethod
+    def publish(topic: str, event_type: str, data: Dict[str, Any], app=None) -> None:
+        """发布事件；发布失败只记录日志，不影响评估执行"""
+        app = app or current_app._get_current_object()
+        try:
+            get_progress_bus(app.config['PROGRESS_EVENTS_DIR']).publish(topic, {'event': event_type, 'data': data})
+        except Exception as e:
+            app.logger.warning(f"发布进度事件失败 ({topic}): {str(e)}")
+
+    @staticmethod
+    def publish_evaluation_status(evaluation_id: int, status: str, app=None) -> None:
+        ProgressStreamService.publish(
+            ProgressStreamService.evaluation_topic(evaluation_id), 'status', {'status': status}, app
+        )
+
+    @staticmethod
+    def publish_perf_status(task_id: int, status: str, app=None) -> None:
+        ProgressStreamService.publish(ProgressStreamService.perf_topic(task_id), 'status', {'status': status}, app)
+
+    @staticmethod
+    def publish_perf_progress(task_id: int, elapsed_seconds: float, app=None) -> None:
+        ProgressStreamService.publish(
+            ProgressStreamService.perf_topic(task_id), 'progress',
+            {'status': 'running', 'elapsed_seconds': int(elapsed_seconds)}, app
+        )
+
+    @staticmethod
+    def remove_topic(topic: str) -> None:
+        get_progress_bus(current_app.config['PROGRESS_EVENTS_DIR']).remove(topic)
+
+    @staticmethod
+    def stream(topic: str, snapshot: Dict[str, Any], load_status: Callable[[], Optional[str]],
+               terminal_statuses) -> Iterator[str]:
+        """
+        SSE事件流：先发送当前快照，再转发该主题的新事件，直到状态变为结束状态。
+        无事件时定期发送保活注释，并用一次单列查询核对状态，工作进程异常退出时也能发现状态变化。
+        """
+        keepalive = current_app.config.get('PROGRESS_STREAM_KEEPALIVE', 15)
+        deadline = time.monotonic() + current_app.config.get('PROGRESS_STREAM_MAX_SECONDS', 300)
+        status = snapshot.get('status')
+        # 断线后浏览器3秒后重连
+        yield 'retry: 3000\n\n'
+        yield ProgressStreamService._format_event('progress', snapshot)
+        if status in terminal_statuses:
+            return
+
+        bus = get_progress_bus(current_app.config['PROGRESS_EVENTS_DIR'])
+        with bus.subscribe(topic) as subscription:
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=keepalive)
+                if event is None:
+                    try:
+                        latest_status = load_status()
+                    finally:
+                        # 结束只读事务，下一次查询能看到其他进程提交的状态
+                        db.session.rollback()
+                    if latest_status is None:
+                        return
+                    if latest_status == status:
+                        yield ': keepalive\n\n'
+                        continue
+                    event = {'event': 'status', 'data': {'status': latest_status}}
+                data = event.get('data') or {}
+                status = data.get('status', status)
+                yield ProgressStreamService._format_event(event.get('event', 'progress'), data)
+                if status in terminal_statuses:
+                    return
+
+    @staticmethod
+    def _format_event(event_type: str, data: Dict[str, Any]) -> str:
+        return f"event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class EvaluationProgressReporter:
+    """
+    评估执行期间在工作进程中定期统计进度并发布，同一评估的所有查看者共用这一份统计，
+    Web进程不再为每次轮询列目录、读文件。吞吐量为最近几次统计的指数平均，预计剩余时间按吞吐量推算。
+    """
+
+    def __init__(self, app, evaluation_id: int, user_id: int, interval: float = 2.0,
+                 current_dataset: Optional[Callable[[], Optional[int]]] = None, smoothing: float = 0.3,
+                 should_report: Optional[Callable[[], bool]] = None):
+        self.app = app
+        self.evaluation_id = evaluation_id
+        self.user_id = user_id
+        self.interval = interval
+        self.current_dataset = current_dataset
+        self.smoothing = smoothing
+        # 同一评估有多个分片同时执行时，只有should_report返回True的那一个统计和推送，避免重复扫描和交错的事件
+        self.should_report = should_report
+        self.throughput: Optional[float] = None
+        self._last_sample = None
+        self._dataset_names: Dict[int, Optional[str]] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name=f"progress-reporter-{self.evaluation_id}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.report()
+            except Exception as e:
+                self.app.logger.warning(f"[评估任务 {self.evaluation_id}] 发布评估进度失败: {str(e)}")
+
+    def report(self) -> None:
+        from app.services.evaluation_service import EvaluationService
+
+        with self.app.app_context():
+            if self.should_report is not None and not self.should_report():
+                # 重新负责推送时从头估算吞吐量
+                self._last_sample = None
+                self.throughput = None
+                return
+            progress = EvaluationService.get_evaluation_progress(self.evaluation_id, self.user_id)
+            if 'error' in progress:
+                return
+            now = time.monotonic()
+            completed = progress.get('completed_prompts') or 0
+            if self._last_sample is not None and now > self._last_sample[0]:
+                rate = max(0, completed - self._last_sample[1]) / (now - self._last_sample[0])
+                self.throughput = rate if self.throughput is None else (
+                    self.smoothing * rate + (1 - self.smoothing) * self.throughput
+                )
+            self._last_sample = (now, completed)
+
+            remaining = (progress.get('total_prompts') or 0) - completed
+            progress['throughput'] = round(self.throughput, 3) if self.throughput is not None else None
+            progress['eta_seconds'] = int(remaining / self.throughput) if self.throughput and remaining > 0 else None
+            dataset_id = self.current_dataset() if self.current_dataset else None
+            progress['current_dataset'] = self._dataset_name(dataset_id) if dataset_id is not None else None
+            ProgressStreamService.publish(
+                ProgressStreamService.evaluation_topic(self.evaluation_id), 'progress', progress, self.app
+            )
+
+    def _dataset_name(self, dataset_id: int) -> Optional[str]:
+        if dataset_id not in self._dataset_names:
+            dataset = Dataset.query.get(dataset_id)
+            self._dataset_names[dataset_id] = dataset.name if dataset else None
+        return self._dataset_names[dataset_id]
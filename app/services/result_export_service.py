@@ -0,0 +1,250 @@
+from itertools import chain, islice
+from typing import Any, Dict, Iterator, List, Optional
+from app.models import Dataset, ModelEvaluation, ModelEvaluationResult
+from app.services.evaluation_service import EvaluationService
+from app.services.result_search_service import ResultSearchService
+from app.utils.keyset_pagination import iter_batches
+from flask import current_app
+import csv
+import io
+import json
+import os
+import tempfile
+import unicodedata
+
+try:
+    # pyarrow为可选依赖，只有导出Parquet格式时需要
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+    pq = None
+
+# 导出格式: (MIME类型, 是否边生成边发送)；xlsx和parquet需要写完整个文件，先写入临时文件
+EXPORT_FORMATS = {
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', False),
+    'csv': ('text/csv; charset=utf-8', True),
+    'jsonl': ('application/x-ndjson; charset=utf-8', True),
+    'parquet': ('application/vnd.apache.parquet', False),
+}
+
+# 导出的列: (字段名, 表头, 最大列宽)
+EXPORT_COLUMNS = [
+    ('index', '序号', 8),
+    ('question', '问题', 60),
+    ('model_answer', '模型回答', 60),
+    ('reference_answer', '参考答案', 40),
+    ('score', '得分', 10),
+    ('dataset', '数据集', 30),
+]
+
+# write_only模式必须在写入数据行之前设置列宽，按前若干行估算
+XLSX_WIDTH_SAMPLE_ROWS = 200
+XLSX_MIN_COLUMN_WIDTH = 8
+# Excel单元格最多容纳的字符数
+XLSX_MAX_CELL_LENGTH = 32767
+
+
+class ResultExportService:
+    """
+    评估详细结果的流式导出，支持Excel、CSV、JSONL和Parquet。
+    结果按批从数据库读取并逐行写出，内存占用与结果总数无关：
+    CSV/JSONL边生成边通过分块响应发送；Excel（openpyxl只写模式）和Parquet（按批写入行组）先写入临时文件再发送。
+    """
+
+    @staticmethod
+    def count_results(evaluation: ModelEvaluation, search_query: Optional[str] = None,
+                      min_score: Optional[float] = None, max_score: Optional[float] = None) -> int:
+        if search_query and search_query.strip():
+            return ResultSearchService.search(evaluation.id, search_query, min_score, max_score, 1, 1)[1]
+        return EvaluationService.count_results(
+            evaluation, ResultExportService._filtered_query(evaluation.id, min_score, max_score), min_score, max_score
+        )
+
+    @staticmethod
+    def iter_rows(evaluation_id: int, search_query: Optional[str] = None, min_score: Optional[float] = None,
+                  max_score: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """按页面上的顺序逐行返回导出内容（有搜索词时按相关度，否则按结果ID）"""
+        batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 500)
+        if search_query and search_query.strip():
+            batches = ResultSearchService.iter_search(evaluation_id, search_query, min_score, max_score, batch_size)
+        else:
+            batches = iter_batches(
+                ResultExportService._filtered_query(evaluation_id, min_score, max_score),
+                ModelEvaluationResult.id, batch_size
+            )
+        dataset_names: Dict[int, str] = {}
+        index = 0
+        for batch in batches:
+            for result in batch:
+                index += 1
+                if result.dataset_id not in dataset_names:
+                    dataset = Dataset.query.get(result.dataset_id)
+                    dataset_names[result.dataset_id] = dataset.name if dataset else '未知数据集'
+                # 使用统一的user_prompt获取方法
+                try:
+                    question = EvaluationService._get_user_prompt_for_result(result)
+                except Exception as e:
+                    current_app.logger.error(f"获取结果 {result.id} 的userPrompt失败: {str(e)}")
+                    question = result.question
+                yield {
+                    'index': index,
+                    'question': question,
+                    'model_answer': result.model_answer,
+                    'reference_answer': result.reference_answer,
+                    'score': result.score,
+                    'dataset': dataset_names[result.dataset_id],
+                }
+
+    @staticmethod
+    def stream(export_format: str, rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+        """CSV/JSONL：每批行编码后作为一个分块返回"""
+        if export_format == 'csv':
+            return ResultExportService._stream_csv(rows)
+        if export_format == 'jsonl':
+            return ResultExportService._stream_jsonl(rows)
+        raise ValueError(f"{export_format} 格式不支持流式导出")
+
+    @staticmethod
+    def write_file(export_format: str, rows: Iterator[Dict[str, Any]]) -> str:
+        """Excel/Parquet：写入临时文件并返回路径，调用方发送后负责删除"""
+        fd, path = tempfile.mkstemp(prefix='evaluation_export_', suffix=f'.{export_format}')
+        os.close(fd)
+        try:
+            if export_format == 'xlsx':
+                ResultExportService._write_xlsx(rows, path)
+            elif export_format == 'parquet':
+                ResultExportService._write_parquet(rows, path)
+            else:
+                raise ValueError(f"{export_format} 格式不支持导出为文件")
+        except Exception:
+            os.remove(path)
+            raise
+        return path
+
+    @staticmethod
+    def _filtered_query(evaluation_id: int, min_score: Optional[float], max_score: Optional[float]):
+        query = ModelEvaluationResult.query.filter_by(evaluation_id=evaluation_id)
+        if min_score is not None:
+            query = query.filter(ModelEvaluationResult.score >= min_score)
+        if max_score is not None:
+            query = query.filter(ModelEvaluationResult.score <= max_score)
+        return query
+
+    @staticmethod
+    def _display_row(row: Dict[str, Any]) -> List[Any]:
+        """表格格式（Excel/CSV）中空的参考答案和得分显示为文字"""
+        return [
+            row['index'],
+            row['question'],
+            row['model_answer'],
+            row['reference_answer'] or '无',
+            row['score'] if row['score'] is not None else '无评分',
+            row['dataset'],
+        ]
+
+    @staticmethod
+    def _chunks(rows: Iterator[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 500)
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                return
+            yield chunk
+
+    @staticmethod
+    def _stream_csv(rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # 带BOM，Excel打开时能识别UTF-8编码
+        buffer.write('\ufeff')
+        writer.writerow([header for _, header, _ in EXPORT_COLUMNS])
+        for chunk in ResultExportService._chunks(rows):
+            writer.writerows(ResultExportService._display_row(row) for row in chunk)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def _stream_jsonl(rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+        for chunk in ResultExportService._chunks(rows):
+            yield ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in chunk).encode('utf-8')
+
+    @staticmethod
+    def _write_xlsx(rows: Iterator[Dict[str, Any]], path: str) -> None:
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+        from openpyxl.styles import Alignment, Font, PatternFill
+        from openpyxl.utils import get_column_letter
+
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet('评估结果')
+        sample = list(islice(rows, XLSX_WIDTH_SAMPLE_ROWS))
+        for position, width in enumerate(ResultExportService._estimate_column_widths(sample), start=1):
+            worksheet.column_dimensions[get_column_letter(position)].width = width
+
+        # 设置表头样式
+        header_font = Font(bold=True, color='FFFFFF')
+        header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+        header_alignment = Alignment(horizontal='center', vertical='center')
+        header_cells = []
+        for _, header, _ in EXPORT_COLUMNS:
+            cell = WriteOnlyCell(worksheet, value=header)
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.alignment = header_alignment
+            header_cells.append(cell)
+        worksheet.append(header_cells)
+
+        # 设置数据行样式
+        data_alignment = Alignment(vertical='top', wrap_text=True)
+        for row in chain(sample, rows):
+            cells = []
+            for value in ResultExportService._display_row(row):
+                if isinstance(value, str):
+                    # openpyxl拒绝写入控制字符，超长文本按Excel单元格上限截断
+                    value = ILLEGAL_CHARACTERS_RE.sub('', value)[:XLSX_MAX_CELL_LENGTH]
+                cell = WriteOnlyCell(worksheet, value=value)
+                cell.alignment = data_alignment
+                cells.append(cell)
+            worksheet.append(cells)
+        workbook.save(path)
+
+    @staticmethod
+    def _estimate_column_widths(sample: List[Dict[str, Any]]) -> List[float]:
+        """按样本中第90百分位的显示宽度（中文字符按2计）估算列宽，不超过各列的最大宽度"""
+        widths = []
+        for position, (_, header, max_width) in enumerate(EXPORT_COLUMNS):
+            lengths = sorted(
+                _display_width(str(value)) for value in
+                (ResultExportService._display_row(row)[position] for row in sample)
+            )
+            typical = lengths[int(len(lengths) * 0.9)] if lengths else 0
+            widths.append(min(max_width, max(XLSX_MIN_COLUMN_WIDTH, _display_width(header) + 2, typical + 2)))
+        return widths
+
+    @staticmethod
+    def _write_parquet(rows: Iterator[Dict[str, Any]], path: str) -> None:
+        if pyarrow is None:
+            raise ImportError("导出Parquet格式需要安装pyarrow: pip install pyarrow")
+        schema = pyarrow.schema([
+            ('index', pyarrow.int64()),
+            ('question', pyarrow.string()),
+            ('model_answer', pyarrow.string()),
+            ('reference_answer', pyarrow.string()),
+            ('score', pyarrow.float64()),
+            ('dataset', pyarrow.string()),
+        ])
+        # 每批写成一个行组
+        with pq.ParquetWriter(path, schema) as writer:
+            for chunk in ResultExportService._chunks(rows):
+                writer.write_table(pyarrow.Table.from_pylist(chunk, schema=schema))
+
+
+def _display_width(text: str) -> int:
+    """文本第一行（最多前200个字符）的显示宽度"""
+    line = text.split('\n', 1)[0][:200]
+    return sum(2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1 for char in line)
@@ -0,0 +1,307 @@
+from typing import Iterator, List, Optional, Tuple
+from app import db
+from app.models import ModelEvaluationResult
+from flask import current_app
+from markupsafe import Markup, escape
+from sqlalchemy import func, text
+from sqlalchemy.dialects.mysql import match
+import os
+import re
+import sqlite3
+import threading
+
+# MySQL全文索引（ngram分词，支持中文），覆盖问题、模型回答和裁判反馈
+FULLTEXT_INDEX_NAME = 'ft_eval_result_text'
+SEARCH_COLUMNS = ('question', 'model_answer', 'feedback')
+# MySQL ngram_token_size的默认值，短于该长度的搜索词按前缀匹配
+NGRAM_TOKEN_SIZE = 2
+# FTS5索引每批从数据库同步的结果数
+FTS_SYNC_BATCH_SIZE = 1000
+
+# 中日韩字符逐字成词，其他文字按连续的字母数字成词；搜索时中文按相邻字组成短语，等价于子串匹配
+_CJK_CHARS = '\u2e80-\u9fff\uf900-\ufaff'
+_TOKEN_PATTERN = re.compile(rf'[{_CJK_CHARS}]|[^\W{_CJK_CHARS}]+')
+# MySQL布尔全文检索中有特殊含义的字符
+_BOOLEAN_OPERATORS_PATTERN = re.compile(r'[+\-<>()~*"@]')
+
+_FTS_SCHEMA_SQL = (
+    'PRAGMA journal_mode=WAL',
+    # 无内容表：只保存倒排索引，原文仍在主数据库中
+    "CREATE VIRTUAL TABLE IF NOT EXISTS result_fts USING fts5(question, model_answer, feedback, content='')",
+    'CREATE TABLE IF NOT EXISTS result_meta (id INTEGER PRIMARY KEY, score REAL)',
+)
+
+# 每个进程只检查一次MySQL全文索引是否存在
+_fulltext_available: Optional[bool] = None
+_fulltext_lock = threading.Lock()
+
+
+class ResultSearchService:
+    """
+    评估详细结果的全文搜索，结果按相关度排序，可与分数范围筛选组合。
+    MySQL上使用ngram分词的FULLTEXT索引；其他数据库（或MySQL上尚未建立全文索引时）
+    为每个评估在本机维护一个SQLite FTS5索引文件，搜索前增量同步新入库的结果。
+    """
+
+    @staticmethod
+    def search_terms(search_query: Optional[str]) -> List[str]:
+        """按空白拆分搜索词，各词之间为“与”关系"""
+        terms = []
+        for term in (search_query or '').split():
+            if term not in terms:
+                terms.append(term)
+        return terms
+
+    @staticmethod
+    def search(evaluation_id: int, search_query: str, min_score: Optional[float] = None,
+               max_score: Optional[float] = None, page: int = 1,
+               per_page: int = 10) -> Tuple[List[ModelEvaluationResult], int]:
+        """返回相关度排序的一页结果和匹配总数"""
+        offset = max(0, (page - 1) * per_page)
+        if ResultSearchService._use_mysql_fulltext():
+            query = ResultSearchService._mysql_query(evaluation_id, search_query, min_score, max_score)
+            if query is None:
+                return [], 0
+            return query.offset(offset).limit(per_page).all(), query.order_by(None).count()
+        result_ids, total = ResultSearchService._fts_search(
+            evaluation_id, search_query, min_score, max_score, offset, per_page
+        )
+        return ResultSearchService._load_in_order(result_ids), total
+
+    @staticmethod
+    def iter_search(evaluation_id: int, search_query: str, min_score: Optional[float] = None,
+                    max_score: Optional[float] = None,
+                    batch_size: int = 500) -> Iterator[List[ModelEvaluationResult]]:
+        """按相关度顺序分批返回全部匹配结果（用于导出）"""
+        if ResultSearchService._use_mysql_fulltext():
+            query = ResultSearchService._mysql_query(evaluation_id, search_query, min_score, max_score)
+            if query is None:
+                return
+            offset = 0
+            while True:
+                batch = query.offset(offset).limit(batch_size).all()
+                if not batch:
+                    return
+                yield batch
+                offset += len(batch)
+        else:
+            result_ids, _ = ResultSearchService._fts_search(evaluation_id, search_query, min_score, max_score)
+            for start in range(0, len(result_ids), batch_size):
+                yield ResultSearchService._load_in_order(result_ids[start:start + batch_size])
+
+    @staticmethod
+    def highlight(value: Optional[str], search_query: Optional[str]) -> Markup:
+        """转义文本并用<mark>标出搜索词（不区分大小写）"""
+        value = '' if value is None else str(value)
+        terms = ResultSearchService.search_terms(search_query)
+        if not terms:
+            return escape(value)
+        pattern = re.compile('|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+        parts = []
+        position = 0
+        for matched in pattern.finditer(value):
+            parts.append(escape(value[position:matched.start()]))
+            parts.append(Markup('<mark>%s</mark>') % matched.group(0))
+            position = matched.end()
+        parts.append(escape(value[position:]))
+        return Markup('').join(parts)
+
+    @staticmethod
+    def ensure_fulltext_index() -> bool:
+        """
+        在MySQL上为详细结果表建立ngram全文索引（已存在时跳过），返回索引是否可用。
+        大表上建立全文索引需要重建表，应在初始化数据库时执行，而不是在请求中执行。
+        """
+        global _fulltext_available
+        if db.engine.dialect.name != 'mysql':
+            return False
+        table_name = ModelEvaluationResult.__tablename__
+        if not ResultSearchService._fulltext_index_exists():
+            current_app.logger.info(f"正在为 {table_name} 建立全文索引 {FULLTEXT_INDEX_NAME}...")
+            # 关闭停用词表，否则包含停用词的ngram（如英文的is、at）无法被搜索到
+            db.session.execute(text('SET SESSION innodb_ft_enable_stopword = OFF'))
+            db.session.execute(text(
+                f"ALTER TABLE {table_name} ADD FULLTEXT INDEX {FULLTEXT_INDEX_NAME} "
+                f"({', '.join(SEARCH_COLUMNS)}) WITH PARSER ngram"
+            ))
+            db.session.commit()
+        _fulltext_available = True
+        return True
+
+    @staticmethod
+    def remove_index(evaluation_id: int) -> None:
+        """删除评估的FTS5索引文件（评估被删除时调用）"""
+        index_path = ResultSearchService._fts_index_path(evaluation_id)
+        for path in (index_path, f'{index_path}-wal', f'{index_path}-shm'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _fulltext_index_exists() -> bool:
+        return db.session.execute(text(
+            'SELECT COUNT(*) FROM information_schema.statistics '
+            'WHERE table_schema = DATABASE() AND table_name = :table_name AND index_name = :index_name'
+        ), {'table_name': ModelEvaluationResult.__tablename__, 'index_name': FULLTEXT_INDEX_NAME}).scalar() > 0
+
+    @staticmethod
+    def _use_mysql_fulltext() -> bool:
+        global _fulltext_available
+        if current_app.config.get('RESULT_SEARCH_BACKEND', 'auto') != 'auto' or db.engine.dialect.name != 'mysql':
+            return False
+        if _fulltext_available is None:
+            with _fulltext_lock:
+                if _fulltext_available is None:
+                    _fulltext_available = ResultSearchService._fulltext_index_exists()
+                    if not _fulltext_available:
+                        current_app.logger.warning(
+                            f"详细结果表缺少全文索引 {FULLTEXT_INDEX_NAME}，结果搜索使用本机FTS5索引；"
+                            f"初始化数据库（flask init-db）时会自动建立全文索引"
+                        )
+        return _fulltext_available
+
+    @staticmethod
+    def _mysql_query(evaluation_id: int, search_query: str, min_score: Optional[float], max_score: Optional[float]):
+        boolean_terms = []
+        for term in ResultSearchService.search_terms(search_query):
+            term = _BOOLEAN_OPERATORS_PATTERN.sub(' ', term).strip()
+            if not term:
+                continue
+            # 短于ngram长度的词无法按短语匹配，改为前缀匹配
+            boolean_terms.append(f'+{term}*' if len(term) < NGRAM_TOKEN_SIZE else f'+"{term}"')
+        if not boolean_terms:
+            return None
+        relevance = match(
+            *(getattr(ModelEvaluationResult, column) for column in SEARCH_COLUMNS),
+            against=' '.join(boolean_terms)
+        ).in_boolean_mode()
+        query = ModelEvaluationResult.query.filter(
+            ModelEvaluationResult.evaluation_id == evaluation_id, relevance
+        )
+        if min_score is not None:
+            query = query.filter(ModelEvaluationResult.score >= min_score)
+        if max_score is not None:
+            query = query.filter(ModelEvaluationResult.score <= max_score)
+        return query.order_by(relevance.desc(), ModelEvaluationResult.id.asc())
+
+    @staticmethod
+    def _load_in_order(result_ids: List[int]) -> List[ModelEvaluationResult]:
+        if not result_ids:
+            return []
+        results = {
+            result.id: result
+            for result in ModelEvaluationResult.query.filter(ModelEvaluationResult.id.in_(result_ids)).all()
+        }
+        return [results[result_id] for result_id in result_ids if result_id in results]
+
+    @staticmethod
+    def _fts_index_path(evaluation_id: int) -> str:
+        return os.path.join(current_app.config['RESULT_SEARCH_INDEX_DIR'], f'evaluation_{evaluation_id}.sqlite3')
+
+    @staticmethod
+    def _fts_tokens(value: Optional[str]) -> List[str]:
+        return _TOKEN_PATTERN.findall((value or '').lower())
+
+    @staticmethod
+    def _fts_match_expression(search_query: str) -> Optional[str]:
+        phrases = []
+        for term in ResultSearchService.search_terms(search_query):
+            tokens = ResultSearchService._fts_tokens(term)
+            if not tokens:
+                continue
+            phrase = '"' + ' '.join(tokens) + '"'
+            # 以字母数字结尾的词按前缀匹配，与子串搜索的习惯一致
+            if not re.match(rf'[{_CJK_CHARS}]', tokens[-1]):
+                phrase += ' *'
+            phrases.append(phrase)
+        return ' AND '.join(phrases) if phrases else None
+
+    @staticmethod
+    def _fts_search(evaluation_id: int, search_query: str, min_score: Optional[float], max_score: Optional[float],
+                    offset: int = 0, limit: Optional[int] = None) -> Tuple[List[int], int]:
+        """在FTS5索引中按bm25相关度查询，返回(结果ID列表, 匹配总数)"""
+        match_expression = ResultSearchService._fts_match_expression(search_query)
+        if match_expression is None:
+            return [], 0
+        conn = ResultSearchService._open_fts_index(evaluation_id)
+        try:
+            ResultSearchService._sync_fts_index(conn, evaluation_id)
+            conditions = ['result_fts MATCH ?']
+            params: list = [match_expression]
+            if min_score is not None:
+                conditions.append('result_meta.score >= ?')
+                params.append(min_score)
+            if max_score is not None:
+                conditions.append('result_meta.score <= ?')
+                params.append(max_score)
+            from_clause = (
+                'FROM result_fts JOIN result_meta ON result_meta.id = result_fts.rowid WHERE '
+                + ' AND '.join(conditions)
+            )
+            total = conn.execute(f'SELECT COUNT(*) {from_clause}', params).fetchone()[0]
+            rows = conn.execute(
+                f'SELECT result_meta.id {from_clause} ORDER BY bm25(result_fts), result_meta.id LIMIT ? OFFSET ?',
+                params + [-1 if limit is None else limit, offset]
+            ).fetchall()
+            return [row[0] for row in rows], total
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _open_fts_index(evaluation_id: int) -> sqlite3.Connection:
+        index_path = ResultSearchService._fts_index_path(evaluation_id)
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        conn = sqlite3.connect(index_path, timeout=30, isolation_level=None)
+        for statement in _FTS_SCHEMA_SQL:
+            conn.execute(statement)
+        return conn
+
+    @staticmethod
+    def _sync_fts_index(conn: sqlite3.Connection, evaluation_id: int) -> None:
+        """
+        把新入库的结果写入FTS5索引。结果按自增ID追加写入，只需同步已索引的最大ID之后的结果；
+        结果被清理后重新入库（重新执行、续评）时已索引的部分与数据库不一致，清空后重建。
+        """
+        indexed_count, last_id = conn.execute('SELECT COUNT(*), COALESCE(MAX(id), 0) FROM result_meta').fetchone()
+        if indexed_count:
+            db_count = ModelEvaluationResult.query.filter(
+                ModelEvaluationResult.evaluation_id == evaluation_id, ModelEvaluationResult.id <= last_id
+            ).with_entities(func.count(ModelEvaluationResult.id)).scalar()
+            if db_count != indexed_count:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute("INSERT INTO result_fts(result_fts) VALUES ('delete-all')")
+                conn.execute('DELETE FROM result_meta')
+                conn.execute('COMMIT')
+                last_id = 0
+
+        while True:
+            rows = db.session.query(
+                ModelEvaluationResult.id, ModelEvaluationResult.question, ModelEvaluationResult.model_answer,
+                ModelEvaluationResult.feedback, ModelEvaluationResult.score
+            ).filter(
+                ModelEvaluationResult.evaluation_id == evaluation_id, ModelEvaluationResult.id > last_id
+            ).order_by(ModelEvaluationResult.id.asc()).limit(FTS_SYNC_BATCH_SIZE).all()
+            if not rows:
+                return
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # 其他进程可能已经同步了其中一部分
+                indexed_last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM result_meta').fetchone()[0]
+                new_rows = [row for row in rows if row.id > indexed_last_id]
+                conn.executemany(
+                    'INSERT INTO result_fts(rowid, question, model_answer, feedback) VALUES (?, ?, ?, ?)',
+                    [
+                        (row.id, *(' '.join(ResultSearchService._fts_tokens(value))
+                                   for value in (row.question, row.model_answer, row.feedback)))
+                        for row in new_rows
+                    ]
+                )
+                conn.executemany(
+                    'INSERT INTO result_meta(id, score) VALUES (?, ?)', [(row.id, row.score) for row in new_rows]
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            last_id = rows[-1].id
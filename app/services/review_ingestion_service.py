@@ -0,0 +1,319 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app import db
+from flask import current_app
+from app.models import ModelEvaluationResult, ReviewProgressCursor
+from app.utils.early_stopping import review_result_to_score
+from sqlalchemy.exc import IntegrityError
+import hashlib
+import glob
+import json
+import os
+import threading
+
+try:
+    # orjson为可选依赖，解析带长推理输出的评审记录时明显更快；未安装时使用标准库
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# evalscope输出结构中review目录的名称
+REVIEWS_DIR_NAME = 'reviews'
+
+
+def normalize_raw_input(raw_input: Any) -> Optional[str]:
+    """原始输入的规范化JSON（紧凑格式），非字典/列表的原始输入不保存"""
+    if not isinstance(raw_input, (dict, list)):
+        return None
+    return json.dumps(raw_input, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+class DatasetRouting:
+    """
+    根据评估创建时记录的路由表，把review文件名（"基准名_子集"）映射到数据集ID。
+    精确的子集路由为字典查找；"基准名/*"路由匹配该基准的任意子集，多个基准名互为前缀时取最长的一个。
+    """
+
+    def __init__(self, routes: Optional[Dict[str, int]]):
+        self._by_stem: Dict[str, Optional[int]] = {}
+        wildcard_benchmarks: Dict[str, int] = {}
+        for route_key, dataset_id in (routes or {}).items():
+            benchmark_key, _, subset_name = route_key.partition('/')
+            if subset_name == '*':
+                wildcard_benchmarks[benchmark_key] = dataset_id
+            else:
+                self._by_stem[f'{benchmark_key}_{subset_name}'] = dataset_id
+        self._wildcards = sorted(wildcard_benchmarks.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def resolve(self, filename_stem: str) -> Optional[int]:
+        if filename_stem not in self._by_stem:
+            # 结果缓存下来，同一文件只匹配一次
+            self._by_stem[filename_stem] = next(
+                (dataset_id for benchmark_key, dataset_id in self._wildcards if filename_stem.startswith(f'{benchmark_key}_')),
+                None
+            )
+        return self._by_stem[filename_stem]
+
+
+class ReviewIngestionService:
+    """把evalscope的reviews/*.jsonl评审记录解析为ModelEvaluationResult"""
+
+    @staticmethod
+    def review_record_to_row(item: dict, evaluation_id: int, dataset_id: int, logger=None,
+                             prompt_renderer: Optional[Callable[[Any, int], Optional[str]]] = None) -> Dict[str, Any]:
+        """
+        从一条评审记录中只取出详细结果需要的字段，返回可直接批量插入的列值。
+        传入prompt_renderer时同时渲染完整的userPrompt，查看和导出结果时直接读取，不再逐条调用adapter。
+        """
+        raw_input = item.get('raw_input', '')
+        raw_pred_answer = ''
+        review_data = {}
+        choices = item.get('choices')
+        choice = choices[0] if isinstance(choices, list) and choices else None
+        if isinstance(choice, dict):
+            if isinstance(choice.get('message'), dict):
+                raw_pred_answer = choice['message'].get('content', '')
+            elif 'content' in choice:
+                raw_pred_answer = choice.get('content', '')
+            review_data = choice.get('review') or {}
+
+        parsed_gold_answer = review_data.get('gold', '')
+        parsed_pred_answer_for_feedback = review_data.get('pred', '')
+        score = review_data.get('result')
+
+        # 处理不同格式的result
+        try:
+            if score is not None:
+                # 兼容布尔/数值结果和意图+槽位的复合结果
+                score = review_result_to_score(score)
+        except (ValueError, TypeError) as e:
+            if logger:
+                logger.warning(f"[评估任务 {evaluation_id}] Could not parse score '{score}'. Error: {str(e)}. Setting to None.")
+            score = None
+
+        rendered_prompt = None
+        if prompt_renderer is not None:
+            try:
+                rendered_prompt = prompt_renderer(raw_input, dataset_id)
+            except Exception as e:
+                # 渲染失败时留空，查看结果时按原始输入现场渲染
+                if logger:
+                    logger.warning(f"[评估任务 {evaluation_id}] 渲染userPrompt失败: {str(e)}")
+
+        return {
+            'evaluation_id': evaluation_id,
+            'dataset_id': dataset_id,
+            'question': str(raw_input),
+            'model_answer': str(raw_pred_answer),
+            'reference_answer': str(parsed_gold_answer),
+            'score': score,
+            'feedback': str(parsed_pred_answer_for_feedback),
+            'raw_input_json': normalize_raw_input(raw_input),
+            'rendered_prompt': rendered_prompt,
+        }
+
+
+class ReviewTailer:
+    """
+    评估运行期间跟随evalscope追加写入的review文件，把新增的完整行分批写入详细结果表。
+    每个文件记录已读取的字节偏移，末尾写了一半的行留到下一轮再读；
+    文件逐行流式读取，每batch_size行用一次executemany插入，内存占用与文件大小无关。
+    stop()停止后台线程并读完剩余的增量。
+    """
+
+    def __init__(self, app, evaluation_id: int, base_output_dir: str, model_dir_name: str,
+                 dataset_routing: Optional[Dict[str, int]], interval: float = 5.0, batch_size: int = 200,
+                 prompt_renderer: Optional[Callable[[Any, int], Optional[str]]] = None,
+                 shard_index: Optional[int] = None):
+        self.app = app
+        self.evaluation_id = evaluation_id
+        self.base_output_dir = base_output_dir
+        self.model_dir_name = model_dir_name
+        self.routing = DatasetRouting(dataset_routing)
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self.prompt_renderer = prompt_renderer
+        self.shard_index = shard_index
+        self.ingested = 0
+        # 最近一次有新增评审记录的数据集，用于进度展示
+        self.current_dataset_id: Optional[int] = None
+        self._offsets: Dict[str, int] = {}
+        self._unrouted_files = set()
+        self._poll_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name=f"review-tailer-{self.evaluation_id}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> int:
+        """停止跟随并写入剩余增量，返回本次共写入的结果数"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.poll()
+        return self.ingested
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                with self.app.app_context():
+                    self.app.logger.warning(f"[评估任务 {self.evaluation_id}] 增量写入评审结果失败，将在下一轮重试: {str(e)}")
+
+    def _review_files(self) -> List[str]:
+        # evalscope在输出目录下创建时间戳工作目录，续评时复用最新的一个
+        run_dirs = sorted(
+            d for d in glob.glob(os.path.join(self.base_output_dir, '*'))
+            if os.path.isdir(d)
+        )
+        if not run_dirs:
+            return []
+        return sorted(glob.glob(os.path.join(run_dirs[-1], REVIEWS_DIR_NAME, self.model_dir_name, '*.jsonl')))
+
+    def poll(self) -> int:
+        """读取所有review文件的新增完整行并写入数据库，返回本轮写入的结果数"""
+        with self._poll_lock, self.app.app_context():
+            written = 0
+            for file_path in self._review_files():
+                dataset_id = self._dataset_for_file(file_path)
+                if dataset_id is None:
+                    continue
+                offset = self._offsets.get(file_path, 0)
+                rows = []
+                position = offset
+                with open(file_path, 'rb') as f:
+                    f.seek(offset)
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            # 写了一半的行
+                            break
+                        position += len(line)
+                        if line.strip():
+                            try:
+                                row = ReviewIngestionService.review_record_to_row(
+                                    _loads(line), self.evaluation_id, dataset_id, self.app.logger, self.prompt_renderer
+                                )
+                                row['shard_index'] = self.shard_index
+                                rows.append(row)
+                            except ValueError as e:
+                                self.app.logger.warning(f"[评估任务 {self.evaluation_id}] 跳过无法解析的评审记录 ({file_path}): {str(e)}")
+                        # 每批提交成功后才推进偏移，写入失败时下一轮从上次提交的位置重读
+                        if len(rows) >= self.batch_size:
+                            written += self._flush(rows)
+                            rows = []
+                            self._offsets[file_path] = position
+                written += self._flush(rows)
+                self._offsets[file_path] = position
+                if position > offset:
+                    self.current_dataset_id = dataset_id
+            if written:
+                self.app.logger.info(f"[评估任务 {self.evaluation_id}] 增量写入 {written} 条详细结果，累计 {self.ingested} 条。")
+            return written
+
+    def _flush(self, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        try:
+            # 传入参数列表时SQLAlchemy使用executemany，不创建ORM对象
+            db.session.execute(ModelEvaluationResult.__table__.insert(), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        self.ingested += len(rows)
+        return len(rows)
+
+    def _dataset_for_file(self, file_path: str) -> Optional[int]:
+        filename_stem = os.path.basename(file_path)[:-len('.jsonl')]
+        dataset_id = self.routing.resolve(filename_stem)
+        if dataset_id is None and file_path not in self._unrouted_files:
+            self._unrouted_files.add(file_path)
+            self.app.logger.warning(f"[评估任务 {self.evaluation_id}] 路由表中没有review文件 '{filename_stem}' 对应的数据集，跳过该文件")
+        return dataset_id
+
+
+class ReviewProgressTracker:
+    """
+    增量统计review文件中已完成的样本数。
+    每个文件的(inode, 已读位置, 行数)保存在review_progress_cursor表中，所有Web进程共享，
+    每次只扫描上次位置之后新追加的完整行；多个进程同时推进同一文件时以先提交者为准。
+    """
+
+    @staticmethod
+    def count_completed(evaluation_id: int, reviews_base_path: str, routing: Optional[DatasetRouting] = None) -> int:
+        """统计目录下（有路由表时只统计能路由到本评估数据集的）review文件的非空行总数"""
+        if not os.path.isdir(reviews_base_path):
+            return 0
+        completed_count = 0
+        for review_filename in os.listdir(reviews_base_path):
+            if not review_filename.endswith('.jsonl'):
+                continue
+            if routing is not None and routing.resolve(review_filename[:-len('.jsonl')]) is None:
+                continue
+            review_file_path = os.path.join(reviews_base_path, review_filename)
+            try:
+                completed_count += ReviewProgressTracker._count_file(evaluation_id, review_file_path)
+            except OSError as e:
+                current_app.logger.warning(f"读取review文件失败 {review_file_path}: {str(e)}")
+        return completed_count
+
+    @staticmethod
+    def _count_file(evaluation_id: int, file_path: str) -> int:
+        stat = os.stat(file_path)
+        file_key = hashlib.sha256(file_path.encode('utf-8')).hexdigest()
+        cursor = ReviewProgressCursor.query.filter_by(evaluation_id=evaluation_id, file_key=file_key).first()
+        if cursor is not None and cursor.inode == stat.st_ino and cursor.byte_offset == stat.st_size:
+            return cursor.line_count
+
+        # 文件被替换或截断时从头统计
+        if cursor is not None and cursor.inode == stat.st_ino and cursor.byte_offset <= stat.st_size:
+            offset, line_count = cursor.byte_offset, cursor.line_count
+        else:
+            offset, line_count = 0, 0
+        new_offset, new_lines = ReviewProgressTracker._scan(file_path, offset)
+        if new_offset == offset and cursor is not None and cursor.inode == stat.st_ino:
+            return line_count
+        line_count += new_lines
+
+        table = ReviewProgressCursor.__table__
+        values = {'inode': stat.st_ino, 'byte_offset': new_offset, 'line_count': line_count}
+        try:
+            if cursor is None:
+                db.session.execute(table.insert().values(
+                    evaluation_id=evaluation_id, file_key=file_key, file_path=file_path[:1000], **values
+                ))
+            else:
+                # 只有位置未被其他进程推进时才更新，否则使用其他进程的结果
+                updated = db.session.execute(table.update().where(
+                    (table.c.id == cursor.id) & (table.c.inode == cursor.inode) & (table.c.byte_offset == cursor.byte_offset)
+                ).values(**values)).rowcount
+                if not updated:
+                    db.session.rollback()
+                    latest = ReviewProgressCursor.query.get(cursor.id)
+                    return latest.line_count if latest is not None else line_count
+            db.session.commit()
+        except IntegrityError:
+            # 其他进程先创建了该文件的记录
+            db.session.rollback()
+        return line_count
+
+    @staticmethod
+    def _scan(file_path: str, offset: int) -> Tuple[int, int]:
+        """从offset开始统计完整的非空行，返回(最后一个完整行末尾的位置, 非空行数)"""
+        line_count = 0
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                if line.strip():
+                    line_count += 1
+        return offset, line_count
+
@@ -0,0 +1,120 @@
+# 自适应并发控制（AIMD：加性增、乘性减）
+from collections import deque
+from contextlib import contextmanager
+from typing import List, Optional
+import threading
+import time
+
+
+def is_overload_error(exc: Exception) -> bool:
+    """判断异常是否表示服务端过载：429限流、5xx、超时或连接失败"""
+    status_code = getattr(exc, 'status_code', None)
+    if status_code is None:
+        response = getattr(exc, 'response', None)
+        status_code = getattr(response, 'status_code', None)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    return type(exc).__name__ in ('APITimeoutError', 'APIConnectionError', 'Timeout', 'ConnectionError')
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD并发限制器。
+    - 请求成功且延迟没有明显高于基线时，并发上限每完成约limit个请求加1
+    - 出现限流或5xx时并发上限减半，冷却期内的连续失败只减一次
+    - 并发上限的变化按时间记录下来，用于下次评估的起始并发
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_tolerance: float = 2.0,
+        backoff_ratio: float = 0.5,
+        cooldown_seconds: float = 2.0,
+        latency_window: int = 100
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self._limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.cooldown_seconds = cooldown_seconds
+
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._latencies = deque(maxlen=latency_window)
+        self._last_backoff_at = 0.0
+        self._started_at = time.monotonic()
+        self._history: List[List[float]] = [[0.0, int(self._limit)]]
+        self._backoff_limits: List[int] = []  # 每次回退前的并发上限
+        self.success_count = 0
+        self.overload_count = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @contextmanager
+    def slot(self):
+        """获取一个并发槽位，执行结束后根据结果调整并发上限"""
+        self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self.release(overloaded=is_overload_error(e))
+            raise
+        else:
+            self.release(latency=time.monotonic() - started)
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            previous_limit = int(self._limit)
+            if overloaded:
+                self.overload_count += 1
+                now = time.monotonic()
+                if now - self._last_backoff_at >= self.cooldown_seconds:
+                    self._backoff_limits.append(previous_limit)
+                    self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+                    self._last_backoff_at = now
+            elif latency is not None:
+                self.success_count += 1
+                baseline = min(self._latencies) if self._latencies else latency
+                self._latencies.append(latency)
+                if latency <= baseline * self.latency_tolerance:
+                    self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            if int(self._limit) != previous_limit:
+                self._history.append([round(time.monotonic() - self._started_at, 1), int(self._limit)])
+            self._condition.notify_all()
+
+    def summary(self, max_points: int = 200) -> dict:
+        """返回并发变化历史（[秒, 并发数]）、最终并发和建议的起始并发，历史点过多时均匀抽样"""
+        with self._condition:
+            history = list(self._history)
+            final_limit = int(self._limit)
+            backoff_limits = list(self._backoff_limits)
+        # 出现过回退时，取回退点均值的3/4作为稳定并发（AIMD锯齿的平均水平），否则取最终并发
+        if backoff_limits:
+            recommended = max(self.min_limit, int(0.75 * sum(backoff_limits) / len(backoff_limits)))
+        else:
+            recommended = final_limit
+        if len(history) > max_points:
+            step = len(history) / float(max_points)
+            history = [history[int(i * step)] for i in range(max_points - 1)] + [history[-1]]
+        return {
+            'final': final_limit,
+            'recommended': recommended,
+            'max_reached': max(point[1] for point in history),
+            'successes': self.success_count,
+            'overloads': self.overload_count,
+            'history': history,
+        }
@@ -0,0 +1,262 @@
+# 可插拔的缓存层：按条目TTL过期，超出容量时按最近访问时间(LRU)淘汰
+# memory: 进程内，可以缓存任意对象（如adapter实例）；
+# sqlite: 本机SQLite文件，gunicorn的多个worker和评估工作进程共用同一份缓存（默认）；
+# redis: 多台机器共用（需安装redis包，容量淘汰由Redis的maxmemory-policy负责）
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_CREATE_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS cache_entry (
+    cache_key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL
+)
+'''
+
+# 未命中时的默认返回值，区分“缓存了None”和“没有缓存”
+_MISSING = object()
+
+_backends: Dict[Tuple, 'CacheBackend'] = {}
+_backends_lock = threading.Lock()
+
+
+class CacheBackend:
+    """缓存后端接口，值为可JSON序列化的对象（memory后端不限制）"""
+
+    def get(self, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """进程内的LRU缓存"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max(1, max_entries)
+        self._entries: 'OrderedDict[str, Tuple[Any, Optional[float]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+
+class SQLiteCache(CacheBackend):
+    """
+    本机SQLite文件中的缓存，所有进程共享。
+    每写入evict_every次检查一次容量，超出max_entries时删除过期条目和最久未访问的条目。
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 10000, evict_every: int = 100):
+        self.db_path = db_path
+        self.max_entries = max(1, max_entries)
+        self.evict_every = max(1, evict_every)
+        self._writes = 0
+        self._lock = threading.Lock()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(_CREATE_TABLE_SQL)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_entry_accessed ON cache_entry (accessed_at)')
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                'SELECT value, expires_at FROM cache_entry WHERE cache_key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return default
+            if row[1] is not None and row[1] <= now:
+                conn.execute('DELETE FROM cache_entry WHERE cache_key = ? AND expires_at <= ?', (key, now))
+                return default
+            conn.execute('UPDATE cache_entry SET accessed_at = ? WHERE cache_key = ?', (now, key))
+            return json.loads(row[0])
+        finally:
+            conn.close()
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_entry (cache_key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value, ensure_ascii=False), now + ttl if ttl else None, now)
+            )
+            with self._lock:
+                self._writes += 1
+                evict = self._writes % self.evict_every == 0
+            if evict:
+                self._evict(conn, now)
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute('DELETE FROM cache_entry WHERE expires_at IS NOT NULL AND expires_at <= ?', (now,))
+        overflow = conn.execute('SELECT COUNT(*) FROM cache_entry').fetchone()[0] - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                'DELETE FROM cache_entry WHERE cache_key IN '
+                '(SELECT cache_key FROM cache_entry ORDER BY accessed_at LIMIT ?)',
+                (overflow,)
+            )
+
+    def delete(self, key: str) -> None:
+        conn = self._connect()
+        try:
+            conn.execute('DELETE FROM cache_entry WHERE cache_key = ?', (key,))
+        finally:
+            conn.close()
+
+    def delete_prefix(self, prefix: str) -> None:
+        conn = self._connect()
+        try:
+            conn.execute(
+                "DELETE FROM cache_entry WHERE substr(cache_key, 1, ?) = ?", (len(prefix), prefix)
+            )
+        finally:
+            conn.close()
+
+
+class RedisCache(CacheBackend):
+    """Redis（或兼容协议的服务）中的缓存"""
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("使用redis缓存后端需要安装redis包: pip install redis")
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._client.get(key)
+        return default if value is None else json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._client.set(key, json.dumps(value, ensure_ascii=False), px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key: str) -> None:
+        self._client.delete(key)
+
+    def delete_prefix(self, prefix: str) -> None:
+        for key in self._client.scan_iter(match=f'{prefix}*'):
+            self._client.delete(key)
+
+
+class Cache:
+    """带命名空间的缓存，不同用途的键互不冲突，可按命名空间整体失效"""
+
+    def __init__(self, backend: CacheBackend, namespace: str, default_ttl: Optional[float] = None):
+        self.backend = backend
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+
+    def _key(self, key: str) -> str:
+        return f'{self.namespace}:{key}'
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.backend.get(self._key(key), default)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.backend.set(self._key(key), value, ttl if ttl is not None else self.default_ttl)
+
+    def delete(self, key: str) -> None:
+        self.backend.delete(self._key(key))
+
+    def clear(self) -> None:
+        self.backend.delete_prefix(f'{self.namespace}:')
+
+    def get_or_set(self, key: str, factory: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """命中时返回缓存值，否则调用factory计算并写入缓存"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+
+def _get_backend(backend_name: str, db_path: Optional[str] = None, redis_url: Optional[str] = None,
+                 max_entries: int = 10000) -> CacheBackend:
+    backend_key = (backend_name, db_path, redis_url, max_entries)
+    backend = _backends.get(backend_key)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(backend_key)
+            if backend is None:
+                if backend_name == 'memory':
+                    backend = MemoryCache(max_entries)
+                elif backend_name == 'sqlite':
+                    backend = SQLiteCache(db_path, max_entries)
+                elif backend_name == 'redis':
+                    backend = RedisCache(redis_url)
+                else:
+                    raise ValueError(f"不支持的缓存后端: {backend_name}")
+                _backends[backend_key] = backend
+    return backend
+
+
+def get_cache(namespace: str, config: Dict[str, Any], backend: Optional[str] = None,
+              default_ttl: Optional[float] = None, max_entries: Optional[int] = None) -> Cache:
+    """
+    按应用配置获取缓存。backend为None时使用CACHE_BACKEND；
+    需要缓存不可序列化对象（只能在进程内共享）时传入backend='memory'。
+    """
+    backend_name = backend or config.get('CACHE_BACKEND', 'sqlite')
+    return Cache(
+        _get_backend(
+            backend_name,
+            db_path=config.get('CACHE_DB_PATH'),
+            redis_url=config.get('CACHE_REDIS_URL'),
+            max_entries=max_entries or config.get('CACHE_MAX_ENTRIES', 10000)
+        ),
+        namespace,
+        default_ttl if default_ttl is not None else config.get('CACHE_DEFAULT_TTL')
+    )
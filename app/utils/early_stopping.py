@@ -0,0 +1,189 @@
+# 基于置信区间的评估早停
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Tuple
+import math
+import random
+
+
+def review_result_to_score(result: Any) -> float:
+    """
+    将evalscope评审结果转换为单个样本的得分。
+    支持布尔/数值结果，以及意图+槽位的复合结果（意图正确占0.5，槽位F1占0.5）。
+
+    Raises:
+        ValueError/TypeError: 无法转换为数值
+    """
+    if isinstance(result, dict):
+        if 'intent_result' in result and 'slots_result' in result:
+            intent_result = result.get('intent_result', False)
+            slots_result = result.get('slots_result', {})
+
+            # 计算slot的F1分数
+            correct_count = slots_result.get('correct_count', 0)
+            miss_count = slots_result.get('miss_count', 0)
+            fail_count = slots_result.get('fail_count', 0)
+
+            total_predicted = correct_count + fail_count
+            total_actual = correct_count + miss_count
+
+            if total_predicted > 0 and total_actual > 0:
+                precision = correct_count / total_predicted
+                recall = correct_count / total_actual
+                slot_f1 = 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0
+            else:
+                slot_f1 = 0.0
+
+            if correct_count + miss_count + fail_count == 0:
+                slot_f1 = 1.0
+
+            return float(intent_result) * 0.5 + 0.5 * slot_f1
+    return float(result)
+
+
+def stratified_order(prompts: Dict[str, List[dict]], seed: Optional[int] = None) -> List[Tuple[str, dict]]:
+    """
+    按子集分层的随机顺序：各子集内部先打乱，再按子集大小比例交错排列，
+    使任意前缀中各子集的样本占比都接近其在全量数据中的占比。
+    """
+    rng = random.Random(seed)
+    keyed = []
+    for subset_name, prompts_list in prompts.items():
+        shuffled = list(prompts_list)
+        rng.shuffle(shuffled)
+        size = len(shuffled)
+        for position, prompt in enumerate(shuffled):
+            # 第position个样本落在[position/size, (position+1)/size)区间内的随机位置
+            keyed.append(((position + rng.random()) / size, subset_name, prompt))
+    keyed.sort(key=lambda item: item[0])
+    return [(subset_name, prompt) for _, subset_name, prompt in keyed]
+
+
+class RunningConfidenceInterval:
+    """
+    样本均值的滚动置信区间。
+    得分全部为0/1时使用Wilson区间，否则使用正态近似；抽样不放回，按有限总体校正区间宽度。
+    """
+
+    def __init__(self, confidence: float = 0.95, population: Optional[int] = None):
+        self.confidence = confidence
+        self.population = population
+        self._z = NormalDist().inv_cdf((1 + confidence) / 2)
+        self.count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._binary = True
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self._sum += value
+        self._sum_sq += value * value
+        if value not in (0.0, 1.0):
+            self._binary = False
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self._sum / self.count if self.count else None
+
+    def _finite_population_correction(self) -> float:
+        if not self.population or self.population <= 1:
+            return 1.0
+        return math.sqrt(max(0.0, (self.population - self.count) / (self.population - 1)))
+
+    def interval(self) -> Optional[Tuple[float, float]]:
+        if not self.count:
+            return None
+        n = self.count
+        mean = self.mean
+        fpc = self._finite_population_correction()
+        if self._binary:
+            z2 = self._z ** 2
+            center = (mean + z2 / (2 * n)) / (1 + z2 / n)
+            half_width = self._z * math.sqrt(mean * (1 - mean) / n + z2 / (4 * n * n)) / (1 + z2 / n) * fpc
+        else:
+            variance = max(0.0, (self._sum_sq - n * mean * mean) / (n - 1)) if n > 1 else float('inf')
+            center = mean
+            half_width = self._z * math.sqrt(variance / n) * fpc if n > 1 else float('inf')
+        return center - half_width, center + half_width
+
+    def half_width(self) -> float:
+        bounds = self.interval()
+        if bounds is None or math.isinf(bounds[1]):
+            return float('inf')
+        return (bounds[1] - bounds[0]) / 2
+
+    def to_dict(self) -> Dict[str, Any]:
+        bounds = self.interval()
+        ci_low = ci_high = half_width = None
+        if bounds is not None and not math.isinf(bounds[1]):
+            ci_low, ci_high = bounds
+            if self._binary:
+                ci_low, ci_high = max(0.0, ci_low), min(1.0, ci_high)
+            ci_low, ci_high, half_width = round(ci_low, 6), round(ci_high, 6), round(self.half_width(), 6)
+        return {
+            'samples': self.count,
+            'total': self.population,
+            'mean': round(self.mean, 6) if self.count else None,
+            'ci_low': ci_low,
+            'ci_high': ci_high,
+            'half_width': half_width,
+            'confidence': self.confidence,
+        }
+
+
+class EarlyStopping:
+    """
+    一次评估的早停配置，并收集各数据集的早停结果。
+    每个数据集独立维护置信区间，区间半宽不大于margin（且至少评估min_samples个样本）后停止发出新请求。
+    """
+
+    def __init__(self, margin: float, confidence: float = 0.95, min_samples: int = 30, seed: Optional[int] = None):
+        self.margin = margin
+        self.confidence = confidence
+        self.min_samples = max(1, min_samples)
+        self.seed = seed
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def new_interval(self, population: int) -> RunningConfidenceInterval:
+        return RunningConfidenceInterval(self.confidence, population)
+
+    def should_stop(self, interval: RunningConfidenceInterval) -> bool:
+        return interval.count >= self.min_samples and interval.half_width() <= self.margin
+
+    def record(self, dataset_name: str, interval: RunningConfidenceInterval, subset_samples: Dict[str, int]) -> None:
+        stats = interval.to_dict()
+        stats.update(
+            target_half_width=self.margin,
+            stopped_early=bool(interval.population) and interval.count < interval.population,
+            subset_samples=subset_samples,
+        )
+        self.results[dataset_name] = stats
+
+
+def merge_early_stopping_stats(stats_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """合并同一数据集在多个分片上的早停结果：按各分片的总体大小加权（分层估计）"""
+    total = sum(stats.get('total') or 0 for stats in stats_list)
+    merged = {
+        'samples': sum(stats.get('samples') or 0 for stats in stats_list),
+        'total': total,
+        'confidence': stats_list[0].get('confidence'),
+        'target_half_width': stats_list[0].get('target_half_width'),
+        'stopped_early': any(stats.get('stopped_early') for stats in stats_list),
+        'subset_samples': {},
+        'mean': None,
+        'ci_low': None,
+        'ci_high': None,
+        'half_width': None,
+    }
+    for stats in stats_list:
+        merged['subset_samples'].update(stats.get('subset_samples') or {})
+    if total and all(stats.get('mean') is not None and stats.get('half_width') is not None for stats in stats_list):
+        weights = [(stats.get('total') or 0) / total for stats in stats_list]
+        mean = sum(weight * stats['mean'] for weight, stats in zip(weights, stats_list))
+        half_width = math.sqrt(sum((weight * stats['half_width']) ** 2 for weight, stats in zip(weights, stats_list)))
+        merged.update(
+            mean=round(mean, 6),
+            half_width=round(half_width, 6),
+            ci_low=round(mean - half_width, 6),
+            ci_high=round(mean + half_width, 6),
+        )
+    return merged
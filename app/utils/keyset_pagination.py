@@ -0,0 +1,51 @@
+# 按自增主键的键集（seek）分页
+# 相邻翻页、首页和末页都从上一页的边界ID直接定位，代价与页码无关；
+# 跳到任意页时先在索引上取出该页的ID（延迟关联），再按ID取整行，不为跳过的行读取整行数据
+from typing import Iterator, List, Optional
+
+
+def seek_page(query, id_column, per_page: int, after_id: Optional[int] = None,
+              before_id: Optional[int] = None, from_end: bool = False) -> list:
+    """
+    取ID在after_id之后（或before_id之前）的一页，结果按ID升序。
+    from_end为True时取最后一页（最大的per_page个ID）。query不能带排序。
+    """
+    if before_id is not None or from_end:
+        if before_id is not None:
+            query = query.filter(id_column < before_id)
+        rows = query.order_by(id_column.desc()).limit(per_page).all()
+        rows.reverse()
+        return rows
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
+    return query.order_by(id_column.asc()).limit(per_page).all()
+
+
+def offset_page(query, id_column, offset: int, limit: int, total: Optional[int] = None) -> list:
+    """
+    按偏移取一页（用于跳页），结果按ID升序。
+    先只查询ID（可以只扫描索引），再按ID取整行；已知总数时从离该页更近的一端开始数。
+    """
+    if total is not None and offset > total // 2:
+        reverse_offset = max(0, total - offset - limit)
+        limit = min(limit, total - offset)
+        if limit <= 0:
+            return []
+        id_query = query.with_entities(id_column).order_by(id_column.desc()).offset(reverse_offset).limit(limit)
+    else:
+        id_query = query.with_entities(id_column).order_by(id_column.asc()).offset(offset).limit(limit)
+    page_ids = [row[0] for row in id_query.all()]
+    if not page_ids:
+        return []
+    return query.filter(id_column.in_(page_ids)).order_by(id_column.asc()).all()
+
+
+def iter_batches(query, id_column, batch_size: int) -> Iterator[List]:
+    """按ID升序分批遍历查询的全部结果，每批从上一批最后一个ID之后定位"""
+    after_id = None
+    while True:
+        batch = seek_page(query, id_column, batch_size, after_id=after_id)
+        if not batch:
+            return
+        yield batch
+        after_id = getattr(batch[-1], id_column.key)
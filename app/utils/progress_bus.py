@@ -0,0 +1,177 @@
+# 本机的进度事件发布/订阅
+# 发布方（评估工作进程、Web进程内的工作线程、性能测试监控线程）把事件追加写入主题文件；
+# 每个Web进程对每个主题只启动一个读取线程，把新事件分发给该主题的所有订阅者，同一评估的多个查看者共用一个读取线程
+from typing import Any, Dict, List, Optional
+import json
+import os
+import queue
+import threading
+import time
+
+# 每个事件目录对应一个总线实例
+_buses: Dict[str, 'ProgressBus'] = {}
+_buses_lock = threading.Lock()
+
+
+class Subscription:
+    """一个订阅者的事件队列，队列满时丢弃最旧的事件（进度事件总是以最新的为准）"""
+
+    def __init__(self, bus: 'ProgressBus', topic: str, max_pending: int = 100):
+        self._bus = bus
+        self.topic = topic
+        self._queue = queue.Queue(maxsize=max_pending)
+
+    def put(self, event: Dict[str, Any]) -> None:
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """等待下一个事件，超时返回None"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self._bus._unsubscribe(self)
+
+    def __enter__(self) -> 'Subscription':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class _TopicReader:
+    """跟随一个主题文件的新增事件，分发给订阅者；最后一个订阅者退出后线程结束"""
+
+    def __init__(self, bus: 'ProgressBus', topic: str):
+        self.bus = bus
+        self.topic = topic
+        self.subscribers: List[Subscription] = []
+        self._inode = None
+        self._offset = 0
+        # 只分发订阅之后发布的事件，订阅时的状态由调用方从数据库读取
+        try:
+            stat = os.stat(bus.topic_path(topic))
+            self._inode, self._offset = stat.st_ino, stat.st_size
+        except OSError:
+            pass
+        self._thread = threading.Thread(target=self._run, name=f"progress-bus-{topic}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self.bus._lock:
+                if not self.subscribers:
+                    self.bus._readers.pop(self.topic, None)
+                    return
+                subscribers = list(self.subscribers)
+            for event in self._read_new_events():
+                for subscriber in subscribers:
+                    subscriber.put(event)
+            time.sleep(self.bus.poll_interval)
+
+    def _read_new_events(self) -> List[Dict[str, Any]]:
+        path = self.bus.topic_path(self.topic)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return []
+        # 主题文件被轮转（替换）或删除重建时从头读取
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._inode, self._offset = stat.st_ino, 0
+        if stat.st_size == self._offset:
+            return []
+        events = []
+        with open(path, 'rb') as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self._offset += len(line)
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+        return events
+
+
+class ProgressBus:
+    """
+    以目录下的<主题>.jsonl文件为通道的发布/订阅。
+    每个事件一行，单次追加写入；文件超过max_bytes时发布方用只含最新事件的新文件替换，读取方按inode变化从头读取。
+    """
+
+    def __init__(self, base_dir: str, poll_interval: float = 0.5, max_bytes: int = 1024 * 1024):
+        self.base_dir = base_dir
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        os.makedirs(base_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._readers: Dict[str, _TopicReader] = {}
+
+    def topic_path(self, topic: str) -> str:
+        return os.path.join(self.base_dir, f'{topic}.jsonl')
+
+    def publish(self, topic: str, event: Dict[str, Any]) -> None:
+        line = (json.dumps(event, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+        path = self.topic_path(topic)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if size + len(line) > self.max_bytes:
+            temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(line)
+            os.replace(temp_path, path)
+            return
+        with open(path, 'ab') as f:
+            f.write(line)
+
+    def subscribe(self, topic: str) -> Subscription:
+        subscription = Subscription(self, topic)
+        with self._lock:
+            reader = self._readers.get(topic)
+            if reader is None:
+                reader = _TopicReader(self, topic)
+                self._readers[topic] = reader
+                reader.subscribers.append(subscription)
+                reader.start()
+            else:
+                reader.subscribers.append(subscription)
+        return subscription
+
+    def remove(self, topic: str) -> None:
+        """删除主题文件（评估/任务被删除时调用）"""
+        try:
+            os.remove(self.topic_path(topic))
+        except OSError:
+            pass
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            reader = self._readers.get(subscription.topic)
+            if reader is not None and subscription in reader.subscribers:
+                reader.subscribers.remove(subscription)
+
+
+def get_progress_bus(base_dir: str) -> ProgressBus:
+    bus = _buses.get(base_dir)
+    if bus is None:
+        with _buses_lock:
+            bus = _buses.get(base_dir)
+            if bus is None:
+                bus = ProgressBus(base_dir)
+                _buses[base_dir] = bus
+    return bus
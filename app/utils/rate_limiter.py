@@ -0,0 +1,163 @@
+# 跨进程共享的模型端点限流器（令牌桶）
+# 状态保存在本机的SQLite文件中，gunicorn的多个worker、评估工作进程和性能测试子进程共用同一份配额
+from typing import Dict, List, Optional
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_CREATE_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS endpoint_bucket (
+    endpoint_key TEXT PRIMARY KEY,
+    request_tokens REAL NOT NULL,
+    token_tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+'''
+
+# 每个SQLite文件对应一个限流器实例
+_limiters: Dict[str, 'SharedRateLimiter'] = {}
+_limiters_lock = threading.Lock()
+
+
+def estimate_request_tokens(messages: Optional[List[dict]], max_tokens: Optional[int] = None) -> int:
+    """
+    粗略估算一次请求消耗的token数：提示词按每2个字符1个token估算（兼顾中英文），再加上最大生成长度。
+    实际用量在请求结束后通过SharedRateLimiter.adjust修正。
+    """
+    prompt_chars = len(json.dumps(messages or [], ensure_ascii=False))
+    return prompt_chars // 2 + (max_tokens or 0)
+
+
+def estimate_text_tokens(text: str) -> int:
+    """按与estimate_request_tokens相同的口径估算一段生成文本的token数，用于服务端没有返回usage的流式响应"""
+    return len(text or '') // 2
+
+
+class SharedRateLimiter:
+    """
+    按端点（api_base_url + model_identifier）限制每分钟请求数(RPM)和token数(TPM)的令牌桶。
+    桶容量等于每分钟配额，按秒匀速补充；通过BEGIN IMMEDIATE保证多进程下扣减的原子性。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(_CREATE_TABLE_SQL)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def acquire(
+        self,
+        endpoint_key: str,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        tokens: int = 0,
+        timeout: Optional[float] = None
+    ) -> float:
+        """
+        阻塞直到配额足够，扣减1个请求和tokens个token。
+
+        Returns:
+            float: 等待的秒数
+        Raises:
+            TimeoutError: 超过timeout仍未获得配额
+        """
+        if not rpm and not tpm:
+            return 0.0
+        started = time.monotonic()
+        while True:
+            wait_seconds = self._try_acquire(endpoint_key, rpm, tpm, tokens)
+            if wait_seconds <= 0:
+                return time.monotonic() - started
+            if timeout is not None and time.monotonic() - started + wait_seconds > timeout:
+                raise TimeoutError(f"等待端点 {endpoint_key} 的限流配额超时")
+            time.sleep(min(wait_seconds, 1.0))
+
+    def adjust(self, endpoint_key: str, tpm: Optional[int], token_delta: int) -> None:
+        """请求结束后按实际token用量修正桶（token_delta为实际用量减去预估值，可为负数即退还）"""
+        if not tpm or not token_delta:
+            return
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                'UPDATE endpoint_bucket SET token_tokens = MIN(?, token_tokens - ?) WHERE endpoint_key = ?',
+                (float(tpm), float(token_delta), endpoint_key)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def _try_acquire(self, endpoint_key: str, rpm: Optional[int], tpm: Optional[int], tokens: int) -> float:
+        """尝试扣减配额，成功返回0，否则返回建议的等待秒数"""
+        now = time.time()
+        request_capacity = float(rpm) if rpm else None
+        token_capacity = float(tpm) if tpm else None
+        # 单次请求超过桶容量时，按满桶放行，避免永远等待
+        token_cost = min(float(tokens), token_capacity) if token_capacity else 0.0
+
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT request_tokens, token_tokens, updated_at FROM endpoint_bucket WHERE endpoint_key = ?',
+                (endpoint_key,)
+            ).fetchone()
+            if row is None:
+                request_tokens = request_capacity or 0.0
+                token_tokens = token_capacity or 0.0
+            else:
+                elapsed = max(0.0, now - row[2])
+                request_tokens = min(request_capacity, row[0] + elapsed * request_capacity / 60.0) if request_capacity else 0.0
+                token_tokens = min(token_capacity, row[1] + elapsed * token_capacity / 60.0) if token_capacity else 0.0
+
+            wait_seconds = 0.0
+            if request_capacity and request_tokens < 1.0:
+                wait_seconds = max(wait_seconds, (1.0 - request_tokens) * 60.0 / request_capacity)
+            if token_capacity and token_tokens < token_cost:
+                wait_seconds = max(wait_seconds, (token_cost - token_tokens) * 60.0 / token_capacity)
+
+            if wait_seconds <= 0:
+                if request_capacity:
+                    request_tokens -= 1.0
+                if token_capacity:
+                    token_tokens -= token_cost
+
+            conn.execute(
+                'INSERT OR REPLACE INTO endpoint_bucket (endpoint_key, request_tokens, token_tokens, updated_at) '
+                'VALUES (?, ?, ?, ?)',
+                (endpoint_key, request_tokens, token_tokens, now)
+            )
+            conn.execute('COMMIT')
+            return wait_seconds
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+
+def get_rate_limiter(db_path: str) -> SharedRateLimiter:
+    limiter = _limiters.get(db_path)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(db_path)
+            if limiter is None:
+                limiter = SharedRateLimiter(db_path)
+                _limiters[db_path] = limiter
+    return limiter
@@ -97,10 +97,16 @@ def init_database():
         
         app = create_app()
         with app.app_context():
-            # 创建所有表
-            print("正在创建数据库表...")
-            db.create_all()
-            print("数据库表创建完成")
+            # 新库建表，已有的库执行migrations中的迁移升级到最新结构
+            print("正在创建或升级数据库表...")
+            from app.models import upgrade_database_schema
+            upgrade_database_schema()
+            print("数据库表结构已是最新版本")
+
+            # 详细结果的全文索引（已存在时跳过）
+            from app.services.result_search_service import ResultSearchService
+            if ResultSearchService.ensure_fulltext_index():
+                print("详细结果全文索引已就绪")
             
             # 验证表是否创建成功
             from sqlalchemy import text
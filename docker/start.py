@@ -21,12 +21,20 @@ def main():
     # 初始化数据库
     run_command("python /app/init_database.py", "初始化数据库")
     
+    # 启动独立的评估工作进程池，Web进程只负责入队和查询状态
+    print("启动评估工作进程...")
+    subprocess.Popen([sys.executable, "/app/eval_worker.py"])
+    os.environ["EVAL_WORKERS_ENABLED"] = "False"
+
     # 启动Flask应用
     print("启动Flask应用...")
     os.execvp("gunicorn", [
         "gunicorn",
         "--bind", "0.0.0.0:5000",
         "--workers", "4", 
+        # 进度推送使用长连接，线程型worker避免每个查看者独占一个worker进程
+        "--worker-class", "gthread",
+        "--threads", "16",
         "--timeout", "120",
         "run:app"
     ])
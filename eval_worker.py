@@ -0,0 +1,32 @@
+import logging  # 添加logging模块导入
+import argparse  # 添加命令行参数解析
+import os
+
+# 作业只在独立工作进程中执行，不再启动进程内的工作线程（需在导入app配置之前设置）
+os.environ['EVAL_WORKERS_ENABLED'] = 'False'
+
+from app import create_app
+
+# 配置根日志级别为INFO
+logging.basicConfig(level=logging.INFO)
+
+if __name__ == '__main__':
+    from app.services.evaluation_process_pool import EvaluationProcessPool
+
+    app = create_app()
+
+    parser = argparse.ArgumentParser(description='运行独立的评估工作进程池')
+    parser.add_argument('--processes', type=int, default=app.config.get('EVAL_WORKER_PROCESSES', 2),
+                        help='评估工作进程数')
+    parser.add_argument('--max-jobs', type=int, default=app.config.get('EVAL_WORKER_MAX_JOBS_PER_PROCESS', 10),
+                        help='每个工作进程执行多少个作业后重启')
+    args = parser.parse_args()
+
+    print(f"🚀 启动评估工作进程池: {args.processes} 个进程，每个进程最多执行 {args.max_jobs} 个作业")
+    pool = EvaluationProcessPool(
+        app,
+        process_count=max(1, args.processes),
+        max_jobs_per_process=max(1, args.max_jobs),
+        status_file=app.config['EVAL_WORKER_STATUS_FILE']
+    )
+    pool.run()
@@ -0,0 +1,40 @@
+"""add judge_cache table
+
+Revision ID: 0511ed84b9fe
+Revises: 5c997d37ded2
+Create Date: 2026-10-18 20:02:12.287251
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0511ed84b9fe'
+down_revision = '5c997d37ded2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('judge_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('judge_model_identifier', sa.String(length=200), nullable=True),
+        sa.Column('verdict', sa.Text(), nullable=False),
+        sa.Column('hit_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_hit_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('judge_cache', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_judge_cache_cache_key'), ['cache_key'], unique=True)
+        batch_op.create_index(batch_op.f('ix_judge_cache_last_hit_at'), ['last_hit_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('judge_cache', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_judge_cache_last_hit_at'))
+        batch_op.drop_index(batch_op.f('ix_judge_cache_cache_key'))
+
+    op.drop_table('judge_cache')
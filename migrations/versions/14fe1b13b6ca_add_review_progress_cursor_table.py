@@ -0,0 +1,41 @@
+"""add review_progress_cursor table
+
+Revision ID: 14fe1b13b6ca
+Revises: 98d81d771f63
+Create Date: 2026-10-18 20:02:12.390823
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '14fe1b13b6ca'
+down_revision = '98d81d771f63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('review_progress_cursor',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('evaluation_id', sa.Integer(), nullable=False),
+        sa.Column('file_key', sa.String(length=64), nullable=False),
+        sa.Column('file_path', sa.String(length=1000), nullable=False),
+        sa.Column('inode', sa.BigInteger(), nullable=False),
+        sa.Column('byte_offset', sa.BigInteger(), nullable=False),
+        sa.Column('line_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['evaluation_id'], ['evaluation_effectiveness.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('evaluation_id', 'file_key', name='uq_review_progress_cursor_file')
+    )
+    with op.batch_alter_table('review_progress_cursor', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_review_progress_cursor_evaluation_id'), ['evaluation_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('review_progress_cursor', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_review_progress_cursor_evaluation_id'))
+
+    op.drop_table('review_progress_cursor')
@@ -0,0 +1,51 @@
+"""add matrix evaluation
+
+Revision ID: 21423ea83575
+Revises: da1920fb1436
+Create Date: 2026-10-18 20:02:12.328331
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '21423ea83575'
+down_revision = 'da1920fb1436'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('matrix_evaluation',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=150), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('comparison', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('matrix_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_evaluation_effectiveness_matrix_id'), ['matrix_id'], unique=False)
+        batch_op.create_foreign_key('fk_evaluation_effectiveness_matrix_id', 'matrix_evaluation', ['matrix_id'], ['id'])
+
+    with op.batch_alter_table('evaluation_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('matrix_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_evaluation_job_matrix_id', 'matrix_evaluation', ['matrix_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('evaluation_job', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_evaluation_job_matrix_id', type_='foreignkey')
+        batch_op.drop_column('matrix_id')
+
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_evaluation_effectiveness_matrix_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_evaluation_effectiveness_matrix_id'))
+        batch_op.drop_column('matrix_id')
+
+    op.drop_table('matrix_evaluation')
@@ -0,0 +1,27 @@
+"""baseline schema created by db.create_all
+
+在引入迁移之前，数据库表结构全部由 db.create_all() 创建，本版本即对应这一结构，不做任何修改。
+已部署的数据库没有版本记录，初始化时先标记为本版本，再执行后续迁移。
+
+Revision ID: 2ee3e22aabbc
+Revises: 
+Create Date: 2026-10-18 20:02:12.255347
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2ee3e22aabbc'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    pass
+
+
+def downgrade():
+    pass
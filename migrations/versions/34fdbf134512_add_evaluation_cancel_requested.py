@@ -0,0 +1,26 @@
+"""add evaluation cancel_requested
+
+Revision ID: 34fdbf134512
+Revises: e740c6ea965b
+Create Date: 2026-10-18 20:02:12.358605
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '34fdbf134512'
+down_revision = 'e740c6ea965b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cancel_requested', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.drop_column('cancel_requested')
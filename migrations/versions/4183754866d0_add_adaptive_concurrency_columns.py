@@ -0,0 +1,28 @@
+"""add adaptive concurrency columns
+
+Revision ID: 4183754866d0
+Revises: 0511ed84b9fe
+Create Date: 2026-10-18 20:02:12.295718
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4183754866d0'
+down_revision = '0511ed84b9fe'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('adaptive_concurrency', sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.add_column(sa.Column('concurrency_history', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.drop_column('concurrency_history')
+        batch_op.drop_column('adaptive_concurrency')
@@ -0,0 +1,36 @@
+"""add evaluation and job priority
+
+Revision ID: 510d1319137e
+Revises: 34fdbf134512
+Create Date: 2026-10-18 20:02:12.368059
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '510d1319137e'
+down_revision = '34fdbf134512'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('priority', sa.String(length=20), nullable=False, server_default='normal'))
+
+    with op.batch_alter_table('evaluation_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('priority', sa.String(length=20), nullable=False, server_default='normal'))
+        batch_op.add_column(sa.Column('preempt_requested', sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.create_index(batch_op.f('ix_evaluation_job_priority'), ['priority'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('evaluation_job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_evaluation_job_priority'))
+        batch_op.drop_column('preempt_requested')
+        batch_op.drop_column('priority')
+
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.drop_column('priority')
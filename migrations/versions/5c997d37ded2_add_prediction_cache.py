@@ -0,0 +1,48 @@
+"""add prediction cache
+
+Revision ID: 5c997d37ded2
+Revises: 902a964135dd
+Create Date: 2026-10-18 20:02:12.279630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c997d37ded2'
+down_revision = '902a964135dd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('prediction_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('model_identifier', sa.String(length=200), nullable=True),
+        sa.Column('response', sa.JSON(), nullable=False),
+        sa.Column('hit_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_hit_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('prediction_cache', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_prediction_cache_cache_key'), ['cache_key'], unique=True)
+        batch_op.create_index(batch_op.f('ix_prediction_cache_last_hit_at'), ['last_hit_at'], unique=False)
+
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('use_prediction_cache', sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.add_column(sa.Column('cache_stats', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.drop_column('cache_stats')
+        batch_op.drop_column('use_prediction_cache')
+
+    with op.batch_alter_table('prediction_cache', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_prediction_cache_last_hit_at'))
+        batch_op.drop_index(batch_op.f('ix_prediction_cache_cache_key'))
+
+    op.drop_table('prediction_cache')
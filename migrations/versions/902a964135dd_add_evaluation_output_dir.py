@@ -0,0 +1,26 @@
+"""add evaluation output_dir
+
+Revision ID: 902a964135dd
+Revises: acb751072ac9
+Create Date: 2026-10-18 20:02:12.271638
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '902a964135dd'
+down_revision = 'acb751072ac9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('output_dir', sa.String(length=500), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.drop_column('output_dir')
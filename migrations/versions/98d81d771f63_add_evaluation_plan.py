@@ -0,0 +1,26 @@
+"""add evaluation plan
+
+Revision ID: 98d81d771f63
+Revises: 510d1319137e
+Create Date: 2026-10-18 20:02:12.379062
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '98d81d771f63'
+down_revision = '510d1319137e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('plan', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.drop_column('plan')
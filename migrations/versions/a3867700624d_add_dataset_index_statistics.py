@@ -0,0 +1,30 @@
+"""add dataset index statistics
+
+Revision ID: a3867700624d
+Revises: 14fe1b13b6ca
+Create Date: 2026-10-18 20:02:12.402556
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3867700624d'
+down_revision = '14fe1b13b6ca'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('dataset', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('row_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('field_stats', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('indexed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('dataset', schema=None) as batch_op:
+        batch_op.drop_column('indexed_at')
+        batch_op.drop_column('field_stats')
+        batch_op.drop_column('row_count')
@@ -0,0 +1,28 @@
+"""add endpoint rate limit columns
+
+Revision ID: ab4e62466bdf
+Revises: 4183754866d0
+Create Date: 2026-10-18 20:02:12.305740
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ab4e62466bdf'
+down_revision = '4183754866d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('model', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rate_limit_rpm', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('rate_limit_tpm', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('model', schema=None) as batch_op:
+        batch_op.drop_column('rate_limit_tpm')
+        batch_op.drop_column('rate_limit_rpm')
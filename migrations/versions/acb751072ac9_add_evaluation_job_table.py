@@ -0,0 +1,48 @@
+"""add evaluation_job table
+
+Revision ID: acb751072ac9
+Revises: 2ee3e22aabbc
+Create Date: 2026-10-18 20:02:12.264474
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'acb751072ac9'
+down_revision = '2ee3e22aabbc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('evaluation_job',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('evaluation_id', sa.Integer(), nullable=False),
+        sa.Column('endpoint_key', sa.String(length=400), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('worker_id', sa.String(length=100), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('claimed_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['evaluation_id'], ['evaluation_effectiveness.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('evaluation_job', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_evaluation_job_endpoint_key'), ['endpoint_key'], unique=False)
+        batch_op.create_index(batch_op.f('ix_evaluation_job_evaluation_id'), ['evaluation_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_evaluation_job_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('evaluation_job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_evaluation_job_status'))
+        batch_op.drop_index(batch_op.f('ix_evaluation_job_evaluation_id'))
+        batch_op.drop_index(batch_op.f('ix_evaluation_job_endpoint_key'))
+
+    op.drop_table('evaluation_job')
@@ -0,0 +1,28 @@
+"""add result keyset pagination indexes
+
+Revision ID: ae3d9e8e68e8
+Revises: cdd6973e2eb5
+Create Date: 2026-10-18 20:02:12.428882
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ae3d9e8e68e8'
+down_revision = 'cdd6973e2eb5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('evaluation_effectiveness_result', schema=None) as batch_op:
+        batch_op.create_index('idx_eval_result_evaluation_id', ['evaluation_id', 'id'], unique=False)
+        batch_op.create_index('idx_eval_result_evaluation_score', ['evaluation_id', 'score', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('evaluation_effectiveness_result', schema=None) as batch_op:
+        batch_op.drop_index('idx_eval_result_evaluation_score')
+        batch_op.drop_index('idx_eval_result_evaluation_id')
@@ -0,0 +1,28 @@
+"""add early stopping columns
+
+Revision ID: cc0bf1fcff21
+Revises: 21423ea83575
+Create Date: 2026-10-18 20:02:12.338129
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cc0bf1fcff21'
+down_revision = '21423ea83575'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('early_stop_margin', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('early_stop_confidence', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.drop_column('early_stop_confidence')
+        batch_op.drop_column('early_stop_margin')
@@ -0,0 +1,28 @@
+"""add stored prompt columns to results
+
+Revision ID: cdd6973e2eb5
+Revises: a3867700624d
+Create Date: 2026-10-18 20:02:12.415821
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cdd6973e2eb5'
+down_revision = 'a3867700624d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('evaluation_effectiveness_result', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('raw_input_json', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('rendered_prompt', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('evaluation_effectiveness_result', schema=None) as batch_op:
+        batch_op.drop_column('rendered_prompt')
+        batch_op.drop_column('raw_input_json')
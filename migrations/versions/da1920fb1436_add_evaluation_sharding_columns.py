@@ -0,0 +1,44 @@
+"""add evaluation sharding columns
+
+Revision ID: da1920fb1436
+Revises: ab4e62466bdf
+Create Date: 2026-10-18 20:02:12.318974
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'da1920fb1436'
+down_revision = 'ab4e62466bdf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('shard_count', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('evaluation_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('shard_index', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('shard_dataset_ids', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('shard_subsets', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('shard_result', sa.JSON(), nullable=True))
+
+    with op.batch_alter_table('evaluation_effectiveness_result', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('shard_index', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('evaluation_effectiveness_result', schema=None) as batch_op:
+        batch_op.drop_column('shard_index')
+
+    with op.batch_alter_table('evaluation_job', schema=None) as batch_op:
+        batch_op.drop_column('shard_result')
+        batch_op.drop_column('shard_subsets')
+        batch_op.drop_column('shard_dataset_ids')
+        batch_op.drop_column('shard_index')
+
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.drop_column('shard_count')
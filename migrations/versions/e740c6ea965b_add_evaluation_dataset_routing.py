@@ -0,0 +1,26 @@
+"""add evaluation dataset_routing
+
+Revision ID: e740c6ea965b
+Revises: cc0bf1fcff21
+Create Date: 2026-10-18 20:02:12.352101
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e740c6ea965b'
+down_revision = 'cc0bf1fcff21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('dataset_routing', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('evaluation_effectiveness', schema=None) as batch_op:
+        batch_op.drop_column('dataset_routing')
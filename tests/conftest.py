@@ -0,0 +1,84 @@
+# 测试公共夹具：使用内存SQLite数据库和临时数据目录创建应用
+import os
+import sys
+import tempfile
+
+# 数据和日志目录在导入app.config之前指定，避免写入仓库目录
+_TEST_DATA_DIR = tempfile.mkdtemp(prefix='llm_eval_test_')
+os.environ.setdefault('DATA_UPLOADS_DIR', os.path.join(_TEST_DATA_DIR, 'uploads'))
+os.environ.setdefault('DATA_OUTPUTS_DIR', os.path.join(_TEST_DATA_DIR, 'outputs'))
+os.environ.setdefault('LOG_DIR', os.path.join(_TEST_DATA_DIR, 'logs'))
+os.environ['FLASK_ENV'] = 'testing'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy.dialects.mysql import LONGTEXT
+from sqlalchemy.ext.compiler import compiles
+
+from app import create_app, db
+# 与应用启动时一样先加载服务层，测试直接导入adapter模块时不会触发循环导入
+from app import services  # noqa: F401
+
+
+@compiles(LONGTEXT, 'sqlite')
+def _compile_longtext_for_sqlite(type_, compiler, **kw):
+    # 模型中的MySQL LONGTEXT列在SQLite上建为TEXT
+    return 'TEXT'
+
+
+@pytest.fixture(scope='session')
+def app():
+    return create_app('testing')
+
+
+@pytest.fixture
+def app_context(app):
+    """每个测试使用一份空的数据库"""
+    with app.app_context():
+        db.create_all()
+        try:
+            yield app
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+@pytest.fixture
+def make_user(app_context):
+    from app.models import User
+
+    def _make_user(username=None):
+        user = User(username=username or f'user{User.query.count() + 1}')
+        user.set_password('password')
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return _make_user
+
+
+@pytest.fixture
+def make_model(app_context):
+    from app.models import AIModel
+
+    def _make_model(api_base_url='http://model.test/v1', model_identifier='test-model', **fields):
+        model = AIModel(display_name=model_identifier, api_base_url=api_base_url,
+                        model_identifier=model_identifier, **fields)
+        db.session.add(model)
+        db.session.commit()
+        return model
+    return _make_model
+
+
+@pytest.fixture
+def make_evaluation(app_context, make_user, make_model):
+    from app.models import ModelEvaluation
+
+    def _make_evaluation(user=None, model=None, **fields):
+        user = user or make_user()
+        model = model or make_model()
+        evaluation = ModelEvaluation(user_id=user.id, model_id=model.id, **fields)
+        db.session.add(evaluation)
+        db.session.commit()
+        return evaluation
+    return _make_evaluation
@@ -0,0 +1,81 @@
+import pytest
+
+from app.utils.adaptive_concurrency import AdaptiveConcurrencyLimiter, is_overload_error
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f'HTTP {status_code}')
+        self.status_code = status_code
+
+
+def test_overload_errors_are_recognised():
+    assert is_overload_error(_StatusError(429))
+    assert is_overload_error(_StatusError(503))
+    assert not is_overload_error(_StatusError(400))
+    assert not is_overload_error(ValueError('bad answer'))
+
+
+def test_limit_grows_additively_on_fast_successes():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4)
+
+    # 每完成约limit个请求加1（2 -> 2.5 -> 2.9 -> 3.24）
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(latency=0.1)
+    assert limiter.limit == 3
+
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(latency=0.1)
+    assert limiter.limit == 4
+
+
+def test_slow_responses_do_not_grow_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, latency_tolerance=2.0)
+    limiter.acquire()
+    limiter.release(latency=0.1)
+    before = limiter._limit
+
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(latency=1.0)
+
+    assert limiter._limit == before
+
+
+def test_overload_halves_limit_once_per_cooldown():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=16, cooldown_seconds=60)
+
+    for _ in range(3):
+        with pytest.raises(_StatusError):
+            with limiter.slot():
+                raise _StatusError(429)
+
+    assert limiter.limit == 8
+    assert limiter.overload_count == 3
+    summary = limiter.summary()
+    assert summary['final'] == 8
+    assert summary['recommended'] == 12  # 回退点16的3/4
+    assert summary['history'][0][1] == 16 and summary['history'][-1][1] == 8
+
+
+def test_limit_never_drops_below_minimum():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=1, cooldown_seconds=0)
+
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(overloaded=True)
+
+    assert limiter.limit == 1
+
+
+def test_non_overload_errors_release_without_backoff():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+
+    with pytest.raises(ValueError):
+        with limiter.slot():
+            raise ValueError('bad answer')
+
+    assert limiter.limit == 4
+    assert limiter._in_flight == 0
@@ -0,0 +1,46 @@
+from app import db
+from app.models import Dataset
+from app.services.evaluation_service import EvaluationService
+from app.services.review_ingestion_service import DatasetRouting
+
+
+def test_exact_routes_map_review_file_to_dataset():
+    routing = DatasetRouting({'general_qa/arith': 1, 'general_qa/logic': 2, 'general_mcq/arith': 3})
+
+    assert routing.resolve('general_qa_arith') == 1
+    assert routing.resolve('general_qa_logic') == 2
+    assert routing.resolve('general_mcq_arith') == 3
+    assert routing.resolve('general_qa_unknown') is None
+
+
+def test_wildcard_routes_prefer_longest_benchmark_name():
+    routing = DatasetRouting({'mmlu/*': 1, 'mmlu_pro/*': 2, 'mmlu/anatomy': 3})
+
+    assert routing.resolve('mmlu_anatomy') == 3
+    assert routing.resolve('mmlu_astronomy') == 1
+    assert routing.resolve('mmlu_pro_law') == 2
+    assert routing.resolve('ceval_law') is None
+
+
+def test_empty_routing_resolves_nothing():
+    assert DatasetRouting(None).resolve('general_qa_arith') is None
+
+
+def test_routing_table_for_uploaded_datasets(app_context):
+    datasets = [
+        Dataset(name='arith', dataset_type='自建', format='QA', download_url='/data/uploads/arith.jsonl'),
+        Dataset(name='choice', dataset_type='自建', format='MCQ', download_url='/data/uploads/choice.csv'),
+        Dataset(name='custom', dataset_type='自建', format='CUSTOM', download_url='/data/uploads/custom.jsonl'),
+    ]
+    db.session.add_all(datasets)
+    db.session.commit()
+
+    routes = EvaluationService._build_dataset_routing(datasets)
+
+    assert routes == {
+        'general_qa/arith': datasets[0].id,
+        'general_mcq/choice': datasets[1].id,
+        f'custom_dataset_{datasets[2].id}/custom': datasets[2].id,
+    }
+    routing = DatasetRouting(routes)
+    assert routing.resolve(f'custom_dataset_{datasets[2].id}_custom') == datasets[2].id
@@ -0,0 +1,89 @@
+from collections import Counter
+
+import pytest
+
+from app.utils.early_stopping import EarlyStopping, RunningConfidenceInterval, review_result_to_score, stratified_order
+
+
+def _interval(values, confidence=0.95, population=None):
+    interval = RunningConfidenceInterval(confidence, population)
+    for value in values:
+        interval.add(value)
+    return interval
+
+
+def test_binary_scores_use_wilson_interval():
+    low, high = _interval([1.0] * 5 + [0.0] * 5).interval()
+
+    # 10个样本、正确率50%的95% Wilson区间
+    assert low == pytest.approx(0.2366, abs=1e-4)
+    assert high == pytest.approx(0.7634, abs=1e-4)
+
+
+def test_wilson_interval_stays_inside_unit_range_at_extremes():
+    stats = _interval([1.0] * 20).to_dict()
+
+    assert stats['mean'] == 1.0
+    assert stats['ci_high'] == 1.0
+    assert 0.8 < stats['ci_low'] < 1.0
+
+
+def test_fractional_scores_use_normal_interval():
+    values = [0.2, 0.4, 0.6, 0.8] * 5
+    interval = _interval(values)
+
+    # 样本标准差 0.2294，n=20
+    assert interval.mean == pytest.approx(0.5)
+    assert interval.half_width() == pytest.approx(1.959964 * 0.229416 / 20 ** 0.5, rel=1e-4)
+
+
+def test_single_fractional_score_has_unbounded_interval():
+    assert _interval([0.5]).half_width() == float('inf')
+    assert _interval([0.5]).to_dict()['half_width'] is None
+
+
+def test_finite_population_correction_shrinks_interval():
+    values = [1.0, 0.0] * 20
+    unbounded = _interval(values).half_width()
+
+    assert _interval(values, population=80).half_width() < unbounded
+    # 整个总体都已评估时区间宽度为0
+    assert _interval(values, population=40).half_width() == pytest.approx(0.0)
+
+
+def test_should_stop_requires_min_samples_and_margin():
+    early_stopping = EarlyStopping(margin=0.2, min_samples=30)
+
+    assert not early_stopping.should_stop(_interval([1.0, 0.0] * 10))
+    assert early_stopping.should_stop(_interval([1.0, 0.0] * 15))
+    assert not EarlyStopping(margin=0.05, min_samples=30).should_stop(_interval([1.0, 0.0] * 15))
+
+
+def test_record_marks_early_stop():
+    early_stopping = EarlyStopping(margin=0.2, min_samples=10)
+    interval = _interval([1.0, 0.0] * 15, population=100)
+
+    early_stopping.record('gsm8k', interval, {'main': 30})
+
+    assert early_stopping.results['gsm8k']['stopped_early'] is True
+    assert early_stopping.results['gsm8k']['subset_samples'] == {'main': 30}
+
+
+def test_stratified_order_keeps_subset_proportions_in_every_prefix():
+    prompts = {'large': [{'i': i} for i in range(300)], 'small': [{'i': i} for i in range(100)]}
+
+    order = stratified_order(prompts, seed=7)
+
+    assert len(order) == 400
+    for prefix_length in (40, 100, 200):
+        counts = Counter(subset for subset, _ in order[:prefix_length])
+        assert counts['small'] == pytest.approx(prefix_length / 4, abs=2)
+    assert stratified_order(prompts, seed=7) == order
+
+
+def test_review_result_to_score_for_intent_and_slots():
+    assert review_result_to_score(True) == 1.0
+    assert review_result_to_score({
+        'intent_result': True,
+        'slots_result': {'correct_count': 1, 'miss_count': 1, 'fail_count': 0},
+    }) == pytest.approx(0.5 + 0.5 * (2 / 3))
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+from app import db
+from app.models import Dataset, EvaluationJob, ModelEvaluation
+from app.services.dataset_index_service import DatasetIndexService
+from app.services.evaluation_queue_service import EvaluationQueueService
+from app.services.evaluation_service import EvaluationService
+
+
+def _make_qa_dataset(directory, name, rows):
+    file_path = directory / f'{name}.jsonl'
+    file_path.write_text(''.join(
+        json.dumps({'query': f'{i}+1=?', 'response': str(i + 1)}) + '\n' for i in range(rows)
+    ), encoding='utf-8')
+    DatasetIndexService.build_index(str(file_path))
+    dataset = Dataset(name=name, dataset_type='自建', format='QA', download_url=str(file_path))
+    db.session.add(dataset)
+    db.session.commit()
+    return dataset
+
+
+@pytest.fixture
+def qa_dataset(app_context, tmp_path):
+    return _make_qa_dataset(tmp_path, 'arith', 5)
+
+
+def test_create_evaluation_only_persists_and_enqueues(make_user, make_model, qa_dataset, monkeypatch):
+    def fail_if_called(*args, **kwargs):
+        raise AssertionError("创建评估的请求中不应加载数据集")
+
+    monkeypatch.setattr(EvaluationService, '_build_evaluation_plan', staticmethod(fail_if_called))
+    user, model = make_user(), make_model()
+
+    evaluation = EvaluationService.create_evaluation(
+        user_id=user.id, model_id=model.id, judge_model_id=None,
+        datasets=[{'dataset_id': qa_dataset.id}], temperature=0, max_tokens=64
+    )
+
+    assert evaluation is not None
+    assert evaluation.plan is None
+    assert EvaluationJob.query.filter_by(evaluation_id=evaluation.id, status='pending').count() == 1
+
+
+def test_plan_is_computed_once_in_worker(make_user, make_model, qa_dataset):
+    user, model = make_user(), make_model()
+    evaluation = EvaluationService.create_evaluation(
+        user_id=user.id, model_id=model.id, judge_model_id=None,
+        datasets=[{'dataset_id': qa_dataset.id}], temperature=0, max_tokens=64, limit=3
+    )
+
+    EvaluationService._ensure_evaluation_plan(evaluation)
+
+    plan = ModelEvaluation.query.get(evaluation.id).plan
+    assert plan['total_prompts'] == 3
+    assert plan['datasets'][str(qa_dataset.id)]['subsets'] == {'arith': 3}
+
+
+def test_planning_job_splits_evaluation_into_shards(app, make_user, make_model, qa_dataset, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVAL_MAX_SHARDS_PER_EVALUATION', 2)
+    logic_dataset = _make_qa_dataset(tmp_path, 'logic', 8)
+    user, model = make_user(), make_model()
+    evaluation = EvaluationService.create_evaluation(
+        user_id=user.id, model_id=model.id, judge_model_id=None,
+        datasets=[{'dataset_id': qa_dataset.id}, {'dataset_id': logic_dataset.id}], temperature=0, max_tokens=64
+    )
+    planning_job = EvaluationQueueService.claim_next_job('worker-1')
+
+    assert EvaluationQueueService.run_job(app, planning_job.id, 'worker-1') == 'completed'
+
+    evaluation = ModelEvaluation.query.get(evaluation.id)
+    assert evaluation.plan['total_prompts'] == 13
+    assert evaluation.shard_count == 2
+    shard_jobs = EvaluationJob.query.filter(EvaluationJob.shard_index.isnot(None)).order_by(EvaluationJob.shard_index).all()
+    # 按计划中的样本数拆分：logic的前7个样本一个分片，arith和logic剩余的1个样本一个分片
+    assert [(job.status, job.shard_subsets) for job in shard_jobs] == [
+        ('pending', {str(qa_dataset.id): None, str(logic_dataset.id): {'logic': [7, 8]}}),
+        ('pending', {str(logic_dataset.id): {'logic': [0, 7]}}),
+    ]
+    # 计划在分片开始之前就已算出，进度有总数
+    assert EvaluationService.get_evaluation_progress(evaluation.id, user.id)['total_prompts'] == 13
+
+    # 计划作业被回收重试时不会重复拆分
+    assert EvaluationService._split_into_shards(evaluation) is True
+    assert EvaluationJob.query.filter(EvaluationJob.shard_index.isnot(None)).count() == 2
+
+
+def test_single_dataset_is_split_by_sample_range(app, make_user, make_model, qa_dataset, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVAL_MAX_SHARDS_PER_EVALUATION', 2)
+    user, model = make_user(), make_model()
+    evaluation = EvaluationService.create_evaluation(
+        user_id=user.id, model_id=model.id, judge_model_id=None,
+        datasets=[{'dataset_id': qa_dataset.id}], temperature=0, max_tokens=64
+    )
+    EvaluationService._ensure_evaluation_plan(evaluation)
+
+    assert EvaluationService._split_into_shards(evaluation) is True
+    shard_jobs = EvaluationJob.query.filter(EvaluationJob.shard_index.isnot(None)).order_by(EvaluationJob.shard_index).all()
+    assert [job.shard_subsets for job in shard_jobs] == [
+        {str(qa_dataset.id): {'arith': [0, 3]}}, {str(qa_dataset.id): {'arith': [3, 5]}}
+    ]
+
+
+@pytest.mark.parametrize('status', ['completed', 'failed', 'cancelled'])
+def test_progress_of_finished_evaluation_skips_review_scan(make_evaluation, monkeypatch, tmp_path, status):
+    def fail_if_called(*args, **kwargs):
+        raise AssertionError("已结束的评估不应扫描review文件")
+
+    monkeypatch.setattr(EvaluationService, '_calculate_completed_prompts', staticmethod(fail_if_called))
+    (tmp_path / 'run').mkdir()
+    evaluation = make_evaluation(status=status, output_dir=str(tmp_path))
+
+    progress = EvaluationService.get_evaluation_progress(evaluation.id, evaluation.user_id)
+
+    assert progress['status'] == status
+    assert progress['progress_percentage'] == (100.0 if status == 'completed' else 0.0)
@@ -0,0 +1,137 @@
+from datetime import timedelta
+
+from app import db
+from app.models import EvaluationJob, ModelEvaluationResult
+from app.services.evaluation_queue_service import EvaluationQueueService
+from app.utils import get_beijing_time
+
+
+def _enqueue(evaluation, status='pending', **fields):
+    job = EvaluationQueueService.enqueue(evaluation)
+    job.status = status
+    for name, value in fields.items():
+        setattr(job, name, value)
+    db.session.commit()
+    return job
+
+
+def test_fair_share_order_alternates_between_users():
+    # 用户1先入队三个作业，用户2后入队一个，用户2不必等用户1的全部作业
+    candidates = [(1, 'normal', 1), (2, 'normal', 1), (3, 'normal', 1), (4, 'normal', 2)]
+    order = list(EvaluationQueueService._fair_share_order(candidates, active_counts={}, last_claimed={}))
+    assert order == [1, 4, 2, 3]
+
+
+def test_fair_share_order_prefers_higher_priority_and_idle_users():
+    candidates = [(1, 'batch', 1), (2, 'normal', 2), (3, 'interactive', 3)]
+    order = list(EvaluationQueueService._fair_share_order(candidates, active_counts={}, last_claimed={}))
+    assert order == [3, 2, 1]
+
+    # 已有运行中作业的用户让位给空闲用户
+    candidates = [(1, 'normal', 1), (2, 'normal', 2)]
+    order = list(EvaluationQueueService._fair_share_order(candidates, active_counts={1: 1}, last_claimed={}))
+    assert order == [2, 1]
+
+
+def test_fair_share_order_within_user_runs_higher_priority_first():
+    candidates = [(1, 'batch', 1), (2, 'interactive', 1)]
+    assert list(EvaluationQueueService._fair_share_order(candidates, active_counts={}, last_claimed={})) == [2, 1]
+
+
+def test_claim_respects_endpoint_limit_and_fair_share(app, make_user, make_model, make_evaluation, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVAL_MAX_RUNNING_JOBS', 4)
+    monkeypatch.setitem(app.config, 'EVAL_MAX_JOBS_PER_ENDPOINT', 1)
+    alice, bob = make_user('alice'), make_user('bob')
+    shared_model = make_model(model_identifier='shared')
+    other_model = make_model(model_identifier='other')
+    alice_first = _enqueue(make_evaluation(user=alice, model=shared_model))
+    _enqueue(make_evaluation(user=alice, model=shared_model))
+    bob_job = _enqueue(make_evaluation(user=bob, model=other_model))
+
+    assert EvaluationQueueService.claim_next_job('worker-1').id == alice_first.id
+    # alice的第二个作业与第一个共用端点，端点名额已满
+    assert EvaluationQueueService.claim_next_job('worker-2').id == bob_job.id
+    assert EvaluationQueueService.claim_next_job('worker-3') is None
+
+
+def test_waiting_interactive_job_preempts_running_batch_job(app, make_user, make_model, make_evaluation, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVAL_MAX_JOBS_PER_ENDPOINT', 1)
+    monkeypatch.setitem(app.config, 'EVAL_PREEMPTION_ENABLED', True)
+    model = make_model()
+    batch_evaluation = make_evaluation(model=model, priority='batch', status='running')
+    batch_job = _enqueue(batch_evaluation, status='running', attempts=1, started_at=get_beijing_time(),
+                         lease_expires_at=get_beijing_time() + timedelta(minutes=2))
+    _enqueue(make_evaluation(model=model, priority='interactive'))
+
+    assert EvaluationQueueService.claim_next_job('worker-1') is None
+    assert EvaluationJob.query.get(batch_job.id).preempt_requested is True
+
+    EvaluationQueueService.requeue_preempted(batch_job.id)
+    requeued = EvaluationJob.query.get(batch_job.id)
+    assert requeued.status == 'pending'
+    assert requeued.attempts == 0
+    assert batch_evaluation.status == 'pending'
+
+
+def test_queue_estimates_account_for_running_jobs(app, make_evaluation, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVAL_MAX_RUNNING_JOBS', 1)
+    monkeypatch.setitem(app.config, 'EVAL_DEFAULT_JOB_SECONDS', 600)
+    running = make_evaluation(status='running')
+    _enqueue(running, status='running', started_at=get_beijing_time() - timedelta(seconds=200))
+    waiting = make_evaluation()
+    _enqueue(waiting)
+
+    estimates = EvaluationQueueService.get_queue_estimates([waiting.id])
+
+    assert estimates[waiting.id]['position'] == 1
+    # 唯一的运行名额约400秒后空出
+    wait_seconds = (estimates[waiting.id]['estimated_start'] - get_beijing_time().replace(tzinfo=None)).total_seconds()
+    assert 390 <= wait_seconds <= 400
+
+
+def test_expired_lease_is_requeued_with_partial_results_removed(app, make_evaluation, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVAL_JOB_MAX_ATTEMPTS', 3)
+    evaluation = make_evaluation(status='running')
+    job = _enqueue(evaluation, status='running', attempts=1, worker_id='crashed-worker',
+                   lease_expires_at=get_beijing_time() - timedelta(seconds=1))
+    db.session.add(ModelEvaluationResult(evaluation_id=evaluation.id, dataset_id=1, question='q', model_answer='a'))
+    db.session.commit()
+
+    assert EvaluationQueueService.reclaim_expired_jobs() == 1
+
+    reclaimed = EvaluationJob.query.get(job.id)
+    assert reclaimed.status == 'pending'
+    assert reclaimed.worker_id is None
+    assert evaluation.status == 'pending'
+    assert ModelEvaluationResult.query.filter_by(evaluation_id=evaluation.id).count() == 0
+
+
+def test_expired_lease_fails_job_after_max_attempts(app, make_evaluation, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVAL_JOB_MAX_ATTEMPTS', 2)
+    evaluation = make_evaluation(status='running')
+    job = _enqueue(evaluation, status='running', attempts=2, lease_expires_at=get_beijing_time() - timedelta(seconds=1))
+
+    EvaluationQueueService.reclaim_expired_jobs()
+
+    assert EvaluationJob.query.get(job.id).status == 'failed'
+    assert evaluation.status == 'failed'
+
+
+def test_live_lease_is_not_reclaimed_and_can_be_renewed(make_evaluation):
+    evaluation = make_evaluation(status='running')
+    job = _enqueue(evaluation, status='running', attempts=1, worker_id='worker-1',
+                   lease_expires_at=get_beijing_time() + timedelta(seconds=30))
+
+    assert EvaluationQueueService.reclaim_expired_jobs() == 0
+    assert EvaluationQueueService.renew_lease(job.id, 'worker-1') is True
+    assert EvaluationQueueService.renew_lease(job.id, 'other-worker') is False
+
+
+def test_claim_stops_at_global_running_limit(app, make_model, make_evaluation, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVAL_MAX_RUNNING_JOBS', 1)
+    monkeypatch.setitem(app.config, 'EVAL_PREEMPTION_ENABLED', False)
+    _enqueue(make_evaluation(model=make_model(model_identifier='a')))
+    _enqueue(make_evaluation(model=make_model(model_identifier='b')))
+
+    assert EvaluationQueueService.claim_next_job('worker-1') is not None
+    assert EvaluationQueueService.claim_next_job('worker-2') is None
@@ -0,0 +1,99 @@
+import pytest
+
+from app import db
+from app.models import Dataset, ModelEvaluationResult
+from app.services.evaluation_service import EvaluationService
+from app.utils.keyset_pagination import iter_batches, offset_page, seek_page
+
+
+@pytest.fixture
+def results(make_evaluation):
+    """一份评估的23条结果，得分在0.0到1.0之间循环"""
+    evaluation = make_evaluation(status='completed')
+    dataset = Dataset(name='arith', dataset_type='自建', format='QA')
+    db.session.add(dataset)
+    db.session.flush()
+    for i in range(23):
+        db.session.add(ModelEvaluationResult(
+            evaluation_id=evaluation.id, dataset_id=dataset.id, question=f'q{i}',
+            rendered_prompt=f'q{i}', model_answer=f'a{i}', score=(i % 5) / 4
+        ))
+    db.session.commit()
+    return evaluation
+
+
+def _query(evaluation):
+    return ModelEvaluationResult.query.filter_by(evaluation_id=evaluation.id)
+
+
+def _ids(rows):
+    return [row.id for row in rows]
+
+
+def _all_ids(evaluation):
+    return _ids(_query(evaluation).order_by(ModelEvaluationResult.id).all())
+
+
+def test_seek_page_walks_forward_and_backward(results):
+    all_ids = _all_ids(results)
+    id_column = ModelEvaluationResult.id
+
+    first = seek_page(_query(results), id_column, 10)
+    second = seek_page(_query(results), id_column, 10, after_id=first[-1].id)
+    back = seek_page(_query(results), id_column, 10, before_id=second[0].id)
+
+    assert _ids(first) == all_ids[:10]
+    assert _ids(second) == all_ids[10:20]
+    assert _ids(back) == all_ids[:10]
+
+
+def test_seek_page_from_end_returns_last_rows_in_ascending_order(results):
+    all_ids = _all_ids(results)
+
+    last = seek_page(_query(results), ModelEvaluationResult.id, 3, from_end=True)
+
+    assert _ids(last) == all_ids[-3:]
+
+
+@pytest.mark.parametrize('offset', [0, 5, 10, 12, 15, 20, 22, 23, 30])
+def test_offset_page_matches_plain_offset_from_either_end(results, offset):
+    all_ids = _all_ids(results)
+    expected = all_ids[offset:offset + 5]
+
+    assert _ids(offset_page(_query(results), ModelEvaluationResult.id, offset, 5)) == expected
+    # 已知总数时后半段从末尾往前数，结果应与从头数一致
+    assert _ids(offset_page(_query(results), ModelEvaluationResult.id, offset, 5, total=23)) == expected
+
+
+def test_iter_batches_covers_every_row_once(results):
+    query = _query(results).filter(ModelEvaluationResult.score >= 0.5)
+    expected = _ids(query.order_by(ModelEvaluationResult.id).all())
+
+    batches = list(iter_batches(query, ModelEvaluationResult.id, 4))
+
+    assert [len(batch) for batch in batches] == [4, 4, 4, 1]
+    assert [row.id for batch in batches for row in batch] == expected
+
+
+def test_get_evaluation_results_pages_match_offset(results):
+    all_ids = _all_ids(results)
+
+    pages = [
+        _ids(EvaluationService.get_evaluation_results(results.id, results.user_id, page=page, per_page=5)[0])
+        for page in range(1, 6)
+    ]
+
+    assert pages == [all_ids[i:i + 5] for i in range(0, 23, 5)]
+
+
+def test_count_results_is_cached_until_results_change(results):
+    query = _query(results)
+    assert EvaluationService.count_results(results, query, None, None) == 23
+
+    db.session.add(ModelEvaluationResult(
+        evaluation_id=results.id, dataset_id=Dataset.query.first().id, question='extra', model_answer='x'
+    ))
+    db.session.commit()
+
+    # 已完成评估的计数以最大结果ID为版本，新增结果后重新计数
+    assert EvaluationService.count_results(results, _query(results), None, None) == 24
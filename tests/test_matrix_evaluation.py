@@ -0,0 +1,87 @@
+import threading
+
+from app import db
+from app.models import EvaluationJob, MatrixEvaluation
+from app.services.evaluation_queue_service import EvaluationQueueService
+from app.services.evaluation_service import EvaluationService
+
+
+def _make_matrix(make_user, make_evaluation, models):
+    user = make_user()
+    matrix = MatrixEvaluation(user_id=user.id, name='matrix', status='pending')
+    db.session.add(matrix)
+    db.session.commit()
+    evaluations = [make_evaluation(user=user, model=model, matrix_id=matrix.id) for model in models]
+    job = EvaluationQueueService.enqueue(evaluations[0], matrix_id=matrix.id)
+    db.session.commit()
+    return matrix, evaluations, job
+
+
+def test_cancelling_one_model_keeps_matrix_job_queued(make_user, make_model, make_evaluation):
+    matrix, evaluations, job = _make_matrix(
+        make_user, make_evaluation, [make_model(model_identifier='a'), make_model(model_identifier='b')]
+    )
+
+    success, _ = EvaluationService.cancel_evaluation(evaluations[0].id, matrix.user_id)
+
+    assert success
+    assert evaluations[0].status == 'cancelled'
+    assert evaluations[1].status == 'pending'
+    assert EvaluationJob.query.get(job.id).status == 'pending'
+    assert MatrixEvaluation.query.get(matrix.id).status == 'pending'
+
+
+def test_cancelling_every_model_cancels_matrix(make_user, make_model, make_evaluation):
+    matrix, evaluations, job = _make_matrix(
+        make_user, make_evaluation, [make_model(model_identifier='a'), make_model(model_identifier='b')]
+    )
+
+    for evaluation in evaluations:
+        EvaluationService.cancel_evaluation(evaluation.id, matrix.user_id)
+
+    assert EvaluationJob.query.get(job.id).status == 'cancelled'
+    assert MatrixEvaluation.query.get(matrix.id).status == 'cancelled'
+
+
+def test_matrix_job_waits_for_every_model_endpoint(app, make_user, make_model, make_evaluation, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVAL_MAX_JOBS_PER_ENDPOINT', 1)
+    first_model, second_model = make_model(model_identifier='a'), make_model(model_identifier='b')
+    busy = make_evaluation(model=second_model, status='running')
+    EvaluationQueueService.enqueue(busy).status = 'running'
+    db.session.commit()
+    _, _, matrix_job = _make_matrix(make_user, make_evaluation, [first_model, second_model])
+
+    # 矩阵作业的第一个模型端点空闲，但第二个模型的端点已被占用
+    assert EvaluationQueueService.claim_next_job('worker-1') is None
+
+    EvaluationJob.query.filter_by(evaluation_id=busy.id).update({'status': 'completed'})
+    db.session.commit()
+    assert EvaluationQueueService.claim_next_job('worker-1').id == matrix_job.id
+    # 运行中的矩阵作业占用其中每个模型的端点
+    other = make_evaluation(model=second_model)
+    EvaluationQueueService.enqueue(other)
+    db.session.commit()
+    assert EvaluationQueueService.claim_next_job('worker-2') is None
+
+
+def test_matrix_runs_models_on_same_endpoint_within_endpoint_limit(app, make_user, make_model, make_evaluation, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVAL_MAX_JOBS_PER_ENDPOINT', 1)
+    monkeypatch.setitem(app.config, 'MATRIX_MAX_PARALLEL_MODELS', 4)
+    shared_model = make_model()
+    matrix, _, _ = _make_matrix(make_user, make_evaluation, [shared_model, shared_model, shared_model])
+
+    lock = threading.Lock()
+    running = {'now': 0, 'max': 0}
+
+    def fake_run(app, evaluation_id, job_id=None, dataset_cache=None):
+        with lock:
+            running['now'] += 1
+            running['max'] = max(running['max'], running['now'])
+        threading.Event().wait(0.05)
+        with lock:
+            running['now'] -= 1
+
+    monkeypatch.setattr(EvaluationService, '_run_evaluation_task', staticmethod(fake_run))
+    EvaluationService._run_matrix_task(app, matrix.id)
+
+    assert running['max'] == 1
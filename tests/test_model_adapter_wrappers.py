@@ -0,0 +1,70 @@
+from app.adapter.cached_model_adapter import CachedModelAdapter
+from app.adapter.cancellable_adapter import CancellableModelAdapter, CancellationToken
+from app.adapter.concurrency_limited_adapter import ConcurrencyLimitedModelAdapter
+from app.adapter.rate_limited_adapter import RateLimitedModelAdapter
+from app.services.prediction_cache_service import CacheCounter
+from app.utils.adaptive_concurrency import AdaptiveConcurrencyLimiter
+from app.utils.rate_limiter import SharedRateLimiter
+
+
+class FakeServerAdapter:
+    """模拟evalscope ServerModelAdapter，记录真正发出的请求"""
+
+    def __init__(self):
+        self.client = None
+        self.sent = []
+
+    def make_request(self, input_item, infer_cfg):
+        return {'model': 'test-model', 'messages': input_item['messages'], **infer_cfg}
+
+    def send_request(self, request_json):
+        self.sent.append(request_json)
+        return {
+            'choices': [{'message': {'role': 'assistant', 'content': f'answer {len(self.sent)}'}}],
+            'usage': {'total_tokens': 12},
+        }
+
+
+def _wrap_like_evaluation_task(server_adapter, app, tmp_path, counter, token):
+    """按_run_evaluation_task中的顺序叠加代理：限流、并发控制、回答缓存、取消检查"""
+    model_adapter = RateLimitedModelAdapter(
+        server_adapter, SharedRateLimiter(str(tmp_path / 'rate_limit.sqlite3')),
+        'http://model.test/v1|test-model', rpm=600, tpm=100000
+    )
+    model_adapter = ConcurrencyLimitedModelAdapter(model_adapter, AdaptiveConcurrencyLimiter(initial_limit=2))
+    model_adapter = CachedModelAdapter(
+        model_adapter, app, api_base_url='http://model.test/v1', model_identifier='test-model',
+        counter=counter, replay=True
+    )
+    return CancellableModelAdapter(model_adapter, token)
+
+
+def test_second_identical_request_hits_cache_through_all_wrappers(app_context, tmp_path):
+    server_adapter = FakeServerAdapter()
+    counter = CacheCounter()
+    model_adapter = _wrap_like_evaluation_task(server_adapter, app_context, tmp_path, counter, CancellationToken())
+    input_item = {'messages': [{'role': 'user', 'content': '1+1等于几？'}]}
+    infer_cfg = {'temperature': 0, 'max_tokens': 16}
+
+    first = model_adapter.predict([input_item], infer_cfg)[0]
+    second = model_adapter.predict([input_item], infer_cfg)[0]
+
+    assert len(server_adapter.sent) == 1
+    assert second == first
+    assert counter.to_dict() == {'hits': 1, 'misses': 1}
+
+
+def test_cache_is_bypassed_when_replay_disabled(app_context, tmp_path):
+    server_adapter = FakeServerAdapter()
+    counter = CacheCounter()
+    model_adapter = CachedModelAdapter(
+        server_adapter, app_context, api_base_url='http://model.test/v1', model_identifier='test-model',
+        counter=counter, replay=False
+    )
+    request_json = {'model': 'test-model', 'messages': [{'role': 'user', 'content': 'hi'}]}
+
+    model_adapter.send_request(request_json)
+    model_adapter.send_request(request_json)
+
+    assert len(server_adapter.sent) == 2
+    assert counter.to_dict() == {'hits': 0, 'misses': 2}
@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import chat_service, model_service
+from app.utils.rate_limiter import SharedRateLimiter, estimate_request_tokens
+
+
+def _bucket(limiter, endpoint_key):
+    conn = limiter._connect()
+    try:
+        return conn.execute(
+            'SELECT request_tokens, token_tokens FROM endpoint_bucket WHERE endpoint_key = ?', (endpoint_key,)
+        ).fetchone()
+    finally:
+        conn.close()
+
+
+def test_bucket_is_shared_between_limiter_instances(tmp_path):
+    db_path = str(tmp_path / 'rate_limit.sqlite3')
+    first, second = SharedRateLimiter(db_path), SharedRateLimiter(db_path)
+
+    first.acquire('endpoint', rpm=2, timeout=0.1)
+    second.acquire('endpoint', rpm=2, timeout=0.1)
+    # 两个实例共用同一个桶，第三个请求要等约30秒才补充出1个请求配额
+    with pytest.raises(TimeoutError):
+        second.acquire('endpoint', rpm=2, timeout=0.1)
+
+
+def test_token_bucket_is_charged_and_adjusted(tmp_path):
+    limiter = SharedRateLimiter(str(tmp_path / 'rate_limit.sqlite3'))
+
+    limiter.acquire('endpoint', tpm=1000, tokens=600)
+    assert _bucket(limiter, 'endpoint')[1] == pytest.approx(400, abs=1)
+    with pytest.raises(TimeoutError):
+        limiter.acquire('endpoint', tpm=1000, tokens=600, timeout=0.1)
+
+    # 实际只用了200个token，退还多扣的400个
+    limiter.adjust('endpoint', 1000, 200 - 600)
+    assert _bucket(limiter, 'endpoint')[1] == pytest.approx(800, abs=1)
+    limiter.acquire('endpoint', tpm=1000, tokens=600, timeout=0.1)
+
+
+def test_adjust_never_exceeds_capacity(tmp_path):
+    limiter = SharedRateLimiter(str(tmp_path / 'rate_limit.sqlite3'))
+    limiter.acquire('endpoint', tpm=1000, tokens=100)
+
+    limiter.adjust('endpoint', 1000, -5000)
+
+    assert _bucket(limiter, 'endpoint')[1] == pytest.approx(1000)
+
+
+def test_request_larger_than_capacity_is_let_through(tmp_path):
+    limiter = SharedRateLimiter(str(tmp_path / 'rate_limit.sqlite3'))
+
+    limiter.acquire('endpoint', tpm=100, tokens=5000, timeout=0.1)
+    assert _bucket(limiter, 'endpoint')[1] == pytest.approx(0, abs=1)
+
+
+class _RecordingLimiter:
+    def __init__(self):
+        self.acquired = []
+        self.adjusted = []
+
+    def acquire(self, endpoint_key, rpm=None, tpm=None, tokens=0, timeout=None):
+        self.acquired.append(tokens)
+        return 0.0
+
+    def adjust(self, endpoint_key, tpm, token_delta):
+        self.adjusted.append(token_delta)
+
+
+def _chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content, reasoning_content=None))] if content else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+@pytest.fixture
+def streaming_chat(make_model, monkeypatch):
+    limiter = _RecordingLimiter()
+    model = make_model(rate_limit_tpm=10000)
+    monkeypatch.setattr(model_service, 'get_decrypted_api_key', lambda model: 'sk-test')
+    monkeypatch.setattr(model_service, 'get_endpoint_rate_limit', lambda model: {
+        'limiter': limiter, 'endpoint_key': model.endpoint_key, 'rpm': None, 'tpm': 10000
+    })
+
+    def run(chunks):
+        completions = SimpleNamespace(create=lambda **kwargs: iter(chunks))
+        monkeypatch.setattr(chat_service.openai, 'OpenAI',
+                            lambda **kwargs: SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+        messages = [{'role': 'user', 'content': '你好'}]
+        outputs = list(chat_service.call_openai_compatible_api(model.id, messages, system_prompt='sys', stream=True))
+        return outputs, limiter
+    return run
+
+
+def test_stream_adjusts_bucket_with_reported_usage(streaming_chat):
+    outputs, limiter = streaming_chat([_chunk('你好'), _chunk('！'), _chunk(usage=SimpleNamespace(total_tokens=57))])
+
+    assert outputs[-1]['full_content'] == '你好！'
+    assert limiter.adjusted == [57 - limiter.acquired[0]]
+
+
+def test_stream_without_usage_charges_generated_text(streaming_chat):
+    answer = '这是一个比较长的回答。' * 10
+    outputs, limiter = streaming_chat([_chunk(answer)])
+
+    assert outputs[-1]['full_content'] == answer
+    assert limiter.adjusted == [len(answer) // 2]
+    assert limiter.acquired == [estimate_request_tokens([{'role': 'system', 'content': 'sys'}, {'role': 'user', 'content': '你好'}])]
@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app import db
+from app.models import Dataset, ModelEvaluationResult
+
+
+@pytest.fixture
+def completed_evaluation(make_evaluation):
+    evaluation = make_evaluation(status='completed')
+    dataset = Dataset(name='arith', dataset_type='自建', format='QA')
+    db.session.add(dataset)
+    db.session.flush()
+    for i in range(3):
+        db.session.add(ModelEvaluationResult(
+            evaluation_id=evaluation.id, dataset_id=dataset.id, question=f'{i}+1=?',
+            rendered_prompt=f'{i}+1=?', model_answer=str(i + 1), reference_answer=str(i + 1), score=1.0
+        ))
+    db.session.commit()
+    return evaluation
+
+
+@pytest.fixture
+def client(app, completed_evaluation):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(completed_evaluation.user_id)
+        session['_fresh'] = True
+    return client
+
+
+def test_export_streams_jsonl(client, completed_evaluation):
+    response = client.get(f'/evaluations/export/{completed_evaluation.id}?format=jsonl')
+
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['question'] for row in rows] == ['0+1=?', '1+1=?', '2+1=?']
+    assert rows[0]['dataset'] == 'arith'
+
+
+def test_large_xlsx_export_falls_back_to_streamed_csv(app, client, completed_evaluation, monkeypatch):
+    monkeypatch.setitem(app.config, 'EXPORT_XLSX_MAX_ROWS', 2)
+
+    response = client.get(f'/evaluations/export/{completed_evaluation.id}')
+
+    assert response.mimetype == 'text/csv'
+    assert '.csv' in response.headers['Content-Disposition']
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True).lstrip('\ufeff'))))
+    assert len(rows) == 4
+
+
+def test_small_export_defaults_to_xlsx(client, completed_evaluation):
+    response = client.get(f'/evaluations/export/{completed_evaluation.id}')
+
+    assert response.mimetype == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    assert response.get_data()[:2] == b'PK'
@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+from app import db
+from app.models import Dataset, ModelEvaluationResult
+from app.services.result_search_service import ResultSearchService
+
+
+@pytest.fixture
+def search_index_dir(app_context, monkeypatch, tmp_path):
+    # 每个测试使用独立的FTS5索引目录，评估ID在测试之间会重复
+    monkeypatch.setitem(app_context.config, 'RESULT_SEARCH_INDEX_DIR', str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def evaluation(make_evaluation, search_index_dir):
+    return make_evaluation(status='completed')
+
+
+@pytest.fixture
+def add_result(evaluation):
+    dataset = Dataset(name='qa', dataset_type='自建', format='QA')
+    db.session.add(dataset)
+    db.session.commit()
+
+    def _add_result(question, model_answer='', feedback=None, score=None):
+        result = ModelEvaluationResult(
+            evaluation_id=evaluation.id, dataset_id=dataset.id, question=question,
+            model_answer=model_answer, feedback=feedback, score=score
+        )
+        db.session.add(result)
+        db.session.commit()
+        return result
+    return _add_result
+
+
+def test_search_uses_fts5_index_on_sqlite(evaluation, add_result):
+    python = add_result('What is Python?', 'Python is a programming language', score=1.0)
+    add_result('What is Java?', 'Java runs on the JVM', score=0.0)
+    chinese = add_result('北京是哪个国家的首都？', '中国', feedback='回答正确', score=1.0)
+
+    results, total = ResultSearchService.search(evaluation.id, 'python')
+    assert (results, total) == ([python], 1)
+
+    # 中文按子串匹配，可以搜索裁判反馈
+    assert ResultSearchService.search(evaluation.id, '首都')[0] == [chinese]
+    assert ResultSearchService.search(evaluation.id, '正确')[0] == [chinese]
+    # 以字母数字结尾的词按前缀匹配
+    assert ResultSearchService.search(evaluation.id, 'progr')[0] == [python]
+    # 多个词之间为“与”关系
+    assert ResultSearchService.search(evaluation.id, 'what java')[1] == 1
+    assert ResultSearchService.search(evaluation.id, 'python jvm') == ([], 0)
+    assert os.path.exists(ResultSearchService._fts_index_path(evaluation.id))
+
+
+def test_search_ranks_by_relevance_and_filters_by_score(evaluation, add_result):
+    once = add_result('apple', 'banana', score=0.2)
+    twice = add_result('apple apple apple', 'apple', score=0.8)
+    add_result('cherry', 'cherry', score=1.0)
+
+    assert ResultSearchService.search(evaluation.id, 'apple') == ([twice, once], 2)
+    assert ResultSearchService.search(evaluation.id, 'apple', min_score=0.5) == ([twice], 1)
+    assert ResultSearchService.search(evaluation.id, 'apple', max_score=0.5) == ([once], 1)
+    # 分页时总数不变
+    assert ResultSearchService.search(evaluation.id, 'apple', page=2, per_page=1) == ([once], 2)
+
+
+def test_search_syncs_new_and_reimported_results(evaluation, add_result):
+    first = add_result('alpha question', 'answer')
+    assert ResultSearchService.search(evaluation.id, 'alpha')[1] == 1
+
+    # 新入库的结果增量同步
+    second = add_result('alpha again', 'answer')
+    assert ResultSearchService.search(evaluation.id, 'alpha') == ([first, second], 2)
+
+    # 结果被清理后重新入库，索引重建
+    ModelEvaluationResult.query.filter_by(evaluation_id=evaluation.id).delete()
+    db.session.commit()
+    third = add_result('alpha rerun', 'answer')
+    assert ResultSearchService.search(evaluation.id, 'alpha') == ([third], 1)
+
+
+def test_iter_search_yields_all_matches_in_relevance_order(evaluation, add_result):
+    matches = [add_result(f'needle {i}', 'answer') for i in range(5)]
+    add_result('haystack', 'answer')
+
+    batches = list(ResultSearchService.iter_search(evaluation.id, 'needle', batch_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [result for batch in batches for result in batch] == matches
+
+
+def test_remove_index_deletes_index_files(evaluation, add_result):
+    add_result('something', 'answer')
+    ResultSearchService.search(evaluation.id, 'something')
+    index_path = ResultSearchService._fts_index_path(evaluation.id)
+    assert os.path.exists(index_path)
+
+    ResultSearchService.remove_index(evaluation.id)
+
+    assert not any(os.path.exists(path) for path in (index_path, f'{index_path}-wal', f'{index_path}-shm'))
+
+
+def test_empty_query_matches_nothing(evaluation, add_result):
+    add_result('something', 'answer')
+
+    assert ResultSearchService.search(evaluation.id, '  ') == ([], 0)
+    assert ResultSearchService.search(evaluation.id, '***') == ([], 0)
+
+
+def test_highlight_escapes_text_and_marks_terms():
+    highlighted = ResultSearchService.highlight('<b>Python</b> and python', 'python')
+
+    assert str(highlighted) == '&lt;b&gt;<mark>Python</mark>&lt;/b&gt; and <mark>python</mark>'
+    assert str(ResultSearchService.highlight('<i>', '')) == '&lt;i&gt;'
+    assert str(ResultSearchService.highlight(None, 'x')) == ''
@@ -0,0 +1,73 @@
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from flask import current_app
+from flask_migrate import downgrade, stamp
+from sqlalchemy import inspect, text
+
+from app import db
+from app.models import SCHEMA_BASELINE_REVISION, ModelEvaluation, upgrade_database_schema
+
+
+@pytest.fixture
+def migration_context(app_context):
+    yield app_context
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP TABLE IF EXISTS alembic_version'))
+
+
+def _current_revision():
+    with db.engine.connect() as conn:
+        return MigrationContext.configure(conn).get_current_revision()
+
+
+def _head_revision():
+    return ScriptDirectory.from_config(current_app.extensions['migrate'].migrate.get_config()).get_current_head()
+
+
+def _schema_differences():
+    """数据库实际结构与模型相比缺少或多出的表、列、索引和外键"""
+    with db.engine.connect() as conn:
+        differences = compare_metadata(MigrationContext.configure(conn), db.metadata)
+    return [diff for diff in differences if isinstance(diff, tuple) and diff[0].startswith(('add_', 'remove_'))]
+
+
+def test_upgrade_database_schema_creates_empty_database_at_head(migration_context):
+    db.drop_all()
+
+    upgrade_database_schema()
+
+    assert _schema_differences() == []
+    assert _current_revision() == _head_revision()
+
+
+def test_upgrade_database_schema_migrates_database_deployed_before_migrations(migration_context, make_evaluation):
+    evaluation_id = make_evaluation().id
+    db.session.commit()
+    db.session.close()
+    # 回到基线结构并去掉版本记录，模拟引入迁移之前由db.create_all()建的库
+    stamp()
+    downgrade(revision=SCHEMA_BASELINE_REVISION)
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP TABLE alembic_version'))
+    tables = set(inspect(db.engine).get_table_names())
+    assert not tables & {'evaluation_job', 'prediction_cache', 'judge_cache', 'matrix_evaluation', 'review_progress_cursor'}
+    assert 'priority' not in {column['name'] for column in inspect(db.engine).get_columns('evaluation_effectiveness')}
+
+    upgrade_database_schema()
+
+    assert _schema_differences() == []
+    assert _current_revision() == _head_revision()
+    # 已有行的非空新列填入默认值
+    evaluation = db.session.get(ModelEvaluation, evaluation_id)
+    assert (evaluation.priority, evaluation.cancel_requested, evaluation.use_prediction_cache) == ('normal', False, False)
+
+
+def test_upgrade_database_schema_is_noop_at_head(migration_context):
+    stamp()
+
+    upgrade_database_schema()
+
+    assert _schema_differences() == []
+    assert _current_revision() == _head_revision()
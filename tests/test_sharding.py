@@ -0,0 +1,194 @@
+import math
+
+import pytest
+
+from app import db
+from app.adapter.managed_evaluator import apply_sample_ranges
+from app.models import Dataset, EvaluationJob
+from app.services.evaluation_queue_service import EvaluationQueueService
+from app.services.evaluation_service import EvaluationService
+from app.services.progress_stream_service import EvaluationProgressReporter, ProgressStreamService
+from app.utils.early_stopping import merge_early_stopping_stats
+
+
+def test_plan_shards_balances_subsets_by_sample_count():
+    shards = EvaluationService._plan_shards([1, 2], 2, {1: {'a': 60, 'b': 30, 'c': 10}, 2: {'qa': 100}})
+
+    assert shards == [{1: None}, {2: None}]
+
+    shards = EvaluationService._plan_shards([1, 2], 2, {1: {'a': 50, 'b': 40, 'c': 30}, 2: {'qa': 80}})
+
+    # 同一基准的子集可以分到不同分片
+    assert shards == [{1: {'a': None, 'b': None}}, {1: {'c': None}, 2: None}]
+
+
+def test_plan_shards_splits_single_large_subset_by_sample_range():
+    shards = EvaluationService._plan_shards([7], 4, {7: {'arith': 10}})
+
+    assert shards == [{7: {'arith': [0, 3]}}, {7: {'arith': [3, 6]}}, {7: {'arith': [6, 9]}}, {7: {'arith': [9, 10]}}]
+
+
+def test_plan_shards_keeps_pieces_of_a_subset_in_different_shards():
+    shards = EvaluationService._plan_shards([1, 2], 3, {1: {'big': 20}, 2: {'x': 5, 'y': 5}})
+
+    ranges = [shard[1]['big'] for shard in shards if shard.get(1)]
+    assert sorted(ranges) == [[0, 10], [10, 20]]
+    assert sum(1 for shard in shards if 2 in shard) >= 1
+
+
+def test_plan_shards_weights_unplanned_datasets_by_average_sample_count():
+    # 数据集3加载失败没有样本数，按已知数据集的平均样本数（50）计，整体作为一个单元
+    shards = EvaluationService._plan_shards([1, 2, 3], 3, {1: {'a': 60}, 2: {'b': 40}, 3: None})
+
+    assert {3: None} in shards
+    assert len(shards) == 3
+
+
+def test_plan_shards_keeps_single_shard_together():
+    assert EvaluationService._plan_shards([1], 1, {1: {'a': 100}}) == [{1: None}]
+    assert EvaluationService._plan_shards([1, 2], 4, {1: {'a': 1}, 2: {}}) == [{1: None, 2: None}]
+    assert EvaluationService._plan_shards([1, 2], 4, {1: None, 2: None}) == [{1: None}, {2: None}]
+
+
+def test_merge_subset_scores_weights_pieces_by_sample_count():
+    merged = EvaluationService._merge_subset_scores([
+        {'name': 'arith', 'score': 1.0, 'num': 3},
+        {'name': 'logic', 'score': 0.5, 'num': 2},
+        {'name': 'arith', 'score': 0.0, 'num': 1},
+    ])
+
+    assert merged == [{'name': 'arith', 'score': 0.75, 'num': 4}, {'name': 'logic', 'score': 0.5, 'num': 2}]
+
+
+def test_apply_shard_subsets_restricts_subsets_and_sample_ranges():
+    system_dataset = Dataset(id=1, name='ceval', dataset_type='系统')
+    custom_dataset = Dataset(id=2, name='arith', dataset_type='自建', format='QA', download_url='/data/arith.jsonl')
+    dataset_args = {'general_qa': {'subset_list': ['arith']}}
+    sample_ranges = {}
+
+    EvaluationService._apply_shard_subsets(system_dataset, 'ceval', {'law': None, 'math': [0, 40]},
+                                           dataset_args, sample_ranges)
+    EvaluationService._apply_shard_subsets(custom_dataset, 'general_qa', {'arith': [100, 200]},
+                                           dataset_args, sample_ranges)
+    EvaluationService._apply_shard_subsets(custom_dataset, 'general_qa', None, dataset_args, sample_ranges)
+
+    assert dataset_args == {'ceval': {'subset_list': ['law', 'math']}, 'general_qa': {'subset_list': ['arith']}}
+    assert sample_ranges == {'ceval': {'math': [0, 40]}, 'general_qa': {'arith': [100, 200]}}
+
+
+def test_apply_sample_ranges_keeps_only_assigned_samples():
+    prompts = {'a': list(range(10)), 'b': list(range(3))}
+
+    assert apply_sample_ranges(prompts, {'a': [2, 5], 'missing': [0, 1]}) == {'a': [2, 3, 4], 'b': [0, 1, 2]}
+
+
+def test_merge_early_stopping_stats_weights_by_population():
+    merged = merge_early_stopping_stats([
+        {'samples': 50, 'total': 300, 'mean': 0.8, 'half_width': 0.04, 'confidence': 0.95,
+         'target_half_width': 0.05, 'stopped_early': True, 'subset_samples': {'a': 50}},
+        {'samples': 100, 'total': 100, 'mean': 0.4, 'half_width': 0.0, 'confidence': 0.95,
+         'target_half_width': 0.05, 'stopped_early': False, 'subset_samples': {'b': 100}},
+    ])
+
+    assert merged['samples'] == 150
+    assert merged['total'] == 400
+    assert merged['mean'] == pytest.approx(0.75 * 0.8 + 0.25 * 0.4)
+    assert merged['half_width'] == pytest.approx(math.sqrt((0.75 * 0.04) ** 2))
+    assert merged['stopped_early'] is True
+    assert merged['subset_samples'] == {'a': 50, 'b': 100}
+
+
+def test_merge_early_stopping_stats_without_intervals():
+    merged = merge_early_stopping_stats([
+        {'samples': 10, 'total': 10, 'mean': None, 'half_width': None},
+        {'samples': 5, 'total': 5, 'mean': 1.0, 'half_width': 0.0},
+    ])
+
+    assert merged['samples'] == 15
+    assert merged['mean'] is None
+
+
+def test_merge_concurrency_histories_sums_parallel_shards():
+    merged = EvaluationService._merge_concurrency_histories([
+        {'generation': {'final': 4, 'recommended': 3, 'max_reached': 4, 'successes': 10, 'overloads': 1,
+                        'history': [[0.0, 2], [5.0, 4]]}, 'judge': None},
+        {'generation': {'final': 2, 'recommended': 2, 'max_reached': 3, 'successes': 6, 'overloads': 0,
+                        'history': [[0.0, 3], [3.0, 2]]}, 'judge': None},
+        None,
+    ])
+
+    generation = merged['generation']
+    assert generation['final'] == 6
+    assert generation['successes'] == 16
+    assert generation['history'] == [[0.0, 5], [3.0, 4], [5.0, 6]]
+    assert merged['judge'] is None
+
+
+def test_sharded_evaluation_completes_after_every_shard_reports(make_evaluation):
+    evaluation = make_evaluation(status='running', shard_count=2)
+    jobs = [
+        EvaluationQueueService.enqueue(evaluation, shard_index=index, shard_dataset_ids=[index + 1])
+        for index in range(2)
+    ]
+    db.session.commit()
+
+    jobs[0].shard_result = {
+        'report': {'arith': {'score': 0.5}},
+        'cache_stats': {'prediction': {'hits': 1, 'misses': 3}},
+    }
+    db.session.commit()
+    assert EvaluationService._finalize_sharded_evaluation(evaluation.id) is False
+    assert evaluation.status == 'running'
+
+    jobs[1].shard_result = {
+        'report': {'logic': {'score': 0.9}},
+        'cache_stats': {'prediction': {'hits': 2, 'misses': 0}, 'judge': {'hits': 1}},
+    }
+    db.session.commit()
+    assert EvaluationService._finalize_sharded_evaluation(evaluation.id) is True
+
+    assert evaluation.status == 'completed'
+    assert evaluation.result_summary == {'arith': {'score': 0.5}, 'logic': {'score': 0.9}}
+    assert evaluation.cache_stats == {'prediction': {'hits': 3, 'misses': 3}, 'judge': {'hits': 1}}
+    assert EvaluationJob.query.filter_by(evaluation_id=evaluation.id).count() == 2
+
+
+def test_only_lowest_active_shard_reports_progress(make_evaluation):
+    evaluation = make_evaluation(status='running', shard_count=3)
+    jobs = [
+        EvaluationQueueService.enqueue(evaluation, shard_index=index, shard_dataset_ids=[index + 1])
+        for index in range(3)
+    ]
+    unsharded = EvaluationQueueService.enqueue(make_evaluation())
+    db.session.commit()
+    for job in jobs[1:]:
+        job.status = 'running'
+    db.session.commit()
+
+    # 分片0还在排队，由执行中序号最小的分片1推送
+    assert [EvaluationQueueService.is_progress_reporting_job(job.id) for job in jobs] == [True, True, False]
+    jobs[1].status = 'completed'
+    db.session.commit()
+    assert EvaluationQueueService.is_progress_reporting_job(jobs[2].id) is True
+    assert EvaluationQueueService.is_progress_reporting_job(unsharded.id) is True
+
+
+def test_progress_reporter_skips_when_another_shard_reports(app_context, make_evaluation, monkeypatch):
+    evaluation = make_evaluation(status='running')
+    published = []
+    monkeypatch.setattr(EvaluationService, 'get_evaluation_progress', staticmethod(
+        lambda evaluation_id, user_id: {'status': 'running', 'total_prompts': 10, 'completed_prompts': 4}
+    ))
+    monkeypatch.setattr(ProgressStreamService, 'publish', staticmethod(
+        lambda topic, event_type, data, app=None: published.append(data)
+    ))
+    reporting = [False]
+    reporter = EvaluationProgressReporter(app_context, evaluation.id, evaluation.user_id,
+                                          should_report=lambda: reporting[0])
+
+    reporter.report()
+    assert published == []
+
+    reporting[0] = True
+    reporter.report()
+    assert [event['completed_prompts'] for event in published] == [4]